@@ -0,0 +1,228 @@
+"""Incremental trend velocity analytics ("what is rising fastest right now").
+
+TrendAnalytics keeps the last ``window`` score/rank observations for every
+URL in fixed-size NumPy arrays. Each saved batch is folded in with a
+vectorised shift, and velocity, acceleration and time-in-top-N are computed
+for all URLs at once. No query against the trends table is needed.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from models import TrendItem, trend_rows
+from url_utils import canonical_url
+
+SECONDS_PER_HOUR = 3600.0
+
+
+@dataclass
+class Riser:
+    """One URL with its current score and momentum metrics."""
+    url: str
+    title: str
+    platform: str
+    score: int
+    rank: int
+    velocity: float          # score points per hour over the window
+    acceleration: float      # change in velocity per hour
+    time_in_top_n: float     # seconds spent at rank <= top_n within the window
+    points: int              # observations in the window
+
+
+class TrendAnalytics:
+    """Sliding-window score/rank series per URL, updated one batch at a time.
+
+    ``window`` observations are kept per URL; at most ``max_urls`` URLs are
+    tracked, and the ones not seen for longest are dropped first.
+    """
+
+    def __init__(self, window: int = 12, top_n: int = 10, max_urls: int = 50000):
+        if window < 2:
+            raise ValueError("window must be at least 2")
+        self.window = window
+        self.top_n = top_n
+        self.max_urls = max_urls
+        self._index: Dict[str, int] = {}
+        self._urls: List[Optional[str]] = []
+        self._titles: List[str] = []
+        self._platforms: List[str] = []
+        self._free: List[int] = []
+        self._times = np.full((0, window), np.nan)
+        self._scores = np.full((0, window), np.nan)
+        self._ranks = np.full((0, window), np.nan)
+        self._last_seen = np.zeros(0)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _grow(self, needed: int) -> None:
+        """Make room for ``needed`` more rows, doubling the arrays when full."""
+        size = self._times.shape[0]
+        capacity = max(64, size)
+        while capacity - size + len(self._free) < needed:
+            capacity *= 2
+        if capacity == size:
+            return
+        extra = capacity - size
+        self._times = np.vstack([self._times, np.full((extra, self.window), np.nan)])
+        self._scores = np.vstack([self._scores, np.full((extra, self.window), np.nan)])
+        self._ranks = np.vstack([self._ranks, np.full((extra, self.window), np.nan)])
+        self._last_seen = np.concatenate([self._last_seen, np.zeros(extra)])
+        self._urls.extend([None] * extra)
+        self._titles.extend([""] * extra)
+        self._platforms.extend([""] * extra)
+        self._free.extend(range(capacity - 1, size - 1, -1))
+
+    def _evict(self, needed: int, keep: Set[str]) -> None:
+        """Drop the least recently seen URLs so ``needed`` new ones fit.
+
+        URLs in ``keep`` (the batch being stored) are never dropped; a batch
+        larger than ``max_urls`` overshoots the cap until the next eviction.
+        """
+        excess = len(self._index) + needed - self.max_urls
+        if excess <= 0:
+            return
+        live = np.fromiter(
+            (row for url, row in self._index.items() if url not in keep), dtype=np.int64
+        )
+        stale = live[np.argsort(self._last_seen[live])[:excess]]
+        self._times[stale] = np.nan
+        self._scores[stale] = np.nan
+        self._ranks[stale] = np.nan
+        for row in stale.tolist():
+            del self._index[self._urls[row]]
+            self._urls[row] = None
+            self._free.append(row)
+
+    def _rows_for(self, urls: List[str]) -> np.ndarray:
+        """Map URLs to array rows, allocating rows for new URLs."""
+        new = [u for u in dict.fromkeys(urls) if u not in self._index]
+        if new:
+            self._evict(len(new), set(urls))
+            self._grow(len(new))
+            for url in new:
+                row = self._free.pop()
+                self._index[url] = row
+                self._urls[row] = url
+        return np.fromiter((self._index[u] for u in urls), dtype=np.int64, count=len(urls))
+
+    def update(self, trends: Iterable[TrendItem]) -> None:
+        """Fold one saved batch (list of TrendItem or TrendBatch) into the series."""
+        depths: Dict[str, int] = {}
+        layers: List[Dict[str, tuple]] = []
+        for platform, title, url, score, rank, fetched_at in trend_rows(trends):
+            key = canonical_url(url)
+            when = datetime.fromisoformat(fetched_at).timestamp()
+            # A URL seen twice in one batch (e.g. when warming from history)
+            # goes into successive layers so every observation is kept in order.
+            depth = depths.get(key, 0)
+            if depth == len(layers):
+                layers.append({})
+            layers[depth][key] = (when, float(score), float(rank), title, platform)
+            depths[key] = depth + 1
+
+        for layer in layers:
+            urls = list(layer)
+            rows = self._rows_for(urls)
+            values = np.array([layer[u][:3] for u in urls], dtype=float)
+            for column, target in enumerate((self._times, self._scores, self._ranks)):
+                target[rows, :-1] = target[rows, 1:]
+                target[rows, -1] = values[:, column]
+            self._last_seen[rows] = values[:, 0]
+            for url, row in zip(urls, rows.tolist()):
+                self._titles[row] = layer[url][3]
+                self._platforms[row] = layer[url][4]
+
+    def warm(self, db, limit: int = 5000) -> None:
+        """Seed the series from the newest ``limit`` rows already in ``db``."""
+        batch = db.get_latest(limit=limit, as_batch=True)
+        items = sorted(batch, key=lambda t: t.fetched_at)
+        if items:
+            self.update(items)
+
+    @staticmethod
+    def _slope(times: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """Least-squares slope per row (units per hour), ignoring NaN slots."""
+        mask = ~np.isnan(times)
+        n = mask.sum(axis=1)
+        hours = np.where(mask, times / SECONDS_PER_HOUR, 0.0)
+        vals = np.where(mask, values, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t_mean = hours.sum(axis=1) / n
+            v_mean = vals.sum(axis=1) / n
+            dt = np.where(mask, hours - t_mean[:, None], 0.0)
+            dv = np.where(mask, vals - v_mean[:, None], 0.0)
+            slope = (dt * dv).sum(axis=1) / (dt * dt).sum(axis=1)
+        return np.where((n >= 2) & np.isfinite(slope), slope, 0.0)
+
+    def metrics(self) -> Dict[str, np.ndarray]:
+        """Compute velocity, acceleration and time-in-top-N for every tracked row."""
+        # Work in seconds relative to each row's newest sample to keep precision
+        times = self._times - self._times[:, -1:]
+        scores, ranks = self._scores, self._ranks
+        velocity = self._slope(times, scores)
+
+        # Acceleration: slope of the newer half minus slope of the older half,
+        # divided by the gap between the two halves' mean times.
+        half = self.window // 2
+        old_v = self._slope(times[:, :half], scores[:, :half])
+        new_v = self._slope(times[:, half:], scores[:, half:])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            gap = (_row_mean(times[:, half:]) - _row_mean(times[:, :half])) / SECONDS_PER_HOUR
+            acceleration = (new_v - old_v) / gap
+        acceleration = np.where(np.isfinite(acceleration), acceleration, 0.0)
+
+        # Time in top N: each interval counts if the rank at its start was <= N
+        intervals = np.diff(times, axis=1)
+        in_top = ranks[:, :-1] <= self.top_n
+        time_in_top = np.where(np.isfinite(intervals) & in_top, intervals, 0.0).sum(axis=1)
+
+        points = (~np.isnan(times)).sum(axis=1)
+        return {
+            "velocity": velocity,
+            "acceleration": acceleration,
+            "time_in_top_n": time_in_top,
+            "points": points,
+        }
+
+    def top_risers(
+        self, n: int = 10, platform: Optional[str] = None, min_points: int = 2
+    ) -> List[Riser]:
+        """Return the ``n`` tracked URLs with the highest score velocity."""
+        if not self._index:
+            return []
+        stats = self.metrics()
+        live = np.fromiter(self._index.values(), dtype=np.int64)
+        live = live[stats["points"][live] >= min_points]
+        if platform is not None:
+            live = np.array([r for r in live.tolist() if self._platforms[r] == platform], dtype=np.int64)
+        if live.size == 0:
+            return []
+
+        order = live[np.argsort(-stats["velocity"][live], kind="stable")[:n]]
+        risers: List[Riser] = []
+        for row in order.tolist():
+            risers.append(
+                Riser(
+                    url=self._urls[row],
+                    title=self._titles[row],
+                    platform=self._platforms[row],
+                    score=int(self._scores[row, -1]),
+                    rank=int(self._ranks[row, -1]),
+                    velocity=float(stats["velocity"][row]),
+                    acceleration=float(stats["acceleration"][row]),
+                    time_in_top_n=float(stats["time_in_top_n"][row]),
+                    points=int(stats["points"][row]),
+                )
+            )
+        return risers
+
+
+def _row_mean(values: np.ndarray) -> np.ndarray:
+    """Mean of each row ignoring NaN; NaN for rows with no values (no warning)."""
+    mask = ~np.isnan(values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(mask, values, 0.0).sum(axis=1) / mask.sum(axis=1)
@@ -1,8 +1,9 @@
 """Base abstract class for all trend data sources."""
 
 from abc import ABC, abstractmethod
-from typing import List
-from models import TrendItem
+from itertools import islice
+from typing import AsyncIterator, Iterator, List
+from models import TrendBatch, TrendItem
 
 
 class BaseTrendSource(ABC):
@@ -12,3 +13,40 @@ class BaseTrendSource(ABC):
     def fetch_trends(self, limit: int = 10) -> List[TrendItem]:
         """Fetch trending items from the specific platform."""
         raise NotImplementedError
+
+    def fetch_batch(self, limit: int = 10) -> TrendBatch:
+        """Fetch trending items as a columnar TrendBatch.
+
+        The default packs the result of fetch_trends(); high-volume sources
+        can override it to fill the batch directly.
+        """
+        return TrendBatch.from_items(self.fetch_trends(limit=limit))
+
+    def iter_trends(self, limit: int = 10) -> Iterator[TrendItem]:
+        """Yield trending items one at a time, in rank order.
+
+        The default adapter yields from fetch_trends(). Sources that can
+        produce items incrementally (page by page, say) override it, so
+        consumers can store early items before the last one is fetched.
+        """
+        yield from self.fetch_trends(limit=limit)
+
+    async def aiter_trends(self, limit: int = 10, chunk_size: int = 100) -> AsyncIterator[TrendItem]:
+        """Async version of iter_trends().
+
+        The blocking iterator runs in a worker thread, ``chunk_size`` items at
+        a time, so the event loop is never blocked on network or parsing.
+        """
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        iterator = iter(self.iter_trends(limit=limit))
+        while True:
+            chunk = await asyncio.to_thread(_take, iterator, chunk_size)
+            if not chunk:
+                return
+            for item in chunk:
+                yield item
+
+
+def _take(iterator: Iterator[TrendItem], count: int) -> List[TrendItem]:
+    return list(islice(iterator, count))
@@ -0,0 +1 @@
+"""Offline benchmark suite for TrendWatch (run with ``python -m benchmarks.run``)."""
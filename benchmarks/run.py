@@ -0,0 +1,352 @@
+"""Offline benchmarks for the fetch, parse and storage paths.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.run                          # compare with baseline.json
+    python -m benchmarks.run --sizes 1e3,1e4,1e5,1e6  # larger tables
+    python -m benchmarks.run --save-baseline          # record a new baseline
+
+Network sources are measured against benchmarks.stub_server, which replays
+recorded Reddit JSON and Hacker News HTML from ``benchmarks/fixtures``. No
+request leaves the machine. Storage benchmarks fill each backend with
+``size`` rows from SyntheticYouTubeSource and measure ``save_trends``
+throughput and ``get_latest`` latency, both straight from the backend and
+through a HotTrendCache. Start-up benchmarks time short
+``main.py`` invocations in a fresh interpreter. MongoDB uses ``--mongo-uri`` if given,
+otherwise mongomock when it is installed (in-process; its numbers only
+compare with other mongomock runs).
+
+Each result is compared with the stored baseline. A result worse than the
+baseline by more than ``--tolerance`` is a regression, and the exit status
+is 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+from unittest import mock
+
+from benchmarks.stub_server import FIXTURES, StubRedditSource, StubServer
+from benchmarks.synthetic_source import SyntheticYouTubeSource
+from db import TrendDatabase
+from hn_source import HNWebSource, parse_listing
+from hot_cache import HotTrendCache
+from http_client import HTTPCache
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> {"value": float, "unit": str, "higher_is_better": bool}
+Results = Dict[str, Dict[str, object]]
+
+
+def _record(results: Results, name: str, value: float, unit: str, higher_is_better: bool) -> None:
+    results[name] = {"value": round(value, 3), "unit": unit, "higher_is_better": higher_is_better}
+    print(f"  {name:<40} {value:>14,.1f} {unit}")
+
+
+def _best_rate(run: Callable[[], int], repeat: int) -> float:
+    """Items per second of the fastest of ``repeat`` runs."""
+    best = 0.0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = run()
+        elapsed = time.perf_counter() - started
+        if count and elapsed > 0:
+            best = max(best, count / elapsed)
+    return best
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def bench_fetch(results: Results, repeat: int) -> None:
+    """Fetch + parse throughput against the local stub server."""
+    print("fetch/parse (stub server)")
+    with StubServer() as server:
+        def reddit_cold() -> int:
+            count = 0
+            for _ in range(10):
+                source = StubRedditSource(server.base_url, cache=HTTPCache())
+                count += len(source.fetch_trends(limit=100))
+            return count
+
+        shared = StubRedditSource(server.base_url, cache=HTTPCache())
+        shared.fetch_trends(limit=100)
+
+        def reddit_not_modified() -> int:
+            return sum(len(shared.fetch_trends(limit=100)) for _ in range(10))
+
+        def reddit_paged() -> int:
+            count = 0
+            for _ in range(5):
+                source = StubRedditSource(server.base_url, cache=HTTPCache())
+                count += sum(1 for _ in source.iter_listing(200))
+            return count
+
+        _record(results, "fetch.reddit.items_per_s", _best_rate(reddit_cold, repeat), "items/s", True)
+        _record(results, "fetch.reddit_304.items_per_s", _best_rate(reddit_not_modified, repeat), "items/s", True)
+        _record(results, "fetch.reddit_paged.items_per_s", _best_rate(reddit_paged, repeat), "items/s", True)
+
+        def hn_lxml_cold() -> int:
+            count = 0
+            for _ in range(10):
+                source = HNWebSource(base_url=server.base_url, cache=HTTPCache())
+                count += len(source.fetch_trends(limit=60))
+            return count
+
+        _record(results, "fetch.hn_lxml.items_per_s", _best_rate(hn_lxml_cold, repeat), "items/s", True)
+
+        try:
+            from scrapy_source import ScrapyHNSource
+        except ImportError:
+            print("  (scrapy not installed; skipping HN benchmark)")
+        else:
+            hn = ScrapyHNSource(base_url=server.base_url)
+            _record(
+                results,
+                "fetch.hn_scrapy.items_per_s",
+                _best_rate(lambda: len(hn.fetch_trends(limit=60)), repeat),
+                "items/s",
+                True,
+            )
+
+    bench_parse_hn(results, repeat)
+
+    synthetic = SyntheticYouTubeSource()
+    _record(
+        results,
+        "source.synthetic.rows_per_s",
+        _best_rate(lambda: sum(len(synthetic.fetch_batch(1000)) for _ in range(50)), repeat),
+        "rows/s",
+        True,
+    )
+
+
+def bench_parse_hn(results: Results, repeat: int) -> None:
+    """Parse-only throughput of the recorded HN pages: lxml vs Scrapy selectors."""
+    pages = []
+    for name in ("hn_news_1.html", "hn_news_2.html"):
+        with open(os.path.join(FIXTURES, name), "rb") as fh:
+            pages.append(fh.read())
+
+    _record(
+        results,
+        "parse.hn_lxml.items_per_s",
+        _best_rate(lambda: sum(len(parse_listing(p)) for p in pages * 50), repeat),
+        "items/s",
+        True,
+    )
+    try:
+        from scrapy.http import HtmlResponse
+        from scrapy_source import HNSpider
+    except ImportError:
+        return
+
+    def scrapy_parse() -> int:
+        spider = HNSpider(limit=30, items_out=[])
+        for body in pages * 50:
+            # A fresh response each time, so no selector is reused across pages
+            spider._parse_rows(HtmlResponse("https://news.ycombinator.com/", body=body), 0)  # pylint: disable=protected-access
+        return len(spider.items_out)
+
+    _record(results, "parse.hn_scrapy.items_per_s", _best_rate(scrapy_parse, repeat), "items/s", True)
+
+
+def _best_ms(command: List[str], repeat: int) -> float:
+    """Wall-clock milliseconds of the fastest of ``repeat`` runs of ``command``."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best
+
+
+def bench_startup(results: Results, repeat: int) -> None:
+    """Start-up cost of short CLI invocations, each in a fresh interpreter."""
+    print("startup (fresh interpreter)")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "startup.db")
+        main = [sys.executable, "main.py"]
+        subprocess.run(
+            main + ["fetch", "--source", "youtube:US", "--limit", "5", "--db", path],
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        _record(results, "startup.python.ms", _best_ms([sys.executable, "-c", "pass"], repeat), "ms", False)
+        _record(results, "startup.cli_help.ms", _best_ms(main + ["--help"], repeat), "ms", False)
+        _record(
+            results,
+            "startup.cli_latest_sqlite.ms",
+            _best_ms(main + ["latest", "--db", path], repeat),
+            "ms",
+            False,
+        )
+
+
+@contextmanager
+def _sqlite_backend(size: int) -> Iterator[TrendDatabase]:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = TrendDatabase(
+            os.path.join(tmp, f"bench_{size}.db"),
+            persistent=True,
+            journal_mode="WAL",
+            synchronous="NORMAL",
+        )
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+@contextmanager
+def _mongo_backend(size: int, uri: Optional[str]):
+    import mongo_db  # pylint: disable=import-outside-toplevel
+
+    name = f"trendwatch_bench_{size}"
+    if uri:
+        db = mongo_db.MongoTrendDB(uri, db_name=name)
+    else:
+        import mongomock  # pylint: disable=import-outside-toplevel
+
+        with mock.patch.object(mongo_db, "MongoClient", mongomock.MongoClient):
+            db = mongo_db.MongoTrendDB(db_name=name)
+    try:
+        yield db
+    finally:
+        db.client.drop_database(name)
+        db.client.close()
+
+
+def bench_storage(results: Results, backend: str, sizes: List[int], mongo_uri: Optional[str], batch: int) -> None:
+    """save_trends throughput and get_latest latency at each table size."""
+    print(f"storage ({backend})")
+    for size in sizes:
+        opener = _sqlite_backend(size) if backend == "sqlite" else _mongo_backend(size, mongo_uri)
+        with opener as db:
+            source = SyntheticYouTubeSource()
+            batches = [source.fetch_batch(min(batch, size - n)) for n in range(0, size, batch)]
+            started = time.perf_counter()
+            for rows in batches:
+                db.save_trends(rows)
+            elapsed = time.perf_counter() - started
+            _record(results, f"save.{backend}.{size}.rows_per_s", size / elapsed, "rows/s", True)
+
+            for limit in (10, 100):
+                samples = []
+                for _ in range(30):
+                    started = time.perf_counter()
+                    db.get_latest(limit=limit)
+                    samples.append((time.perf_counter() - started) * 1000)
+                _record(
+                    results,
+                    f"latest.{backend}.{size}.limit{limit}.p95_ms",
+                    _percentile(samples, 0.95),
+                    "ms",
+                    False,
+                )
+
+            hot = HotTrendCache(db)
+            samples = []
+            for _ in range(300):
+                started = time.perf_counter()
+                hot.get_latest(limit=100)
+                samples.append((time.perf_counter() - started) * 1e6)
+            _record(results, f"latest.{backend}_hot.{size}.limit100.p95_us", _percentile(samples, 0.95), "us", False)
+
+
+def compare(results: Results, baseline: Results, tolerance: float) -> List[str]:
+    """Print each result next to its baseline; return the names that regressed."""
+    regressions = []
+    print(f"\n{'benchmark':<40} {'current':>12} {'baseline':>12} {'change':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or not base["value"]:
+            print(f"{name:<40} {result['value']:>12,.1f} {'-':>12} {'new':>8}")
+            continue
+        change = (result["value"] - base["value"]) / base["value"]
+        worse = -change if result["higher_is_better"] else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<40} {result['value']:>12,.1f} {base['value']:>12,.1f} {change:>+8.0%}{flag}")
+    return regressions
+
+
+def _mongo_available(uri: Optional[str]) -> bool:
+    if uri:
+        return True
+    try:
+        import mongomock  # pylint: disable=import-outside-toplevel,unused-import
+    except ImportError:
+        print("(mongomock not installed and no --mongo-uri; skipping MongoDB)")
+        return False
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point; returns the exit status."""
+    parser = argparse.ArgumentParser(description="TrendWatch offline benchmarks")
+    parser.add_argument("--sizes", default="1e3,1e4,1e5", help="comma-separated table sizes")
+    parser.add_argument("--backends", default="sqlite,mongo")
+    parser.add_argument("--mongo-uri", help="benchmark a real mongod instead of mongomock")
+    parser.add_argument("--mongomock-max", type=float, default=1e4, help="largest size run on mongomock")
+    parser.add_argument("--batch", type=int, default=1000, help="rows per save_trends call")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per fetch benchmark (best kept)")
+    parser.add_argument("--skip-fetch", action="store_true")
+    parser.add_argument("--skip-startup", action="store_true")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, e.g. 0.25 = 25%%")
+    parser.add_argument("--save-baseline", action="store_true", help="write results to --baseline")
+    args = parser.parse_args(argv)
+
+    sizes = [int(float(s)) for s in args.sizes.split(",") if s.strip()]
+    results: Results = {}
+    if not args.skip_fetch:
+        bench_fetch(results, args.repeat)
+    if not args.skip_startup:
+        bench_startup(results, max(5, args.repeat))
+    for backend in args.backends.split(","):
+        backend = backend.strip()
+        if backend == "sqlite":
+            bench_storage(results, "sqlite", sizes, None, args.batch)
+        elif backend == "mongo" and _mongo_available(args.mongo_uri):
+            mongo_sizes = sizes if args.mongo_uri else [s for s in sizes if s <= args.mongomock_max]
+            bench_storage(results, "mongo", mongo_sizes, args.mongo_uri, args.batch)
+
+    if args.save_baseline:
+        payload = {
+            "machine": {"python": platform.python_version(), "platform": platform.platform()},
+            "results": results,
+        }
+        with open(args.baseline, "w", encoding="utf-8") as fh:
+            json.dump(payload, fh, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline first.")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as fh:
+        baseline = json.load(fh).get("results", {})
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}.")
+        return 1
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
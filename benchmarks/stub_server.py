@@ -0,0 +1,104 @@
+"""Local HTTP server that replays recorded Reddit and Hacker News responses.
+
+Routes:
+
+- ``/r/<subreddit>/<sort>.json`` serves the Reddit listing fixtures, page 1
+  without an ``after`` parameter and page 2 with one.
+- ``/news`` and ``/news?p=2`` serve the HN front page fixtures.
+
+Responses carry an ETag, and a matching ``If-None-Match`` gets a 304, so the
+conditional-request path can be measured as well.
+"""
+
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from reddit_source import RedditTrendSource
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _load(name: str) -> Tuple[bytes, str]:
+    with open(os.path.join(FIXTURES, name), "rb") as fh:
+        body = fh.read()
+    return body, '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "StubServer"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve a fixture, or 404 for unknown paths."""
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        if parts.path.startswith("/r/") and parts.path.endswith(".json"):
+            name = "reddit_news_top_2.json" if "after" in query else "reddit_news_top_1.json"
+            content_type = "application/json"
+        elif parts.path.rstrip("/") in ("", "/news"):
+            name = f"hn_news_{query.get('p', ['1'])[0]}.html"
+            content_type = "text/html; charset=utf-8"
+        else:
+            name = ""
+        fixture = self.server.fixtures.get(name)
+        if fixture is None:
+            self.send_error(404)
+            return
+
+        body, etag = fixture
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):  # keep benchmark output clean
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """Serves the fixtures on ``127.0.0.1`` (a free port by default) in a background thread.
+
+    Use as a context manager; ``base_url`` is the server root.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.fixtures: Dict[str, Tuple[bytes, str]] = {
+            name: _load(name) for name in os.listdir(FIXTURES)
+        }
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class StubRedditSource(RedditTrendSource):
+    """RedditTrendSource pointed at a StubServer instead of www.reddit.com."""
+
+    def __init__(self, base_url: str, subreddit: str = "news", **kwargs):
+        self.stub_url = base_url.rstrip("/")
+        super().__init__(subreddit, **kwargs)
+
+    def _listing_url(self, sort: str) -> str:
+        return f"{self.stub_url}/r/{self.subreddit}/{sort}.json"
@@ -0,0 +1,52 @@
+"""High-volume synthetic source for storage benchmarks."""
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from models import TrendBatch
+from youtube_source import YouTubeTrendSource
+
+
+class SyntheticYouTubeSource(YouTubeTrendSource):
+    """YouTubeTrendSource that produces unique, varied rows on every fetch.
+
+    Each fetch advances a simulated clock by ``step`` seconds and continues
+    a running video counter, so repeated fetches look like an ever-growing
+    history instead of the same ``limit`` rows again. ``distinct_urls`` caps
+    how many different videos exist (older ones reappear), which matters for
+    the dedupe backends.
+    """
+
+    def __init__(
+        self,
+        region: str = "US",
+        start: Optional[datetime] = None,
+        step: float = 60.0,
+        distinct_urls: int = 50000,
+    ):
+        super().__init__(region)
+        self.clock = start or datetime(2026, 1, 1, tzinfo=timezone.utc)
+        self.step = timedelta(seconds=step)
+        self.distinct_urls = distinct_urls
+        self.counter = 0
+
+    def fetch_batch(self, limit: int = 10, region: Optional[str] = None) -> TrendBatch:
+        """Return ``limit`` new rows stamped with the next simulated fetch time."""
+        limit, region = self._clean_args(limit, region)
+        self.clock += self.step
+        batch = TrendBatch()
+        for rank in range(1, limit + 1):
+            video = self.counter % self.distinct_urls
+            self.counter += 1
+            batch.append(
+                "youtube",
+                f"Synthetic video {video} ({region})",
+                f"https://youtube.com/watch?v=synthetic{video}",
+                (video * 7919) % 100000,
+                rank,
+                self.clock,
+            )
+        return batch
+
+    def fetch_trends(self, limit: int = 10, region: Optional[str] = None):
+        return list(self.fetch_batch(limit, region))
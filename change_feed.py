@@ -0,0 +1,375 @@
+"""Push-based change feed: publishes newly stored trends to subscribers.
+
+In-process consumers subscribe with a callback::
+
+    feed = ChangeFeed(db)
+    feed.subscribe(alert, platform="reddit", min_score=5000)
+    monitor = TrendMonitor(source, feed)   # saves go through the feed
+
+Local clients can follow the feed as Server-Sent Events::
+
+    python change_feed.py --backend sqlite --db trends.db --port 8081
+    curl -N "http://127.0.0.1:8081/events?platform=reddit&min_score=100"
+
+Every event carries a cursor (a SQLite row id or a Mongo ``_id``). A client
+that reconnects with ``Last-Event-ID`` (or ``?cursor=``) first gets what it
+missed, read from the database, and then the live stream.
+
+Cursors assume one writer process per Mongo database. SQLite row ids are
+assigned in commit order (writes are serialized), so any number of SQLite
+writers is fine. Mongo ObjectIds are made by each client, so with several
+writing processes a document can commit after a larger ``_id`` has been
+published and is then never delivered.
+"""
+
+import argparse
+import json
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import metrics
+from factory import create_db
+from models import TrendItem, Trends
+from server import item_json
+
+Cursor = Any  # int row id (SQLite) or ObjectId hex string (Mongo)
+Callback = Callable[[List[TrendItem], Cursor], None]
+
+
+class Subscription:
+    """One subscriber's callback and filters; returned by ChangeFeed.subscribe()."""
+
+    def __init__(self, callback: Callback, platform: Optional[str] = None, min_score: Optional[int] = None):
+        self.callback = callback
+        self.platform = platform
+        self.min_score = min_score
+
+    def select(self, items: List[TrendItem]) -> List[TrendItem]:
+        """The items that pass this subscription's filters."""
+        if self.platform is None and self.min_score is None:
+            return items
+        return [
+            t for t in items
+            if (self.platform is None or t.platform == self.platform)
+            and (self.min_score is None or t.score >= self.min_score)
+        ]
+
+
+class ChangeFeed:
+    """Wraps ``db`` and publishes every batch of newly stored rows.
+
+    It exposes the same ``save_trends`` method as the backends, so it can be
+    passed to TrendMonitor in place of the database. Other attributes are
+    forwarded to the wrapped backend.
+
+    - New rows are read back with the backend's ``get_since(cursor)``, so
+      every event has an exact, resumable cursor. Each row is published
+      once, in storage order. On Mongo this needs a single writer process
+      (see the module docstring).
+    - A save through the feed publishes straight away. start() also follows
+      writes made by other processes from a background thread. It uses a
+      Mongo change stream when the server supports one, and otherwise polls
+      every ``poll_interval`` seconds (SQLite checks ``data_version()``
+      first, so an idle poll costs one PRAGMA).
+    - Callbacks run on the publishing thread and should return quickly; an
+      exception in one is printed and does not affect the others.
+    """
+
+    def __init__(self, db, poll_interval: float = 1.0, batch_limit: int = 1000, cursor: Cursor = None):
+        self.db = db
+        self.poll_interval = poll_interval
+        self.batch_limit = batch_limit
+        self.cursor = cursor if cursor is not None else db.current_cursor()
+        self._subscribers: List[Subscription] = []
+        self._subscribers_lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._version: Any = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __getattr__(self, name):
+        # Reads and anything else not defined here go straight to the backend
+        return getattr(self.db, name)
+
+    def subscribe(
+        self, callback: Callback, platform: Optional[str] = None, min_score: Optional[int] = None
+    ) -> Subscription:
+        """Call ``callback(items, cursor)`` for each new batch with matching items."""
+        subscription = Subscription(callback, platform, min_score)
+        with self._subscribers_lock:
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Stop delivering to ``subscription``."""
+        with self._subscribers_lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def save_trends(self, trends: Trends) -> bool:
+        """Save through to the backend, then publish the new rows."""
+        ok = self.db.save_trends(trends)
+        if ok is not False and trends:
+            self.poll()
+        return ok
+
+    def poll(self) -> int:
+        """Publish every row stored since the last poll; returns how many."""
+        published = 0
+        with self._poll_lock:
+            while True:
+                items, cursor = self.db.get_since(self.cursor, limit=self.batch_limit)
+                if not items:
+                    return published
+                self.cursor = cursor
+                self._publish(items, cursor)
+                published += len(items)
+                if len(items) < self.batch_limit:
+                    return published
+
+    def _publish(self, items: List[TrendItem], cursor: Cursor) -> None:
+        metrics.inc("trendwatch_feed_rows_total", len(items))
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            selected = subscription.select(items)
+            if not selected:
+                continue
+            try:
+                subscription.callback(selected, cursor)
+            except Exception as exc:  # pylint: disable=broad-except
+                print(f"[ERROR] Change feed subscriber failed: {exc}")
+
+    def replay(
+        self, cursor: Cursor, platform: Optional[str] = None, min_score: Optional[int] = None
+    ) -> Iterator[Tuple[List[TrendItem], Cursor]]:
+        """Yield ``(items, cursor)`` for rows stored after ``cursor`` up to now, filtered."""
+        subscription = Subscription(lambda *_: None, platform, min_score)
+        while True:
+            items, next_cursor = self.db.get_since(cursor, limit=self.batch_limit)
+            if not items:
+                return
+            cursor = next_cursor
+            selected = subscription.select(items)
+            if selected:
+                yield selected, cursor
+            if len(items) < self.batch_limit:
+                return
+
+    def start(self) -> "ChangeFeed":
+        """Follow writes from other processes in a background thread; returns self."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="trendwatch-feed", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the background thread started by start()."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def close(self) -> None:
+        """Stop following and close the wrapped backend."""
+        self.stop()
+        close = getattr(self.db, "close", None)
+        if callable(close):
+            close()
+
+    def _run(self) -> None:
+        watch = getattr(self.db, "watch_inserts", None)
+        if callable(watch):
+            try:
+                with watch(max_await_ms=int(self.poll_interval * 1000)) as stream:
+                    while not self._stop.is_set():
+                        if stream.try_next() is not None:
+                            self._safe_poll()
+                return
+            except Exception as exc:  # pylint: disable=broad-except
+                print(f"[INFO] Change streams unavailable ({exc}); polling instead.")
+        while not self._stop.wait(self.poll_interval):
+            if self._changed():
+                self._safe_poll()
+
+    def _changed(self) -> bool:
+        """Cheap pre-check before get_since(): did the backend's data_version move?"""
+        data_version = getattr(self.db, "data_version", None)
+        if not callable(data_version):
+            return True
+        try:
+            version = data_version()
+        except Exception:  # pylint: disable=broad-except
+            return True
+        if version == self._version:
+            return False
+        self._version = version
+        return True
+
+    def _safe_poll(self) -> None:
+        try:
+            self.poll()
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"[ERROR] Change feed poll failed: {exc}")
+
+
+def _sse(items: List[TrendItem], cursor: Cursor) -> bytes:
+    data = json.dumps({"cursor": cursor, "items": [item_json(t) for t in items]}, separators=(",", ":"))
+    return f"id: {cursor}\nevent: trends\ndata: {data}\n\n".encode("utf-8")
+
+
+def _newer(cursor: Cursor, than: Cursor) -> bool:
+    """Whether ``cursor`` comes after ``than`` (None or "" come before everything).
+
+    Only meaningful for cursors from one writer; see the module docstring.
+    """
+    if than in (None, ""):
+        return True
+    if isinstance(cursor, int):
+        return cursor > int(than)
+    return str(cursor) > str(than)  # ObjectId hex strings have a fixed width
+
+
+class _EventsHandler(BaseHTTPRequestHandler):
+    server: "ChangeFeedServer"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Stream ``/events`` as Server-Sent Events until the client goes away."""
+        parts = urlsplit(self.path)
+        if parts.path.rstrip("/") != "/events":
+            self.send_error(404)
+            return
+        params = parse_qs(parts.query)
+        try:
+            platform = params.get("platform", [None])[0]
+            min_score = int(params["min_score"][0]) if "min_score" in params else None
+        except ValueError:
+            self.send_error(400, "min_score must be an integer")
+            return
+        cursor = self.headers.get("Last-Event-ID") or params.get("cursor", [None])[0]
+        feed = self.server.feed
+        if cursor:
+            try:
+                feed.db.get_since(cursor, limit=1)
+            except ValueError:
+                self.send_error(400, "invalid cursor")
+                return
+        events: "queue.Queue" = queue.Queue(maxsize=self.server.max_queue)
+        overflow = threading.Event()
+
+        def enqueue(items: List[TrendItem], batch_cursor: Cursor) -> None:
+            try:
+                events.put_nowait((items, batch_cursor))
+            except queue.Full:
+                overflow.set()  # too slow; the client resumes from its last id
+
+        # Subscribe before replaying so nothing falls between the two
+        subscription = feed.subscribe(enqueue, platform, min_score)
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            metrics.inc("trendwatch_feed_clients_total")
+
+            if cursor:
+                for items, batch_cursor in feed.replay(cursor, platform, min_score):
+                    self.wfile.write(_sse(items, batch_cursor))
+                    cursor = batch_cursor
+                self.wfile.flush()
+
+            while not overflow.is_set() and not self.server.stopping.is_set():
+                try:
+                    items, batch_cursor = events.get(timeout=self.server.heartbeat)
+                except queue.Empty:
+                    self.wfile.write(b": keep-alive\n\n")
+                    self.wfile.flush()
+                    continue
+                if not _newer(batch_cursor, cursor):
+                    continue  # already sent during replay
+                self.wfile.write(_sse(items, batch_cursor))
+                self.wfile.flush()
+                cursor = batch_cursor
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            feed.unsubscribe(subscription)
+
+    def log_message(self, *_args):
+        pass
+
+
+class ChangeFeedServer(ThreadingHTTPServer):
+    """Serves ``feed`` as Server-Sent Events on ``/events``, one thread per client.
+
+    Query parameters ``platform`` and ``min_score`` filter the stream. A
+    comment line is sent every ``heartbeat`` seconds so dead connections
+    are noticed. A client that falls ``max_queue`` batches behind is
+    disconnected and can resume with ``Last-Event-ID``.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        feed: ChangeFeed,
+        host: str = "127.0.0.1",
+        port: int = 8081,
+        heartbeat: float = 15.0,
+        max_queue: int = 1000,
+    ):
+        super().__init__((host, port), _EventsHandler)
+        self.feed = feed
+        self.heartbeat = heartbeat
+        self.max_queue = max_queue
+        self.stopping = threading.Event()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "ChangeFeedServer":
+        """Serve from a daemon thread; returns self."""
+        threading.Thread(target=self.serve_forever, name="trendwatch-feed-server", daemon=True).start()
+        return self
+
+    def server_close(self) -> None:
+        self.stopping.set()
+        super().server_close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point: follow a database and serve its changes as SSE."""
+    parser = argparse.ArgumentParser(description="TrendWatch change feed (Server-Sent Events)")
+    parser.add_argument("--backend", choices=["sqlite", "mongo"], default="sqlite")
+    parser.add_argument("--db", help="SQLite path (default trends.db) or Mongo URI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    if args.backend == "mongo":
+        db = create_db("mongo", **({"uri": args.db} if args.db else {}))
+    else:
+        db = create_db("sqlite", path=args.db or "trends.db", persistent=True, journal_mode="WAL")
+    feed = ChangeFeed(db, poll_interval=args.poll_interval).start()
+    server = ChangeFeedServer(feed, args.host, args.port)
+    print(f"[INFO] Change feed at {server.base_url}events")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        feed.close()
+        print("[INFO] Change feed stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Incremental near-duplicate story clustering across platforms.
+
+The same story often appears on several platforms under slightly different
+titles and URLs. StoryClusterer gives each incoming item a story cluster id:
+
+- Items whose URL (normalised by url_utils.story_url) is already known
+  reuse that URL's cluster.
+- Otherwise the title is reduced to character shingles and a MinHash
+  signature. Locality-sensitive hashing (the signature split into bands)
+  finds the few existing items that share at least one band. Only those
+  candidates are compared, so each item costs roughly constant time instead
+  of a comparison against everything seen so far.
+- The best candidate with an estimated Jaccard similarity of at least
+  ``threshold`` donates its cluster id; otherwise a new cluster starts.
+"""
+
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from models import TrendItem, trend_rows
+from url_utils import story_url
+
+# Largest prime below 2**32: a * h + b < 2**64 for a, b < P and 32-bit h
+_PRIME = 4294967291
+_WORD = re.compile(r"[^\W_]+")
+
+
+class StoryClusterer:
+    """Assigns story cluster ids to trend items, one batch at a time.
+
+    ``num_perm`` MinHash values are split into ``bands`` LSH bands; with the
+    defaults (64 values, 16 bands of 4) two titles with Jaccard similarity 0.5
+    collide in at least one band about 64% of the time, and 0.7 about 98%.
+    At most ``max_members`` URLs are remembered; the least recently seen are
+    forgotten first.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 16,
+        threshold: float = 0.5,
+        shingle_size: int = 4,
+        max_members: int = 100000,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.max_members = max_members
+        self.next_id = 1
+        rng = np.random.RandomState(seed)
+        # Random hash functions h -> (a * h + b) mod P, one per permutation
+        self._a = rng.randint(1, _PRIME, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.randint(0, _PRIME, size=num_perm, dtype=np.int64).astype(np.uint64)
+        # canonical URL -> (cluster id, signature), in least-recently-seen order
+        self._members: "OrderedDict[str, Tuple[int, Optional[np.ndarray]]]" = OrderedDict()
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(bands)]
+        self._lock = threading.Lock()  # monitors polled in parallel share one clusterer
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def _shingles(self, title: str) -> List[bytes]:
+        text = " ".join(_WORD.findall(title.lower()))
+        k = self.shingle_size
+        if len(text) <= k:
+            return [text.encode()] if text else []
+        return list({text[i:i + k].encode() for i in range(len(text) - k + 1)})
+
+    def signature(self, title: str) -> Optional[np.ndarray]:
+        """MinHash signature of a title (None for titles with no words)."""
+        return self.signatures([title])[0]
+
+    def signatures(self, titles: List[str]) -> List[Optional[np.ndarray]]:
+        """MinHash signatures of many titles, computed in one vectorised pass."""
+        shingled = [self._shingles(title) for title in titles]
+        counts = np.array([len(sh) for sh in shingled], dtype=np.int64)
+        if not counts.any():
+            return [None] * len(titles)
+        hashes = np.fromiter(
+            (zlib.crc32(s) for sh in shingled for s in sh), dtype=np.uint64, count=int(counts.sum())
+        )
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % np.uint64(_PRIME)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        nonempty = counts > 0
+        minima = np.minimum.reduceat(permuted, starts[nonempty], axis=1).astype(np.uint32)
+        result: List[Optional[np.ndarray]] = [None] * len(titles)
+        for column, index in enumerate(np.flatnonzero(nonempty).tolist()):
+            result[index] = minima[:, column].copy()
+        return result
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)
+        ]
+
+    def _match(self, signature: np.ndarray, keys: List[bytes]) -> Optional[int]:
+        """Cluster id of the most similar known item, if similar enough."""
+        candidates = set()
+        for band, key in zip(self._buckets, keys):
+            candidates.update(band.get(key, ()))
+        best_id, best_score = None, self.threshold
+        for url in candidates:
+            cluster_id, other = self._members[url]
+            score = float(np.mean(other == signature))
+            if score >= best_score:
+                best_id, best_score = cluster_id, score
+        return best_id
+
+    def _remember(
+        self,
+        url: str,
+        cluster_id: int,
+        signature: Optional[np.ndarray],
+        keys: Optional[List[bytes]] = None,
+    ) -> None:
+        if url in self._members:
+            self._members.move_to_end(url)
+            return
+        self._members[url] = (cluster_id, signature)
+        if signature is not None:
+            for band, key in zip(self._buckets, keys or self._band_keys(signature)):
+                band.setdefault(key, []).append(url)
+        while len(self._members) > self.max_members:
+            self._forget(*self._members.popitem(last=False))
+
+    def _forget(self, url: str, entry: Tuple[int, Optional[np.ndarray]]) -> None:
+        signature = entry[1]
+        if signature is None:
+            return
+        for band, key in zip(self._buckets, self._band_keys(signature)):
+            urls = band.get(key)
+            if urls is not None:
+                urls.remove(url)
+                if not urls:
+                    del band[key]
+
+    def assign(self, url: str, title: str, signature: Optional[np.ndarray] = None) -> int:
+        """Return the cluster id for one item, creating a cluster if needed."""
+        key = story_url(url)
+        known = self._members.get(key)
+        if known is not None:
+            self._members.move_to_end(key)
+            return known[0]
+
+        if signature is None:
+            signature = self.signature(title)
+        keys = self._band_keys(signature) if signature is not None else None
+        cluster_id = self._match(signature, keys) if keys else None
+        if cluster_id is None:
+            cluster_id = self.next_id
+            self.next_id += 1
+        self._remember(key, cluster_id, signature, keys)
+        return cluster_id
+
+    def assign_batch(self, trends: Iterable[TrendItem]) -> List[Tuple[str, str, int]]:
+        """Cluster a saved batch; returns (url, title, cluster id) per item.
+
+        Items are assigned in order, so near-duplicates within the batch end
+        up in the same cluster too.
+        """
+        pairs = [(url, title) for _p, title, url, _s, _r, _f in trend_rows(trends)]
+        signatures = self.signatures([title for _url, title in pairs])
+        with self._lock:
+            return [
+                (url, title, self.assign(url, title, signature))
+                for (url, title), signature in zip(pairs, signatures)
+            ]
+
+    def warm(self, db, limit: int = 20000) -> None:
+        """Reload the newest ``limit`` cluster assignments stored in ``db``."""
+        max_id, members = db.load_story_members(limit=limit)
+        # Oldest first, so the newest end up most recently seen
+        members = members[::-1]
+        signatures = self.signatures([title for _url, title, _id in members])
+        with self._lock:
+            self.next_id = max(self.next_id, max_id + 1)
+            for (url, _title, cluster_id), signature in zip(members, signatures):
+                self._remember(story_url(url), cluster_id, signature)
@@ -1,103 +1,838 @@
 """SQLite implementation of the TrendWatch database backend."""
 import sqlite3
-from typing import List
-from datetime import datetime
-from models import TrendItem
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from datetime import datetime, timedelta, timezone
+from models import (
+    StorySummary, TrendBatch, TrendItem, TrendPage, TrendSummary, Trends, trend_rows,
+)
+from url_utils import canonical_url
+import metrics
+
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version.
+# Append new steps; never edit one that has already shipped.
+MIGRATIONS: List[str] = [
+    # 1: composite indexes for the filtered / keyset-paginated query API
+    """
+    CREATE INDEX IF NOT EXISTS idx_trends_platform_fetched
+        ON trends (platform, fetched_at);
+    CREATE INDEX IF NOT EXISTS idx_trends_fetched
+        ON trends (fetched_at);
+    """,
+    # 2: normalized storage for dedupe mode - one row per canonical URL plus
+    #    compact rank/score snapshots, exposed through the trend_history view
+    """
+    CREATE TABLE IF NOT EXISTS trend_urls (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        url TEXT NOT NULL UNIQUE,
+        platform TEXT NOT NULL,
+        title TEXT NOT NULL,
+        first_seen TEXT NOT NULL,
+        last_seen TEXT NOT NULL,
+        peak_score INTEGER NOT NULL,
+        last_score INTEGER NOT NULL,
+        last_rank INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_trend_urls_platform_last_seen
+        ON trend_urls (platform, last_seen);
+    CREATE TABLE IF NOT EXISTS trend_snapshots (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        url_id INTEGER NOT NULL REFERENCES trend_urls (id),
+        fetched_at TEXT NOT NULL,
+        score INTEGER NOT NULL,
+        rank INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_trend_snapshots_url_fetched
+        ON trend_snapshots (url_id, fetched_at);
+    CREATE INDEX IF NOT EXISTS idx_trend_snapshots_fetched
+        ON trend_snapshots (fetched_at);
+    CREATE VIEW IF NOT EXISTS trend_history AS
+        SELECT s.id AS id, u.platform AS platform, u.title AS title,
+               u.url AS url, s.score AS score, s.rank AS rank,
+               s.fetched_at AS fetched_at
+        FROM trend_snapshots AS s
+        JOIN trend_urls AS u ON u.id = s.url_id;
+    """,
+    # 3: hourly / daily rollup tiers used by retention
+    """
+    CREATE TABLE IF NOT EXISTS trends_hourly (
+        bucket TEXT NOT NULL,
+        url TEXT NOT NULL,
+        platform TEXT NOT NULL,
+        title TEXT NOT NULL,
+        max_score INTEGER NOT NULL,
+        best_rank INTEGER NOT NULL,
+        appearances INTEGER NOT NULL,
+        PRIMARY KEY (bucket, url)
+    );
+    CREATE TABLE IF NOT EXISTS trends_daily (
+        bucket TEXT NOT NULL,
+        url TEXT NOT NULL,
+        platform TEXT NOT NULL,
+        title TEXT NOT NULL,
+        max_score INTEGER NOT NULL,
+        best_rank INTEGER NOT NULL,
+        appearances INTEGER NOT NULL,
+        PRIMARY KEY (bucket, url)
+    );
+    CREATE INDEX IF NOT EXISTS idx_trends_daily_platform_bucket
+        ON trends_daily (platform, bucket);
+    """,
+    # 4: full-text search over titles, kept in sync by triggers
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS trends_fts
+        USING fts5(title, content='trends', content_rowid='id');
+    CREATE TRIGGER IF NOT EXISTS trends_fts_insert AFTER INSERT ON trends BEGIN
+        INSERT INTO trends_fts (rowid, title) VALUES (new.id, new.title);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trends_fts_delete AFTER DELETE ON trends BEGIN
+        INSERT INTO trends_fts (trends_fts, rowid, title) VALUES ('delete', old.id, old.title);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trends_fts_update AFTER UPDATE OF title ON trends BEGIN
+        INSERT INTO trends_fts (trends_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO trends_fts (rowid, title) VALUES (new.id, new.title);
+    END;
+    INSERT INTO trends_fts (trends_fts) VALUES ('rebuild');
+
+    CREATE VIRTUAL TABLE IF NOT EXISTS trend_urls_fts
+        USING fts5(title, content='trend_urls', content_rowid='id');
+    CREATE TRIGGER IF NOT EXISTS trend_urls_fts_insert AFTER INSERT ON trend_urls BEGIN
+        INSERT INTO trend_urls_fts (rowid, title) VALUES (new.id, new.title);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trend_urls_fts_delete AFTER DELETE ON trend_urls BEGIN
+        INSERT INTO trend_urls_fts (trend_urls_fts, rowid, title)
+            VALUES ('delete', old.id, old.title);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trend_urls_fts_update AFTER UPDATE OF title ON trend_urls
+    WHEN old.title IS NOT new.title BEGIN
+        INSERT INTO trend_urls_fts (trend_urls_fts, rowid, title)
+            VALUES ('delete', old.id, old.title);
+        INSERT INTO trend_urls_fts (rowid, title) VALUES (new.id, new.title);
+    END;
+    INSERT INTO trend_urls_fts (trend_urls_fts) VALUES ('rebuild');
+    """,
+    # 5: story clusters (near-duplicate items across URLs and platforms)
+    """
+    CREATE TABLE IF NOT EXISTS stories (
+        cluster_id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS story_urls (
+        url TEXT PRIMARY KEY,
+        cluster_id INTEGER NOT NULL,
+        title TEXT NOT NULL,
+        assigned_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_story_urls_cluster ON story_urls (cluster_id);
+    CREATE INDEX IF NOT EXISTS idx_story_urls_assigned ON story_urls (assigned_at);
+    """,
+]
+
+# Upsert one rollup row per (bucket, url), merging with what is already there.
+_ROLLUP_UPSERT = """
+    ON CONFLICT (bucket, url) DO UPDATE SET
+        title = excluded.title,
+        max_score = MAX(max_score, excluded.max_score),
+        best_rank = MIN(best_rank, excluded.best_rank),
+        appearances = appearances + excluded.appearances
+"""
+
+
+def _utc_iso(when: datetime) -> str:
+    """``when`` as UTC ISO text, comparable with stored ``fetched_at`` (naive means UTC)."""
+    if when.tzinfo is None:
+        return when.replace(tzinfo=timezone.utc).isoformat()
+    return when.astimezone(timezone.utc).isoformat()
 
 
 class TrendDatabase:
-    """Handles storing and retrieving trending data using SQLite."""
+    """Handles storing and retrieving trending data using SQLite.
+
+    By default every call opens and closes its own connection. With
+    ``persistent=True`` each thread keeps one long-lived connection instead
+    (a small per-thread pool), and writes are serialised with a lock.
 
-    def __init__(self, path: str = "trends.db"):
+    ``journal_mode``, ``synchronous`` and ``cache_size`` are applied as PRAGMAs
+    on every new connection when given. ``journal_mode="WAL"`` lets readers
+    run while a write is in progress, and ``synchronous="NORMAL"`` avoids an
+    fsync on every commit in WAL mode.
+
+    With ``dedupe=True`` trends are stored normalized instead of appended to
+    the ``trends`` table: one ``trend_urls`` row per canonical URL (first
+    seen, last seen, peak score) plus a small ``trend_snapshots`` row per
+    fetch. Reads go through the ``trend_history`` view, so get_latest() and
+    query() behave the same in both modes.
+    """
+
+    def __init__(
+        self,
+        path: str = "trends.db",
+        persistent: bool = False,
+        journal_mode: Optional[str] = None,
+        synchronous: Optional[str] = None,
+        cache_size: Optional[int] = None,
+        busy_timeout: float = 5.0,
+        dedupe: bool = False,
+    ):
         self.path = path
+        self.dedupe = dedupe
+        self._history = "trend_history" if dedupe else "trends"
+        self.persistent = persistent
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size = cache_size
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._all_conns: List[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
+        self._version_conn: Optional[sqlite3.Connection] = None
+        self._version_lock = threading.Lock()
         self._create_table_if_needed()
 
-    def _create_table_if_needed(self) -> None:
-        """Create the trends table if it doesn't already exist."""
-        conn = sqlite3.connect(self.path)
-        cur = conn.cursor()
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS trends (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                platform TEXT NOT NULL,
-                title TEXT NOT NULL,
-                url TEXT NOT NULL,
-                score INTEGER NOT NULL,
-                rank INTEGER NOT NULL,
-                fetched_at TEXT NOT NULL
-            )
-            """
+    def _open(self) -> sqlite3.Connection:
+        """Open a new connection and apply the configured PRAGMAs."""
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            check_same_thread=not self.persistent,
         )
-        conn.commit()
-        conn.close()
+        if self.journal_mode:
+            conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        if self.synchronous:
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        if self.cache_size is not None:
+            conn.execute(f"PRAGMA cache_size={int(self.cache_size)}")
+        return conn
 
-    def save_trends(self, trends: List[TrendItem]) -> None:
-        """Save a list of TrendItem objects into the database."""
-        if not trends:
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Yield a connection: the thread's long-lived one, or a fresh one."""
+        if not self.persistent:
+            conn = self._open()
+            try:
+                yield conn
+            finally:
+                conn.close()
             return
 
-        try:
-            conn = sqlite3.connect(self.path)
-            cur = conn.cursor()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            with self._conns_lock:
+                self._all_conns.append(conn)
+        yield conn
+
+    def data_version(self) -> int:
+        """Return a number that changes whenever any connection commits a write.
 
-            rows = [
-                (
-                    t.platform,
-                    t.title,
-                    t.url,
-                    t.score,
-                    t.rank,
-                    t.fetched_at.isoformat(),
+        Uses ``PRAGMA data_version`` on a dedicated connection that never
+        writes, so commits from this process and from other processes both
+        show up. Readers use it to tell whether cached results are stale.
+        """
+        with self._version_lock:
+            if self._version_conn is None:
+                self._version_conn = sqlite3.connect(
+                    self.path, timeout=self.busy_timeout, check_same_thread=False
                 )
-                for t in trends
-            ]
+            return self._version_conn.execute("PRAGMA data_version").fetchone()[0]
 
-            cur.executemany(
+    def close(self) -> None:
+        """Close all long-lived connections (no-op in per-call mode)."""
+        with self._version_lock:
+            if self._version_conn is not None:
+                self._version_conn.close()
+                self._version_conn = None
+        with self._conns_lock:
+            conns, self._all_conns = self._all_conns, []
+        for conn in conns:
+            try:
+                conn.close()
+            except Exception:  # pylint: disable=broad-except
+                pass
+        self._local = threading.local()
+
+    def _create_table_if_needed(self) -> None:
+        """Create the trends table if it doesn't already exist."""
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS trends (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    platform TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    score INTEGER NOT NULL,
+                    rank INTEGER NOT NULL,
+                    fetched_at TEXT NOT NULL
+                )
                 """
-                INSERT INTO trends (platform, title, url, score, rank, fetched_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                rows,
             )
             conn.commit()
+            self._migrate(conn)
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """Bring the schema up to date by running any pending MIGRATIONS."""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+            conn.executescript(script)
+            conn.execute(f"PRAGMA user_version={number}")
+            conn.commit()
+
+    def save_trends(self, trends: Trends) -> bool:
+        """Save a list of TrendItem objects (or a TrendBatch) into the database.
+
+        Returns False if the write failed (the error is printed, not raised).
+        """
+        if not trends:
+            return True
+
+        try:
+            with metrics.timed("trendwatch_db_seconds", backend="sqlite", op="save_trends"), \
+                    self._write_lock, self._connect() as conn:
+                try:
+                    if self.dedupe:
+                        self._upsert_trends(conn, trends)
+                    else:
+                        self._insert_trends(conn, trends)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
 
         except Exception as exc:  # pylint: disable=broad-except
             print(f"[ERROR] SQLite save failed: {exc}")
+            metrics.inc("trendwatch_db_errors_total", backend="sqlite", op="save_trends")
+            return False
+        metrics.inc("trendwatch_db_rows_written_total", len(trends), backend="sqlite")
+        return True
 
-        finally:
-            try:
-                conn.close()
-            except Exception:  # pylint: disable=broad-except
-                pass
+    @staticmethod
+    def _insert_trends(conn: sqlite3.Connection, trends: Trends) -> None:
+        """Append one full row per item to the trends table."""
+        conn.executemany(
+            """
+            INSERT INTO trends (platform, title, url, score, rank, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            trend_rows(trends),
+        )
 
-    def get_latest(self, limit: int = 10) -> List[TrendItem]:
-        """Return the newest saved trends, ordered by most recent first."""
-        conn = sqlite3.connect(self.path)
-        cur = conn.cursor()
+    @staticmethod
+    def _upsert_trends(conn: sqlite3.Connection, trends: Trends) -> None:
+        """Upsert one trend_urls row per canonical URL and add snapshots."""
+        url_rows = []
+        snapshot_rows = []
+        for platform, title, url, score, rank, fetched_at in trend_rows(trends):
+            url = canonical_url(url)
+            url_rows.append(
+                (url, platform, title, fetched_at, fetched_at, score, score, rank)
+            )
+            snapshot_rows.append((fetched_at, score, rank, url))
 
-        cur.execute(
+        conn.executemany(
             """
-            SELECT platform, title, url, score, rank, fetched_at
-            FROM trends
-            ORDER BY id DESC
-            LIMIT ?
+            INSERT INTO trend_urls (url, platform, title, first_seen, last_seen,
+                                    peak_score, last_score, last_rank)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (url) DO UPDATE SET
+                title = excluded.title,
+                first_seen = MIN(first_seen, excluded.first_seen),
+                last_seen = MAX(last_seen, excluded.last_seen),
+                peak_score = MAX(peak_score, excluded.peak_score),
+                last_score = excluded.last_score,
+                last_rank = excluded.last_rank
             """,
-            (limit,),
+            url_rows,
         )
-        rows = cur.fetchall()
-        conn.close()
-
-        items: List[TrendItem] = []
-        for platform, title, url, score, rank, fetched_at in rows:
-            items.append(
-                TrendItem(
-                    platform=platform,
-                    title=title,
-                    url=url,
-                    score=int(score),
-                    rank=int(rank),
-                    fetched_at=datetime.fromisoformat(fetched_at),
-                )
+        conn.executemany(
+            """
+            INSERT INTO trend_snapshots (url_id, fetched_at, score, rank)
+            SELECT id, ?, ?, ? FROM trend_urls WHERE url = ?
+            """,
+            snapshot_rows,
+        )
+
+    def get_latest(
+        self, limit: int = 10, as_batch: bool = False
+    ) -> Union[List[TrendItem], TrendBatch]:
+        """Return the newest saved trends, ordered by most recent first.
+
+        With ``as_batch=True`` the rows are streamed straight into a
+        TrendBatch, which needs far less memory for large limits.
+        """
+        with metrics.timed("trendwatch_db_seconds", backend="sqlite", op="get_latest"), \
+                self._connect() as conn:
+            cursor = conn.execute(
+                f"""
+                SELECT platform, title, url, score, rank, fetched_at
+                FROM {self._history}
+                ORDER BY id DESC
+                LIMIT ?
+                """,
+                (limit,),
             )
-        return items
+            if as_batch:
+                batch = TrendBatch()
+                for row in cursor:
+                    batch.append_row(row)
+                return batch
+            rows = cursor.fetchall()
+
+        return [self._row_to_item(row) for row in rows]
+
+    def query(
+        self,
+        platform: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        min_score: Optional[int] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> TrendPage:
+        """Return one page of trends matching the filters, newest first.
+
+        ``since`` is inclusive and ``until`` exclusive. Pass the returned
+        ``next_cursor`` back in to get the following page; pagination is
+        keyset-based on (fetched_at, id), so deep pages cost the same as the
+        first one.
+        """
+        where: List[str] = []
+        params: list = []
+        if platform is not None:
+            where.append("platform = ?")
+            params.append(platform)
+        if since is not None:
+            where.append("fetched_at >= ?")
+            params.append(_utc_iso(since))
+        if until is not None:
+            where.append("fetched_at < ?")
+            params.append(_utc_iso(until))
+        if min_score is not None:
+            where.append("score >= ?")
+            params.append(int(min_score))
+        if cursor:
+            try:
+                cur_fetched, cur_id = cursor.rsplit("|", 1)
+                params.extend([cur_fetched, int(cur_id)])
+            except ValueError as exc:
+                raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+            where.append("(fetched_at, id) < (?, ?)")
+
+        sql = (
+            "SELECT platform, title, url, score, rank, fetched_at, id "
+            f"FROM {self._history}"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY fetched_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = f"{last[5]}|{last[6]}"
+        return TrendPage(
+            items=[self._row_to_item(row) for row in rows], next_cursor=next_cursor
+        )
+
+    def search(
+        self,
+        text: str,
+        platform: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 20,
+    ) -> List[TrendItem]:
+        """Find trends whose title contains every word of ``text``, best match first.
+
+        Uses the FTS5 index (bm25 ranking). Each URL appears once, with its
+        most recent observation in the ``since``/``until`` window. Words are
+        matched as plain terms; FTS query syntax in ``text`` is not interpreted.
+        """
+        match = _fts_query(text)
+        if not match:
+            return []
+
+        if self.dedupe:
+            where = ["trend_urls_fts MATCH ?"]
+            params: list = [match]
+            if platform is not None:
+                where.append("u.platform = ?")
+                params.append(platform)
+            if since is not None:
+                where.append("u.last_seen >= ?")
+                params.append(_utc_iso(since))
+            if until is not None:
+                where.append("u.first_seen < ?")
+                params.append(_utc_iso(until))
+            sql = (
+                "SELECT u.platform, u.title, u.url, u.last_score, u.last_rank, u.last_seen "
+                "FROM trend_urls_fts CROSS JOIN trend_urls AS u ON u.id = trend_urls_fts.rowid "
+                f"WHERE {' AND '.join(where)} "
+                "ORDER BY bm25(trend_urls_fts), u.last_seen DESC LIMIT ?"
+            )
+        else:
+            where = ["trends_fts MATCH ?"]
+            params = [match]
+            if platform is not None:
+                where.append("t.platform = ?")
+                params.append(platform)
+            if since is not None:
+                where.append("t.fetched_at >= ?")
+                params.append(_utc_iso(since))
+            if until is not None:
+                where.append("t.fetched_at < ?")
+                params.append(_utc_iso(until))
+            # MATERIALIZED keeps bm25() inside the FTS query, then only the
+            # newest hit per URL is kept. CROSS JOIN (here and above) makes
+            # the FTS index drive the join instead of probing it once per
+            # row of a platform index scan.
+            sql = (
+                "WITH hits AS MATERIALIZED ("
+                "SELECT t.platform, t.title, t.url, t.score, t.rank, t.fetched_at, "
+                "t.id, bm25(trends_fts) AS relevance "
+                "FROM trends_fts CROSS JOIN trends AS t ON t.id = trends_fts.rowid "
+                f"WHERE {' AND '.join(where)}), "
+                "ranked AS (SELECT *, ROW_NUMBER() OVER ("
+                "PARTITION BY url ORDER BY fetched_at DESC, id DESC) AS newest FROM hits) "
+                "SELECT platform, title, url, score, rank, fetched_at FROM ranked "
+                "WHERE newest = 1 ORDER BY relevance, fetched_at DESC LIMIT ?"
+            )
+        params.append(limit)
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [self._row_to_item(row) for row in rows]
+
+    def current_cursor(self) -> int:
+        """Change-feed cursor for "now": the id of the newest stored row (0 if none)."""
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT MAX(id) FROM {self._history}").fetchone()
+        return row[0] or 0
+
+    def get_since(
+        self, cursor: Optional[Union[int, str]] = None, limit: int = 1000
+    ) -> Tuple[List[TrendItem], int]:
+        """Return up to ``limit`` rows stored after ``cursor``, oldest first, and the new cursor.
+
+        Cursors are row ids; None starts from the beginning. Pass the
+        returned cursor back in to continue where the last call stopped.
+        """
+        after = int(cursor) if cursor not in (None, "") else 0
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT platform, title, url, score, rank, fetched_at, id
+                FROM {self._history}
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+                """,
+                (after, limit),
+            ).fetchall()
+        if not rows:
+            return [], after
+        return [self._row_to_item(row) for row in rows], rows[-1][6]
+
+    def iter_chunks(self, chunk_size: int = 5000) -> Iterator[TrendBatch]:
+        """Yield every stored trend, oldest first, as TrendBatch chunks.
+
+        Walks the table with ``id > last_id`` pages rather than one
+        long-running cursor, so memory stays at one chunk and no read
+        transaction is held open between chunks.
+        """
+        last_id = 0
+        while True:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    f"""
+                    SELECT platform, title, url, score, rank, fetched_at, id
+                    FROM {self._history}
+                    WHERE id > ?
+                    ORDER BY id
+                    LIMIT ?
+                    """,
+                    (last_id, chunk_size),
+                ).fetchall()
+            if not rows:
+                return
+            batch = TrendBatch()
+            for row in rows:
+                batch.append_row(row[:6])
+            last_id = rows[-1][6]
+            yield batch
+
+    def apply_retention(self, policy) -> Dict[str, int]:
+        """Roll old rows into hourly/daily aggregates and delete them in batches.
+
+        ``policy`` is a retention.RetentionPolicy. Each batch is its own short
+        transaction, so writers are never locked out for long. Returns counts
+        of rows rolled up or deleted per tier.
+        """
+        now = datetime.now(timezone.utc)
+        raw_cutoff = (now - timedelta(days=policy.raw_days)).isoformat()
+        hourly_cutoff = (now - timedelta(days=policy.hourly_days)).strftime("%Y-%m-%dT%H")
+        raw_table = "trend_snapshots" if self.dedupe else "trends"
+
+        report = {"raw_rolled": 0, "hourly_rolled": 0, "daily_expired": 0}
+        report["raw_rolled"] = self._roll_up(
+            select_ids=f"SELECT id FROM {raw_table} WHERE fetched_at < ? ORDER BY id LIMIT ?",
+            cutoff=raw_cutoff,
+            rollup=f"""
+                INSERT INTO trends_hourly
+                    (bucket, url, platform, title, max_score, best_rank, appearances)
+                SELECT substr(fetched_at, 1, 13), url, platform, MAX(title),
+                       MAX(score), MIN(rank), COUNT(*)
+                FROM {self._history}
+                WHERE id IN (SELECT id FROM temp.retention_batch)
+                GROUP BY substr(fetched_at, 1, 13), url
+                {_ROLLUP_UPSERT}
+            """,
+            delete=f"DELETE FROM {raw_table} WHERE id IN (SELECT id FROM temp.retention_batch)",
+            batch_size=policy.batch_size,
+        )
+        report["hourly_rolled"] = self._roll_up(
+            select_ids="SELECT rowid FROM trends_hourly WHERE bucket < ? ORDER BY rowid LIMIT ?",
+            cutoff=hourly_cutoff,
+            rollup=f"""
+                INSERT INTO trends_daily
+                    (bucket, url, platform, title, max_score, best_rank, appearances)
+                SELECT substr(bucket, 1, 10), url, platform, MAX(title),
+                       MAX(max_score), MIN(best_rank), SUM(appearances)
+                FROM trends_hourly
+                WHERE rowid IN (SELECT id FROM temp.retention_batch)
+                GROUP BY substr(bucket, 1, 10), url
+                {_ROLLUP_UPSERT}
+            """,
+            delete="DELETE FROM trends_hourly WHERE rowid IN (SELECT id FROM temp.retention_batch)",
+            batch_size=policy.batch_size,
+        )
+        if policy.daily_days is not None:
+            daily_cutoff = (now - timedelta(days=policy.daily_days)).strftime("%Y-%m-%d")
+            report["daily_expired"] = self._roll_up(
+                select_ids="SELECT rowid FROM trends_daily WHERE bucket < ? ORDER BY rowid LIMIT ?",
+                cutoff=daily_cutoff,
+                rollup=None,
+                delete="DELETE FROM trends_daily WHERE rowid IN (SELECT id FROM temp.retention_batch)",
+                batch_size=policy.batch_size,
+            )
+
+        if policy.vacuum and any(report.values()):
+            self._vacuum(policy.vacuum)
+        return report
+
+    def _roll_up(
+        self,
+        select_ids: str,
+        cutoff: str,
+        rollup: Optional[str],
+        delete: str,
+        batch_size: int,
+    ) -> int:
+        """Repeatedly pick a batch of expired ids, aggregate them, then delete them."""
+        total = 0
+        while True:
+            with self._write_lock, self._connect() as conn:
+                try:
+                    conn.execute(
+                        "CREATE TEMP TABLE IF NOT EXISTS retention_batch (id INTEGER PRIMARY KEY)"
+                    )
+                    conn.execute("DELETE FROM temp.retention_batch")
+                    conn.execute(
+                        f"INSERT INTO temp.retention_batch (id) {select_ids}",
+                        (cutoff, batch_size),
+                    )
+                    count = conn.execute("SELECT COUNT(*) FROM temp.retention_batch").fetchone()[0]
+                    if count:
+                        if rollup:
+                            conn.execute(rollup)
+                        conn.execute(delete)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            total += count
+            if count < batch_size:
+                return total
+
+    def _vacuum(self, mode: str) -> None:
+        """Give freed pages back to the filesystem."""
+        with self._write_lock, self._connect() as conn:
+            if mode == "full":
+                conn.execute("VACUUM")
+                return
+            # auto_vacuum: 0 = NONE, 1 = FULL, 2 = INCREMENTAL. Switching to
+            # INCREMENTAL only takes effect after one full VACUUM.
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.execute("VACUUM")
+            conn.execute("PRAGMA incremental_vacuum")
+
+    def save_story_clusters(self, assignments: Iterable[Tuple[str, str, int]]) -> bool:
+        """Store (url, title, cluster id) assignments from clustering.StoryClusterer.
+
+        Returns False if the write failed (the error is printed, not raised).
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        rows = [
+            (canonical_url(url) if self.dedupe else url, title, cluster_id, now)
+            for url, title, cluster_id in assignments
+        ]
+        if not rows:
+            return True
+        try:
+            with self._write_lock, self._connect() as conn:
+                try:
+                    conn.executemany(
+                        "INSERT INTO stories (cluster_id, title, created_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT (cluster_id) DO NOTHING",
+                        ((cluster_id, title, at) for _url, title, cluster_id, at in rows),
+                    )
+                    conn.executemany(
+                        """
+                        INSERT INTO story_urls (url, title, cluster_id, assigned_at)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT (url) DO UPDATE SET
+                            title = excluded.title,
+                            cluster_id = excluded.cluster_id,
+                            assigned_at = excluded.assigned_at
+                        """,
+                        rows,
+                    )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"[ERROR] SQLite story cluster save failed: {exc}")
+            return False
+        return True
+
+    def load_story_members(self, limit: int = 20000) -> Tuple[int, List[Tuple[str, str, int]]]:
+        """Return the highest cluster id and the newest (url, title, cluster id) assignments."""
+        with self._connect() as conn:
+            max_id = conn.execute("SELECT COALESCE(MAX(cluster_id), 0) FROM stories").fetchone()[0]
+            rows = conn.execute(
+                "SELECT url, title, cluster_id FROM story_urls "
+                "ORDER BY assigned_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return max_id, rows
+
+    def get_stories(
+        self,
+        limit: int = 10,
+        since: Optional[datetime] = None,
+        platform: Optional[str] = None,
+    ) -> List[StorySummary]:
+        """Return story clusters by aggregate popularity (sum of per-URL peak scores).
+
+        Only observations at or after ``since`` count; pass it on large
+        histories so the fetched_at index bounds the scan.
+        """
+        where: List[str] = []
+        params: list = []
+        if since is not None:
+            where.append("fetched_at >= ?")
+            params.append(_utc_iso(since))
+        if platform is not None:
+            where.append("platform = ?")
+            params.append(platform)
+        sql = (
+            "WITH per_url AS ("
+            "SELECT url, platform, MAX(score) AS peak, COUNT(*) AS seen, "
+            "MIN(fetched_at) AS first_seen, MAX(fetched_at) AS last_seen "
+            f"FROM {self._history}"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + " GROUP BY url, platform) "
+            "SELECT c.cluster_id, s.title, GROUP_CONCAT(DISTINCT p.platform), "
+            "COUNT(DISTINCT p.url), SUM(p.peak), MAX(p.peak), SUM(p.seen), "
+            "MIN(p.first_seen), MAX(p.last_seen) "
+            "FROM per_url AS p "
+            "JOIN story_urls AS c ON c.url = p.url "
+            "JOIN stories AS s ON s.cluster_id = c.cluster_id "
+            "GROUP BY c.cluster_id ORDER BY SUM(p.peak) DESC, MAX(p.last_seen) DESC LIMIT ?"
+        )
+        params.append(limit)
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        return [
+            StorySummary(
+                cluster_id=cluster_id,
+                title=title,
+                platforms=sorted(platforms.split(",")),
+                urls=urls,
+                total_score=int(total),
+                peak_score=int(peak),
+                appearances=int(seen),
+                first_seen=datetime.fromisoformat(first_seen),
+                last_seen=datetime.fromisoformat(last_seen),
+            )
+            for cluster_id, title, platforms, urls, total, peak, seen, first_seen, last_seen
+            in rows
+        ]
+
+    def get_summaries(
+        self, limit: int = 10, platform: Optional[str] = None
+    ) -> List[TrendSummary]:
+        """Return per-URL summaries (dedupe mode), most recently seen first."""
+        if not self.dedupe:
+            return []
+        sql = (
+            "SELECT url, platform, title, first_seen, last_seen, peak_score, "
+            "last_score, last_rank FROM trend_urls"
+        )
+        params: list = []
+        if platform is not None:
+            sql += " WHERE platform = ?"
+            params.append(platform)
+        sql += " ORDER BY last_seen DESC LIMIT ?"
+        params.append(limit)
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        return [
+            TrendSummary(
+                url=url,
+                platform=platform_,
+                title=title,
+                first_seen=datetime.fromisoformat(first_seen),
+                last_seen=datetime.fromisoformat(last_seen),
+                peak_score=int(peak_score),
+                last_score=int(last_score),
+                last_rank=int(last_rank),
+            )
+            for url, platform_, title, first_seen, last_seen, peak_score, last_score, last_rank
+            in rows
+        ]
+
+    @staticmethod
+    def _row_to_item(row: tuple) -> TrendItem:
+        """Convert a (platform, title, url, score, rank, fetched_at, ...) row."""
+        platform, title, url, score, rank, fetched_at = row[:6]
+        return TrendItem(
+            platform=platform,
+            title=title,
+            url=url,
+            score=int(score),
+            rank=int(rank),
+            fetched_at=datetime.fromisoformat(fetched_at),
+        )
+
+
+def _fts_query(text: str) -> str:
+    """Quote each word of ``text`` as an FTS5 string so all of them must match."""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
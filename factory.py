@@ -0,0 +1,68 @@
+"""Factories that build databases and sources from plain config values.
+
+Backend and source modules are imported lazily so that only the ones
+actually configured are loaded (``pymongo``, ``scrapy`` and ``requests`` are
+slow to import).
+"""
+
+from typing import Any, Dict
+
+from base_source import BaseTrendSource
+
+
+def create_db(backend: str = "sqlite", **options: Any):
+    """Create a TrendDatabase ("sqlite") or MongoTrendDB ("mongo")."""
+    if backend == "mongo":
+        from mongo_db import MongoTrendDB  # pylint: disable=import-outside-toplevel
+        return MongoTrendDB(**options)
+    if backend == "sqlite":
+        from db import TrendDatabase  # pylint: disable=import-outside-toplevel
+        return TrendDatabase(**options)
+    raise ValueError(f"Unknown backend: {backend!r}")
+
+
+def create_source(spec: Dict[str, Any]) -> BaseTrendSource:
+    """Create a source from a config dict such as ``{"type": "reddit", "subreddit": "news"}``.
+
+    Supported types: ``reddit`` (``subreddit``, ``sort``, ``time_filter``), ``youtube`` (``region``) and
+    ``web`` (Hacker News; ``engine`` is ``scrapy`` or ``lxml`` for the lighter
+    hn_source.HNWebSource, with optional ``pages``).
+    """
+    kind = spec.get("type", "reddit")
+    if kind == "reddit":
+        from reddit_source import RedditTrendSource  # pylint: disable=import-outside-toplevel
+        return RedditTrendSource(
+            spec.get("subreddit", "news"),
+            sort=spec.get("sort", "top"),
+            time_filter=spec.get("time_filter", "day"),
+        )
+    if kind == "youtube":
+        from youtube_source import YouTubeTrendSource  # pylint: disable=import-outside-toplevel
+        return YouTubeTrendSource(region=spec.get("region", "US"))
+    if kind == "web":
+        engine = spec.get("engine", "scrapy")
+        if engine == "lxml":
+            from hn_source import HNWebSource  # pylint: disable=import-outside-toplevel
+            return HNWebSource(pages=spec.get("pages"))
+        if engine == "scrapy":
+            from scrapy_source import ScrapyHNSource  # pylint: disable=import-outside-toplevel
+            return ScrapyHNSource(pages=spec.get("pages"))
+        raise ValueError(f"Unknown web engine: {engine!r}")
+    raise ValueError(f"Unknown source type: {kind!r}")
+
+
+def parse_source_spec(text: str) -> Dict[str, Any]:
+    """Turn a command-line source such as ``reddit:news`` or ``youtube:DE`` into a spec dict.
+
+    The part after the colon is the subreddit for ``reddit``, the region for
+    ``youtube`` and the engine (``scrapy`` or ``lxml``) for ``web``.
+    """
+    kind, _, arg = text.partition(":")
+    kind = kind.strip().lower() or "reddit"
+    spec: Dict[str, Any] = {"type": kind}
+    if arg:
+        key = {"reddit": "subreddit", "youtube": "region", "web": "engine"}.get(kind)
+        if key is None:
+            raise ValueError(f"Source type {kind!r} takes no argument: {text!r}")
+        spec[key] = arg
+    return spec
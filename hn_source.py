@@ -0,0 +1,181 @@
+"""Hacker News trend source that parses listing pages with lxml instead of Scrapy."""
+
+import math
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import urljoin
+
+import requests
+from lxml import etree
+
+import metrics
+from base_source import BaseTrendSource
+from http_client import HTTPCache, default_cache, get_session
+from models import TrendItem
+
+HN_URL = "https://news.ycombinator.com/"
+HN_PAGE_SIZE = 30
+
+# Plain etree elements are cheaper to create than lxml.html's HtmlElement
+_PARSER = etree.HTMLParser(remove_blank_text=True, remove_comments=True)
+
+# One pass over the page returns, in document order, each story row
+# (``tr.athing``) followed by its title link, then the points and comments
+# links from the subtext row underneath it.
+_STORY_NODES = etree.XPath(
+    '//tr[contains(concat(" ", normalize-space(@class), " "), " athing ")]'
+    ' | //span[@class="titleline"]/a[1]'
+    ' | //span[@class="score"]'
+    ' | //a[starts-with(@href, "item?id=")][contains(., "comment")]'
+)
+
+
+@dataclass
+class HNStory:
+    """One story row of a Hacker News listing page."""
+    item_id: int
+    title: str
+    url: str
+    points: int
+    comments: int
+    rank: int
+
+
+def _leading_int(text: str) -> int:
+    """``"123 points"`` / ``"45\xa0comments"`` -> 123 / 45; 0 when there is no number."""
+    head = text.split(None, 1)[0] if text.strip() else ""
+    return int(head) if head.isdigit() else 0
+
+
+def parse_listing(html: bytes, base_url: str = HN_URL) -> List[HNStory]:
+    """Parse one HN listing page with a single compiled XPath query.
+
+    Points and comment counts come from each story's subtext row; job posts
+    have neither and get 0. Relative links (Ask HN, Show HN) are resolved
+    against ``base_url``.
+    """
+    if not html:
+        return []
+    root = etree.fromstring(html, _PARSER)
+    if root is None:
+        return []
+    stories: List[HNStory] = []
+    story: Optional[HNStory] = None
+    for node in _STORY_NODES(root):
+        if node.tag == "tr":
+            item_id = node.get("id", "")
+            story = HNStory(int(item_id) if item_id.isdigit() else 0, "", "", 0, 0, len(stories) + 1)
+            stories.append(story)
+        elif story is None:
+            continue
+        elif node.tag == "span":
+            story.points = _leading_int(node.text or "")
+        elif node.getparent().get("class") == "titleline":
+            story.title = "".join(node.itertext()).strip()
+            href = node.get("href", "")
+            # Only self posts (Ask HN, ...) have relative links
+            story.url = href if href.startswith(("https://", "http://")) else urljoin(base_url, href)
+        else:
+            # "N comments"; stories without any show "discuss" instead
+            story.comments = _leading_int(node.text or "")
+    return [s for s in stories if s.title]
+
+
+class HNWebSource(BaseTrendSource):
+    """Fetches Hacker News listing pages over the shared HTTP session.
+
+    A lighter alternative to ``ScrapyHNSource``. Pages are downloaded
+    concurrently (up to ``max_workers`` at a time) through the pooled session
+    and the conditional-request cache, and are parsed with parse_listing().
+    Item scores are the real HN points. The parsed HNStory records of the
+    last fetch, with comment counts and item ids, are kept in
+    ``last_stories``.
+
+    ``pages`` lists HN paths to fetch (for example ``["news", "newest"]``);
+    by default enough front pages are fetched to cover ``limit``. A page
+    answered with 304 Not Modified is not parsed again.
+    """
+
+    def __init__(
+        self,
+        pages: Optional[Sequence[str]] = None,
+        base_url: str = HN_URL,
+        max_workers: int = 4,
+        timeout: float = 10.0,
+        session: Optional[requests.Session] = None,
+        cache: Optional[HTTPCache] = None,
+    ):
+        self.pages = list(pages) if pages else None
+        self.base_url = base_url
+        self.max_workers = max(1, int(max_workers))
+        self.timeout = timeout
+        self.session = session or get_session()
+        self.cache = cache or default_cache()
+        self.last_stories: List[HNStory] = []
+        self._parsed: Dict[str, List[HNStory]] = {}
+
+    def _pages_for(self, limit: int) -> List[str]:
+        """Pages to fetch: the configured list, or enough front pages for ``limit``."""
+        if self.pages:
+            return self.pages
+        count = max(1, math.ceil(limit / HN_PAGE_SIZE))
+        return ["news"] + [f"news?p={n}" for n in range(2, count + 1)]
+
+    def _fetch_page(self, page: str) -> List[HNStory]:
+        """Download and parse one listing page ([] on failure)."""
+        url = urljoin(self.base_url, page)
+        try:
+            with metrics.timed("trendwatch_source_stage_seconds", source="web:hn", stage="network"):
+                response = self.cache.get(url, timeout=self.timeout, session=self.session)
+            metrics.inc("trendwatch_http_responses_total", source="web:hn", status=response.status_code)
+            response.raise_for_status()
+        except requests.RequestException as exc:
+            print(f"[ERROR] Failed to fetch {url}: {exc}")
+            metrics.inc("trendwatch_source_errors_total", source="web:hn", kind="request")
+            return []
+
+        if response.not_modified and url in self._parsed:
+            return self._parsed[url]
+        metrics.inc("trendwatch_fetched_bytes_total", len(response.content or b""), source="web:hn")
+        try:
+            with metrics.timed("trendwatch_source_stage_seconds", source="web:hn", stage="parse"):
+                stories = parse_listing(response.content, url)
+        except (etree.ParserError, ValueError) as exc:
+            print(f"[ERROR] Could not parse {url}: {exc}")
+            metrics.inc("trendwatch_source_errors_total", source="web:hn", kind="parse")
+            return []
+        self._parsed[url] = stories
+        return stories
+
+    def fetch_trends(self, limit: int = 10) -> List[TrendItem]:
+        """Fetch top stories from Hacker News, ranked continuously across pages."""
+        pages = self._pages_for(limit)
+        if len(pages) == 1:
+            per_page = [self._fetch_page(pages[0])]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(pages)),
+                thread_name_prefix="trendwatch-hn",
+            ) as pool:
+                per_page = list(pool.map(self._fetch_page, pages))
+
+        stories = [story for page in per_page for story in page][:limit]
+        self.last_stories = stories
+        if not stories:
+            print("[WARN] Hacker News returned no items.")
+            return []
+
+        now = datetime.now(timezone.utc)
+        return [
+            TrendItem(
+                platform="web",
+                title=story.title,
+                url=story.url,
+                score=story.points,
+                rank=rank,
+                fetched_at=now,
+            )
+            for rank, story in enumerate(stories, start=1)
+        ]
@@ -0,0 +1,122 @@
+"""In-memory hot tier that answers "latest trends" reads without a database query."""
+
+import threading
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Union
+
+import metrics
+from models import PLATFORMS, TrendBatch, TrendItem, Trends
+from url_utils import canonical_url
+
+
+class HotTrendCache:
+    """Keeps the most recently saved trends in ring buffers in front of ``db``.
+
+    It exposes the same ``save_trends`` and ``get_latest`` methods as the
+    backends, so it can be passed to TrendMonitor (or wrap a
+    WriteBehindBuffer) in place of the database. Other attributes are
+    forwarded to the wrapped backend.
+
+    - Every successful save_trends() also appends the items to an overall
+      ring of ``capacity`` items and to one ring of ``per_platform`` items
+      per platform; the oldest items fall off the end.
+    - get_latest() is answered from memory when the ring holds at least
+      ``limit`` items (or everything in the database); larger limits go to
+      the backend. ``platform=`` reads the per-platform ring, falling back to
+      ``db.query(platform=...)``.
+    - warm() (run on construction unless ``warm=False``) loads the rings
+      from the database, so a restart does not start cold.
+
+    Only writes made through this object are seen. Rows written by another
+    process, or by retention, reach the cache after the next warm().
+    Returned TrendItem objects are shared with the cache; don't modify them.
+    """
+
+    def __init__(self, db, capacity: int = 1000, per_platform: int = 200, warm: bool = True):
+        self.db = db
+        self.capacity = max(1, int(capacity))
+        self.per_platform = max(1, int(per_platform))
+        # Dedupe backends report canonical URLs; store what they would return
+        self._canonical = bool(getattr(db, "dedupe", False))
+        self._lock = threading.Lock()
+        self._latest: Deque[TrendItem] = deque(maxlen=self.capacity)
+        self._by_platform: Dict[str, Deque[TrendItem]] = {}
+        # Rings known to hold every stored row (set by warm() on a small table)
+        self._complete: Dict[Optional[str], bool] = {}
+        if warm:
+            self.warm()
+
+    def __getattr__(self, name):
+        # Everything not cached here goes straight to the backend
+        return getattr(self.db, name)
+
+    def _ring(self, platform: str) -> Deque[TrendItem]:
+        ring = self._by_platform.get(platform)
+        if ring is None:
+            ring = self._by_platform[platform] = deque(maxlen=self.per_platform)
+        return ring
+
+    def warm(self) -> int:
+        """Reload the rings from the database; returns the number of items loaded."""
+        latest = self.db.get_latest(limit=self.capacity)
+        by_platform = {
+            platform: self.db.query(platform=platform, limit=self.per_platform).items
+            for platform in PLATFORMS
+        }
+        with self._lock:
+            self._latest.clear()
+            self._latest.extend(reversed(latest))
+            self._complete = {None: len(latest) < self.capacity}
+            self._by_platform.clear()
+            for platform, items in by_platform.items():
+                self._ring(platform).extend(reversed(items))
+                self._complete[platform] = len(items) < self.per_platform
+        return len(latest)
+
+    def save_trends(self, trends: Trends) -> bool:
+        """Save through to the backend, then add the items to the rings."""
+        ok = self.db.save_trends(trends)
+        if ok is False or not trends:
+            return ok
+        self._remember(trends)
+        return ok
+
+    def _remember(self, trends: Iterable[TrendItem]) -> None:
+        with self._lock:
+            for t in trends:
+                if self._canonical:
+                    t = TrendItem(t.platform, t.title, canonical_url(t.url), t.score, t.rank, t.fetched_at)
+                self._latest.append(t)
+                self._ring(t.platform).append(t)
+
+    def _cached(self, platform: Optional[str], limit: int) -> Optional[List[TrendItem]]:
+        """Newest-first items from a ring, or None when it cannot cover ``limit``."""
+        with self._lock:
+            ring = self._latest if platform is None else self._by_platform.get(platform)
+            if ring is None:
+                ring = deque()
+            # A ring that has never evicted still holds everything it was warmed with
+            complete = self._complete.get(platform, False) and len(ring) < (ring.maxlen or 0)
+            if limit > len(ring) and not complete:
+                return None
+            items = []
+            for t in reversed(ring):
+                if len(items) >= limit:
+                    break
+                items.append(t)
+            return items
+
+    def get_latest(
+        self, limit: int = 10, as_batch: bool = False, platform: Optional[str] = None
+    ) -> Union[List[TrendItem], TrendBatch]:
+        """Return the newest saved trends (optionally of one ``platform``), newest first."""
+        items = self._cached(platform, limit)
+        if items is not None:
+            metrics.inc("trendwatch_hot_cache_requests_total", result="hit")
+            return TrendBatch.from_items(items) if as_batch else items
+
+        metrics.inc("trendwatch_hot_cache_requests_total", result="miss")
+        if platform is None:
+            return self.db.get_latest(limit=limit, as_batch=as_batch)
+        items = self.db.query(platform=platform, limit=limit).items
+        return TrendBatch.from_items(items) if as_batch else items
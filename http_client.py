@@ -0,0 +1,154 @@
+"""Shared HTTP session and conditional-request cache for network sources."""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = "TrendWatch/1.0"
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_connections: int = 16, pool_maxsize: int = 64) -> requests.Session:
+    """Return the process-wide ``requests.Session``, creating it on first use.
+
+    All sources share it, so repeated polls reuse keep-alive connections
+    instead of paying a TCP+TLS handshake each time. The pool sizes only
+    apply to the first call.
+    """
+    global _session  # pylint: disable=global-statement
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["User-Agent"] = USER_AGENT
+            _session = session
+        return _session
+
+
+@dataclass
+class _CacheEntry:
+    stored_at: float
+    content: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+class CachedResponse:
+    """Response returned by HTTPCache.get(), with the cached body filled in on a 304.
+
+    ``not_modified`` is True when the server confirmed the cached copy is
+    still current, so callers can skip re-parsing it.
+    """
+
+    def __init__(self, response: requests.Response, content: bytes, not_modified: bool):
+        self.response = response
+        self.status_code = 200 if not_modified else response.status_code
+        self.headers = response.headers
+        self.content = content
+        self.not_modified = not_modified
+
+    def json(self) -> Any:
+        """Decode the body as JSON (raises ValueError on bad JSON)."""
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        """Raise ``requests.HTTPError`` for 4xx/5xx responses."""
+        self.response.raise_for_status()
+
+
+class HTTPCache:
+    """In-memory HTTP cache that revalidates with ETag / Last-Modified.
+
+    Every get() still goes to the server, but with ``If-None-Match`` /
+    ``If-Modified-Since`` set, so an unchanged resource costs a bodiless 304.
+    Entries older than ``ttl`` seconds are dropped and refetched in full, and
+    at most ``max_entries`` are kept (least recently used evicted first).
+    """
+
+    def __init__(self, ttl: float = 600.0, max_entries: int = 512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(url: str, params: Optional[Dict[str, Any]]) -> str:
+        return f"{url}?{urlencode(sorted((params or {}).items()))}"
+
+    def _lookup(self, key: str) -> Optional[_CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key: str, entry: _CacheEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached response."""
+        with self._lock:
+            self._entries.clear()
+
+    def get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 10,
+        session: Optional[requests.Session] = None,
+    ) -> CachedResponse:
+        """GET ``url`` conditionally. Raises ``requests.RequestException`` on network errors."""
+        session = session or get_session()
+        key = self._key(url, params)
+        entry = self._lookup(key)
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if entry.etag:
+                request_headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                request_headers["If-Modified-Since"] = entry.last_modified
+
+        response = session.get(url, params=params, headers=request_headers, timeout=timeout)
+
+        if response.status_code == 304 and entry is not None:
+            entry.stored_at = time.monotonic()
+            return CachedResponse(response, entry.content, not_modified=True)
+
+        if response.status_code == 200:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                self._store(
+                    key,
+                    _CacheEntry(time.monotonic(), response.content, etag, last_modified),
+                )
+        return CachedResponse(response, response.content, not_modified=False)
+
+
+_default_cache = HTTPCache()
+
+
+def default_cache() -> HTTPCache:
+    """Return the cache shared by all sources that don't bring their own."""
+    return _default_cache
@@ -1,33 +1,163 @@
-"""CLI entry point for the TrendWatch application."""
+"""CLI entry point for the TrendWatch application.
 
-from monitor import TrendMonitor
-from mongo_db import MongoTrendDB
-from db import TrendDatabase
+Without arguments an interactive menu is shown. Subcommands run once and
+exit, for cron jobs and scripts::
 
+    python main.py fetch --source reddit:news --limit 50 --backend sqlite
+    python main.py latest --limit 20 --platform reddit
+    python main.py export trends.jsonl --backend mongo
 
-def create_db(backend: str):
-    """Factory to create the correct DB object."""
+Only the modules the chosen backend and source need are imported, so a
+SQLite run never loads ``pymongo`` or ``scrapy``. Subcommands also stay
+NumPy-free; the interactive menu loads NumPy for its analytics and story
+clustering.
+"""
+
+import argparse
+import sys
+from typing import List, Optional
+
+from factory import create_db as _create_db, create_source, parse_source_spec
+
+
+def create_db(backend: str, location: Optional[str] = None):
+    """Open the named backend; ``location`` is a SQLite path or Mongo URI."""
     if backend == "mongo":
-        return MongoTrendDB()
-    return TrendDatabase("trends.db")
+        return _create_db("mongo", **({"uri": location} if location else {}))
+    return _create_db(
+        "sqlite",
+        path=location or "trends.db",
+        persistent=True,
+        journal_mode="WAL",
+        synchronous="NORMAL",
+    )
+
+
+def _hot(db):
+    """Serve the interactive session's "latest" reads from memory."""
+    from hot_cache import HotTrendCache  # pylint: disable=import-outside-toplevel
+
+    return HotTrendCache(db)
+
+
+def _monitor(source, db, interactive: bool = False, chunk_size: Optional[int] = None):
+    """TrendMonitor for ``source``; the interactive menu also keeps analytics and stories."""
+    from monitor import TrendMonitor  # pylint: disable=import-outside-toplevel
+
+    if not interactive:
+        return TrendMonitor(source, db, chunk_size=chunk_size)
+    # NumPy-backed; only the interactive session shows risers and stories
+    from analytics import TrendAnalytics  # pylint: disable=import-outside-toplevel
+    from clustering import StoryClusterer  # pylint: disable=import-outside-toplevel
+
+    analytics = TrendAnalytics()
+    analytics.warm(db)
+    clusterer = StoryClusterer()
+    clusterer.warm(db)
+    return TrendMonitor(source, db, analytics=analytics, clusterer=clusterer)
+
+
+def cmd_fetch(args: argparse.Namespace) -> int:
+    """Fetch once from ``--source`` and store the results."""
+    try:
+        spec = parse_source_spec(args.source)
+        source = create_source(spec)
+    except ValueError as exc:
+        print(f"[ERROR] {exc}")
+        return 2
+    db = create_db(args.backend, args.db)
+    saved = _monitor(source, db, chunk_size=args.chunk_size).fetch_and_store(limit=args.limit)
+    print(f"Stored {saved} items from {args.source}.")
+    return 0 if saved else 1
+
+
+def cmd_latest(args: argparse.Namespace) -> int:
+    """Print the most recently stored trends."""
+    db = create_db(args.backend, args.db)
+    if args.platform:
+        trends = db.query(platform=args.platform, limit=args.limit).items
+    else:
+        trends = db.get_latest(limit=args.limit)
+    if not trends:
+        print("No data in database yet.")
+        return 0
+    for t in trends:
+        print(f"[{t.platform.upper()} #{t.rank}] {t.title} (score={t.score})")
+        print(f"  {t.url}")
+        print(f"  fetched_at={t.fetched_at}")
+    return 0
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    """Stream stored trends to a JSON Lines, CSV or Parquet file."""
+    import transfer  # pylint: disable=import-outside-toplevel
+
+    db = create_db(args.backend, args.db)
+    try:
+        count = transfer.export_trends(db, args.file, args.format, args.chunk_size)
+    except (ValueError, ImportError, transfer.TransferError) as exc:
+        print(f"[ERROR] Export failed: {exc}")
+        return 1
+    print(f"Exported {count} rows to {args.file}.")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Argument parser for the non-interactive subcommands."""
+    parser = argparse.ArgumentParser(description="TrendWatch")
+    sub = parser.add_subparsers(dest="command")
+
+    def add_backend(cmd: argparse.ArgumentParser) -> None:
+        cmd.add_argument("--backend", choices=["sqlite", "mongo"], default="sqlite")
+        cmd.add_argument("--db", help="SQLite path (default trends.db) or Mongo URI")
+
+    fetch = sub.add_parser("fetch", help="fetch once and store")
+    fetch.add_argument("--source", default="reddit:news", help="reddit:<sub>, youtube:<region>, web or web:lxml")
+    fetch.add_argument("--limit", type=int, default=25)
+    fetch.add_argument("--chunk-size", type=int, help="stream the source, saving every N items")
+    add_backend(fetch)
+    fetch.set_defaults(func=cmd_fetch)
+
+    latest = sub.add_parser("latest", help="show the latest stored trends")
+    latest.add_argument("--limit", type=int, default=10)
+    latest.add_argument("--platform")
+    add_backend(latest)
+    latest.set_defaults(func=cmd_latest)
+
+    export = sub.add_parser("export", help="export stored trends to a file")
+    export.add_argument("file")
+    export.add_argument("--format", choices=["jsonl", "csv", "parquet"])
+    export.add_argument("--chunk-size", type=int, default=5000)
+    add_backend(export)
+    export.set_defaults(func=cmd_export)
+    return parser
+
 
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run a subcommand, or the interactive menu when none is given."""
+    args = build_parser().parse_args(argv)
+    if args.command is None:
+        interactive()
+        return 0
+    return args.func(args)
 
-def main():
+
+def interactive():
     """Run the TrendWatch interactive command-line interface."""
     # ----------------------
     # Choose initial DB backend
     # ----------------------
     print("Choose database backend:")
     print("1) MongoDB")
-    print("2) SQLite")
+    print("2) SQLite (default)")
 
     db_choice = input("> ").strip()
-    if db_choice == "2":
-        current_backend = "sqlite"
+    if db_choice == "1":
+        current_backend = "mongo"
     else:
-        current_backend = "mongo"  # default
+        current_backend = "sqlite"  # default
 
-    db = create_db(current_backend)
+    db = _hot(create_db(current_backend))
 
     # ----------------------
     # Choose data source
@@ -36,20 +166,16 @@ def main():
     print("1) Reddit")
     print("2) YouTube (dummy)")
     print("3) Web (Hacker News via Scrapy)")
+    print("4) Web (Hacker News via lxml, real points)")
 
     src_choice = input("> ").strip()
-
-    if src_choice == "2":
-        from youtube_source import YouTubeTrendSource
-        source = YouTubeTrendSource(region="US")
-    elif src_choice == "3":
-        from scrapy_source import ScrapyHNSource
-        source = ScrapyHNSource()
-    else:
-        from reddit_source import RedditTrendSource
-        source = RedditTrendSource("news")
-
-    monitor = TrendMonitor(source, db)
+    spec = {
+        "2": {"type": "youtube"},
+        "3": {"type": "web"},
+        "4": {"type": "web", "engine": "lxml"},
+    }.get(src_choice, {"type": "reddit"})
+    source = create_source(spec)
+    monitor = _monitor(source, db, interactive=True)
 
     # ----------------------
     # MAIN MENU LOOP
@@ -61,6 +187,9 @@ def main():
         print("2) Show latest saved trends")
         print("3) Exit")
         print("4) Switch database backend")
+        print("5) Show top rising trends")
+        print("6) Search saved trends")
+        print("7) Show top stories across platforms")
 
         choice = input("Choose option: ").strip()
 
@@ -106,16 +235,50 @@ def main():
                 print("Invalid choice, keeping current backend.")
                 continue
 
-            db = create_db(current_backend)
-            monitor = TrendMonitor(source, db)
+            db = _hot(create_db(current_backend))
+            monitor = _monitor(source, db, interactive=True)
             print(
                 f"Switched to "
                 f"{'MongoDB' if current_backend == 'mongo' else 'SQLite'} backend."
             )
 
+        # --- Risers ---
+        elif choice == "5":
+            limit_str = input("Show how many? (default 10): ").strip()
+            try:
+                limit = int(limit_str) if limit_str else 10
+            except ValueError:
+                limit = 10
+
+            monitor.show_risers(limit=limit)
+
+        # --- Search ---
+        elif choice == "6":
+            text = input("Search for: ").strip()
+            if not text:
+                print("Nothing to search for.")
+                continue
+            limit_str = input("Show how many? (default 10): ").strip()
+            try:
+                limit = int(limit_str) if limit_str else 10
+            except ValueError:
+                limit = 10
+
+            monitor.show_search(text, limit=limit)
+
+        # --- Stories ---
+        elif choice == "7":
+            limit_str = input("Show how many? (default 10): ").strip()
+            try:
+                limit = int(limit_str) if limit_str else 10
+            except ValueError:
+                limit = 10
+
+            monitor.show_stories(limit=limit)
+
         else:
             print("Invalid choice.")
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""Lightweight in-process metrics: counters, gauges and latency histograms.
+
+Instrumented code calls the module-level helpers::
+
+    with metrics.timed("trendwatch_db_seconds", backend="sqlite", op="save_trends"):
+        ...
+    metrics.inc("trendwatch_items_total", len(items), source="reddit")
+
+Metrics are disabled by default. In that state every helper returns
+immediately (``timed`` hands back a shared no-op context manager), so the
+hooks can stay in hot paths. Call enable() to start recording, then
+export with render() (Prometheus text format), write_file() or
+start_http_server().
+"""
+
+import bisect
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Prometheus' default latency buckets, in seconds
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_enabled = False
+_lock = threading.Lock()
+_counters: Dict[str, Dict[Labels, float]] = {}
+_gauges: Dict[str, Dict[Labels, float]] = {}
+_gauge_callbacks: Dict[str, Dict[Labels, Callable[[], float]]] = {}
+# name -> labels -> [bucket counts..., sum, count]
+_histograms: Dict[str, Dict[Labels, List[float]]] = {}
+
+
+def enabled() -> bool:
+    """True when metrics are being recorded."""
+    return _enabled
+
+
+def enable() -> None:
+    """Start recording metrics."""
+    global _enabled  # pylint: disable=global-statement
+    _enabled = True
+
+
+def disable() -> None:
+    """Stop recording; already collected values are kept."""
+    global _enabled  # pylint: disable=global-statement
+    _enabled = False
+
+
+def reset() -> None:
+    """Drop every collected value (registered gauge callbacks are kept)."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+
+def _key(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1.0, **labels: object) -> None:
+    """Add ``value`` to a counter."""
+    if not _enabled:
+        return
+    key = _key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0.0) + value
+
+
+def set_gauge(name: str, value: float, **labels: object) -> None:
+    """Set a gauge to ``value``."""
+    if not _enabled:
+        return
+    with _lock:
+        _gauges.setdefault(name, {})[_key(labels)] = value
+
+
+def register_gauge(name: str, callback: Callable[[], float], **labels: object) -> None:
+    """Read a gauge from ``callback`` at export time (e.g. a queue length).
+
+    Registration is free to do unconditionally; the callback only runs when
+    metrics are rendered.
+    """
+    with _lock:
+        _gauge_callbacks.setdefault(name, {})[_key(labels)] = callback
+
+
+def unregister_gauge(name: str, **labels: object) -> None:
+    """Remove a gauge callback added with register_gauge()."""
+    with _lock:
+        _gauge_callbacks.get(name, {}).pop(_key(labels), None)
+
+
+def observe(name: str, value: float, **labels: object) -> None:
+    """Record one histogram observation (seconds for latencies)."""
+    if not _enabled:
+        return
+    key = _key(labels)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        state = series.get(key)
+        if state is None:
+            state = series[key] = [0.0] * (len(DEFAULT_BUCKETS) + 2)
+        index = bisect.bisect_left(DEFAULT_BUCKETS, value)
+        if index < len(DEFAULT_BUCKETS):
+            state[index] += 1
+        state[-2] += value
+        state[-1] += 1
+
+
+class _Timer:
+    """Context manager that observes its elapsed time into a histogram."""
+
+    __slots__ = ("name", "labels", "started")
+
+    def __init__(self, name: str, labels: Dict[str, object]):
+        self.name = name
+        self.labels = labels
+        self.started = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, _exc, _tb) -> None:
+        observe(self.name, time.perf_counter() - self.started, **self.labels)
+        if exc_type is not None:
+            inc("trendwatch_errors_total", timer=self.name, **self.labels)
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopTimer":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        return None
+
+
+_NOOP = _NoopTimer()
+
+
+def timed(name: str, **labels: object):
+    """Time a ``with`` block into histogram ``name``; exceptions also count as errors."""
+    if not _enabled:
+        return _NOOP
+    return _Timer(name, labels)
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def render() -> str:
+    """Return every metric in the Prometheus text exposition format."""
+    with _lock:
+        counters = {n: dict(s) for n, s in _counters.items()}
+        gauges = {n: dict(s) for n, s in _gauges.items()}
+        callbacks = {n: dict(s) for n, s in _gauge_callbacks.items()}
+        histograms = {n: {k: list(v) for k, v in s.items()} for n, s in _histograms.items()}
+
+    for name, series in callbacks.items():
+        for key, callback in series.items():
+            try:
+                gauges.setdefault(name, {})[key] = float(callback())
+            except Exception:  # pylint: disable=broad-except
+                continue
+
+    lines: List[str] = []
+    for name in sorted(counters):
+        lines.append(f"# TYPE {name} counter")
+        for key, value in sorted(counters[name].items()):
+            lines.append(f"{name}{_format_labels(key)} {_number(value)}")
+    for name in sorted(gauges):
+        lines.append(f"# TYPE {name} gauge")
+        for key, value in sorted(gauges[name].items()):
+            lines.append(f"{name}{_format_labels(key)} {_number(value)}")
+    for name in sorted(histograms):
+        lines.append(f"# TYPE {name} histogram")
+        for key, state in sorted(histograms[name].items()):
+            cumulative = 0.0
+            for bound, count in zip(DEFAULT_BUCKETS, state):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(key, ('le', repr(bound)))} {_number(cumulative)}")
+            lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {_number(state[-1])}")
+            lines.append(f"{name}_sum{_format_labels(key)} {state[-2]!r}")
+            lines.append(f"{name}_count{_format_labels(key)} {_number(state[-1])}")
+    return "\n".join(lines) + "\n"
+
+
+def write_file(path: str) -> None:
+    """Atomically write render() to ``path`` (e.g. for node_exporter's textfile collector)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(render())
+        os.replace(tmp, path)
+    except OSError as exc:
+        print(f"[ERROR] Could not write metrics file {path}: {exc}")
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def start_http_server(port: int = 9108, host: str = "0.0.0.0"):
+    """Enable metrics and serve them at ``http://host:port/metrics`` from a daemon thread.
+
+    Returns the ``http.server.ThreadingHTTPServer``; call its ``shutdown()``
+    to stop serving.
+    """
+    # http.server is slow to import and only needed when exporting over HTTP
+    from http.server import (  # pylint: disable=import-outside-toplevel
+        BaseHTTPRequestHandler,
+        ThreadingHTTPServer,
+    )
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):  # pylint: disable=invalid-name
+            """Serve render() on /metrics."""
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *_args):
+            pass
+
+    enable()
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="trendwatch-metrics", daemon=True).start()
+    return server
+
+
+def start_file_writer(path: str, interval: float = 15.0) -> threading.Event:
+    """Enable metrics and rewrite ``path`` every ``interval`` seconds; set the returned Event to stop."""
+    enable()
+    stop = threading.Event()
+
+    def run() -> None:
+        while not stop.wait(interval):
+            write_file(path)
+        write_file(path)
+
+    threading.Thread(target=run, name="trendwatch-metrics-file", daemon=True).start()
+    return stop
@@ -1,11 +1,17 @@
 """Dataclasses for representing trend items in TrendWatch."""
-from dataclasses import dataclass
+import sys
+from array import array
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Literal
+from typing import Dict, Iterable, Iterator, List, Literal, Optional, Tuple, Union
 
 Platform = Literal["reddit", "youtube", "web"]
+PLATFORMS: Tuple[str, ...] = ("reddit", "youtube", "web")
 
-@dataclass
+# (platform, title, url, score, rank, fetched_at ISO string), the storage row shape
+TrendRow = Tuple[str, str, str, int, int, str]
+
+@dataclass(slots=True)
 class TrendItem:
     """Represents a single trending item from any platform."""
     platform: Platform
@@ -14,3 +20,175 @@ class TrendItem:
     score: int
     rank: int
     fetched_at: datetime
+
+
+class TrendBatch:
+    """Columnar container for many trend items, used on bulk paths.
+
+    Instead of one object per item it keeps parallel columns: small integer
+    platform codes, ``array`` columns for scores and ranks, interned title/URL
+    strings, and dictionary-encoded timestamps (a batch from one fetch stores
+    its ``fetched_at`` once). Iterating or indexing yields TrendItem objects
+    on demand, so a batch can be passed anywhere a ``List[TrendItem]`` is read.
+    """
+
+    __slots__ = (
+        "platforms",
+        "platform_codes",
+        "titles",
+        "urls",
+        "scores",
+        "ranks",
+        "timestamps",
+        "time_index",
+        "_iso",
+        "_time_codes",
+    )
+
+    def __init__(self) -> None:
+        self.platforms: List[str] = list(PLATFORMS)
+        self.platform_codes = array("B")
+        self.titles: List[str] = []
+        self.urls: List[str] = []
+        self.scores = array("q")
+        self.ranks = array("q")
+        self.timestamps: List[datetime] = []
+        self.time_index = array("I")
+        self._iso: List[str] = []
+        self._time_codes: Dict[str, int] = {}
+
+    @classmethod
+    def from_items(cls, items: Iterable[TrendItem]) -> "TrendBatch":
+        """Build a batch from TrendItem objects."""
+        batch = cls()
+        for t in items:
+            batch.append(t.platform, t.title, t.url, t.score, t.rank, t.fetched_at)
+        return batch
+
+    def _platform_code(self, platform: str) -> int:
+        try:
+            return self.platforms.index(platform)
+        except ValueError:
+            self.platforms.append(platform)
+            return len(self.platforms) - 1
+
+    def _time_code(self, iso: str, when: Optional[datetime] = None) -> int:
+        code = self._time_codes.get(iso)
+        if code is None:
+            code = len(self._iso)
+            self._time_codes[iso] = code
+            self._iso.append(iso)
+            self.timestamps.append(when if when is not None else datetime.fromisoformat(iso))
+        return code
+
+    def append(
+        self, platform: str, title: str, url: str, score: int, rank: int, fetched_at: datetime
+    ) -> None:
+        """Add one item."""
+        self._append(platform, title, url, score, rank, self._time_code(fetched_at.isoformat(), fetched_at))
+
+    def append_row(self, row: TrendRow) -> None:
+        """Add one storage row; each distinct timestamp string is parsed only once."""
+        platform, title, url, score, rank, fetched_at = row
+        self._append(platform, title, url, score, rank, self._time_code(fetched_at))
+
+    def _append(self, platform: str, title: str, url: str, score: int, rank: int, time_code: int) -> None:
+        self.platform_codes.append(self._platform_code(platform))
+        self.titles.append(sys.intern(title))
+        self.urls.append(sys.intern(url))
+        self.scores.append(int(score))
+        self.ranks.append(int(rank))
+        self.time_index.append(time_code)
+
+    def extend(self, other: Iterable[TrendItem]) -> None:
+        """Append every item of another batch or list."""
+        if isinstance(other, TrendBatch):
+            for row in other.rows():
+                self.append_row(row)
+            return
+        for t in other:
+            self.append(t.platform, t.title, t.url, t.score, t.rank, t.fetched_at)
+
+    @property
+    def fetched_at(self) -> Optional[datetime]:
+        """The shared fetch time when every item has the same one, else None."""
+        return self.timestamps[0] if len(self.timestamps) == 1 else None
+
+    def rows(self) -> Iterator[TrendRow]:
+        """Yield storage rows without building TrendItem objects."""
+        platforms, iso = self.platforms, self._iso
+        for i in range(len(self.titles)):
+            yield (
+                platforms[self.platform_codes[i]],
+                self.titles[i],
+                self.urls[i],
+                self.scores[i],
+                self.ranks[i],
+                iso[self.time_index[i]],
+            )
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def __getitem__(self, index: int) -> TrendItem:
+        return TrendItem(
+            platform=self.platforms[self.platform_codes[index]],
+            title=self.titles[index],
+            url=self.urls[index],
+            score=self.scores[index],
+            rank=self.ranks[index],
+            fetched_at=self.timestamps[self.time_index[index]],
+        )
+
+    def __iter__(self) -> Iterator[TrendItem]:
+        for i in range(len(self.titles)):
+            yield self[i]
+
+
+Trends = Union[List[TrendItem], TrendBatch]
+
+
+def trend_rows(trends: Iterable[TrendItem]) -> Iterator[TrendRow]:
+    """Yield storage rows from a TrendBatch or any iterable of TrendItem."""
+    if isinstance(trends, TrendBatch):
+        yield from trends.rows()
+        return
+    for t in trends:
+        yield (t.platform, t.title, t.url, t.score, t.rank, t.fetched_at.isoformat())
+
+
+@dataclass
+class TrendPage:
+    """One page of query results plus an opaque cursor for the next page.
+
+    ``next_cursor`` is None when there are no more matching rows.
+    """
+    items: List[TrendItem] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+@dataclass
+class TrendSummary:
+    """Deduplicated view of one canonical URL across all the fetches it appeared in."""
+    url: str
+    platform: Platform
+    title: str
+    first_seen: datetime
+    last_seen: datetime
+    peak_score: int
+    last_score: int
+    last_rank: int
+
+
+@dataclass
+class StorySummary:
+    """Aggregate popularity of one story cluster (near-duplicate items across URLs)."""
+    cluster_id: int
+    title: str
+    platforms: List[str]
+    urls: int               # distinct URLs in the cluster
+    total_score: int        # sum of each URL's peak score
+    peak_score: int
+    appearances: int        # stored observations across all URLs
+    first_seen: datetime
+    last_seen: datetime
@@ -1,68 +1,821 @@
 """MongoDB backend for storing and retrieving TrendWatch data."""
 
-from typing import List
-from datetime import datetime, timezone
-from pymongo import MongoClient
-from models import TrendItem
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING, TEXT, MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from models import (
+    StorySummary, TrendBatch, TrendItem, TrendPage, TrendSummary, Trends, trend_rows,
+)
+from url_utils import canonical_url
+import metrics
 
 
 class MongoTrendDB:
-    """Handles MongoDB storage and retrieval for TrendWatch trends."""
+    """Handles MongoDB storage and retrieval for TrendWatch trends.
 
-    def __init__(self, uri: str = "mongodb://localhost:27017", db_name: str = "trendwatch"):
+    With ``dedupe=True`` each canonical URL is upserted once into
+    ``trend_urls`` (keyed by the URL, with first/last seen and peak score)
+    and every fetch only adds a small document to ``trend_snapshots``.
+
+    ``fetched_at`` is stored as a native BSON date (millisecond precision).
+    Documents written by older versions as ISO strings are still read, and
+    migrate_string_dates() converts them in place. ``max_pool_size``,
+    ``write_concern`` (the ``w`` option, e.g. ``1`` or ``"majority"``) and
+    ``compressors`` (e.g. ``"zstd,snappy"``) are passed to MongoClient along
+    with any other ``client_options``.
+    """
+
+    # Fields read back into TrendItem; everything else stays on the server
+    PROJECTION = {"platform": 1, "title": 1, "url": 1, "score": 1, "rank": 1, "fetched_at": 1}
+
+    def __init__(
+        self,
+        uri: str = "mongodb://localhost:27017",
+        db_name: str = "trendwatch",
+        dedupe: bool = False,
+        max_pool_size: int = 100,
+        write_concern: Optional[Union[int, str]] = None,
+        compressors: Optional[str] = None,
+        **client_options: Any,
+    ):
         """Initialize MongoDB connection and collection."""
-        self.client = MongoClient(uri)
+        options: Dict[str, Any] = {"maxPoolSize": max_pool_size, "tz_aware": True}
+        if write_concern is not None:
+            options["w"] = write_concern
+        if compressors:
+            options["compressors"] = compressors
+        options.update(client_options)
+        self.client = MongoClient(uri, **options)
+        self.last_write_errors: List[Dict[str, Any]] = []
         self.db = self.client[db_name]
         self.collection = self.db["trends"]
+        self.urls = self.db["trend_urls"]
+        self.snapshots = self.db["trend_snapshots"]
+        self.hourly = self.db["trends_hourly"]
+        self.daily = self.db["trends_daily"]
+        self.retention_state = self.db["retention_state"]
+        self.stories = self.db["stories"]
+        self.story_urls = self.db["story_urls"]
+        self.dedupe = dedupe
+        self._history = self.snapshots if dedupe else self.collection
+        self._indexes_ready = False
 
-    def save_trends(self, trends: List[TrendItem]) -> None:
-        """Save a list of TrendItem objects into MongoDB."""
-        if not trends:
+    def ensure_indexes(self) -> None:
+        """Create the compound indexes used by query(); safe to call repeatedly.
+
+        Runs lazily on first use so constructing the backend never blocks on
+        an unreachable server.
+        """
+        if self._indexes_ready:
             return
+        try:
+            self._history.create_index(
+                [("platform", ASCENDING), ("fetched_at", DESCENDING), ("_id", DESCENDING)],
+                name="platform_fetched_at",
+            )
+            self._history.create_index(
+                [("fetched_at", DESCENDING), ("_id", DESCENDING)],
+                name="fetched_at",
+            )
+            if self.dedupe:
+                self.snapshots.create_index([("url", ASCENDING), ("fetched_at", DESCENDING)])
+                self.urls.create_index([("platform", ASCENDING), ("last_seen", DESCENDING)])
+                self.urls.create_index([("title", TEXT)], name="title_text")
+            else:
+                self.collection.create_index([("title", TEXT)], name="title_text")
+            self._indexes_ready = True
+        except Exception:  # pylint: disable=broad-except
+            print("[ERROR] MongoDB index creation failed.")
 
+    def save_trends(self, trends: Trends) -> bool:
+        """Save a list of TrendItem objects (or a TrendBatch) into MongoDB.
+
+        Writes are unordered, so one bad document does not stop the rest.
+        Per-document errors are printed and kept in ``last_write_errors``.
+        Returns False if any document could not be written (the error is
+        printed, not raised), so the caller can retry or journal the batch.
+        """
+        self.last_write_errors = []
+        if not trends:
+            return True
+
+        self.ensure_indexes()
+        with metrics.timed("trendwatch_db_seconds", backend="mongo", op="save_trends"):
+            if self.dedupe:
+                ok = self._upsert_trends(trends)
+            else:
+                ok = self._insert_trends(trends)
+        if ok:
+            metrics.inc("trendwatch_db_rows_written_total", len(trends), backend="mongo")
+        else:
+            metrics.inc("trendwatch_db_errors_total", backend="mongo", op="save_trends")
+        return ok
+
+    def _insert_trends(self, trends: Trends) -> bool:
+        """Insert one full document per item into the trends collection."""
+        dates = _DateCache()
         docs = [
             {
-                "platform": t.platform,
-                "title": t.title,
-                "url": t.url,
-                "score": t.score,
-                "rank": t.rank,
-                "fetched_at": t.fetched_at.isoformat(),
+                "platform": platform,
+                "title": title,
+                "url": url,
+                "score": score,
+                "rank": rank,
+                "fetched_at": dates.get(fetched_at),
             }
-            for t in trends
+            for platform, title, url, score, rank, fetched_at in trend_rows(trends)
         ]
 
         try:
-            self.collection.insert_many(docs)
+            self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as exc:
+            return self._report_bulk_errors(exc, len(docs))
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"[ERROR] MongoDB insert_many failed: {exc}")
+            return False
+        return True
+
+    def _report_bulk_errors(self, exc: BulkWriteError, attempted: int) -> bool:
+        """Print per-document errors from an unordered bulk write; always returns False.
+
+        The failed documents are kept in ``last_write_errors``. Any failure
+        fails the whole save, so callers retry or journal the batch.
+        """
+        errors = exc.details.get("writeErrors", [])
+        self.last_write_errors.extend(errors)
+        print(f"[ERROR] MongoDB bulk write: {len(errors)} of {attempted} documents failed.")
+        for error in errors[:10]:
+            print(f"  #{error.get('index')}: {error.get('errmsg')}")
+        return False
+
+    def _upsert_trends(self, trends: Trends) -> bool:
+        """Upsert one trend_urls document per canonical URL and add snapshots."""
+        ops = []
+        snapshots = []
+        dates = _DateCache()
+        for platform, title, url, score, rank, fetched_at in trend_rows(trends):
+            url = canonical_url(url)
+            fetched_at = dates.get(fetched_at)
+            ops.append(
+                UpdateOne(
+                    {"_id": url},
+                    {
+                        "$setOnInsert": {"platform": platform},
+                        "$set": {
+                            "title": title,
+                            "last_score": score,
+                            "last_rank": rank,
+                        },
+                        "$min": {"first_seen": fetched_at},
+                        "$max": {"last_seen": fetched_at, "peak_score": score},
+                    },
+                    upsert=True,
+                )
+            )
+            snapshots.append(
+                {
+                    "url": url,
+                    "platform": platform,
+                    "score": score,
+                    "rank": rank,
+                    "fetched_at": fetched_at,
+                }
+            )
+
+        # The snapshots are written even if the URL upsert fails, so the
+        # history of the batch is not lost along with the URL metadata
+        ok = True
+        try:
+            self.urls.bulk_write(ops, ordered=False)
+        except BulkWriteError as exc:
+            ok = self._report_bulk_errors(exc, len(ops))
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"[ERROR] MongoDB bulk upsert failed: {exc}")
+            ok = False
+        try:
+            self.snapshots.insert_many(snapshots, ordered=False)
+        except BulkWriteError as exc:
+            ok = self._report_bulk_errors(exc, len(snapshots))
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"[ERROR] MongoDB snapshot insert failed: {exc}")
+            ok = False
+        return ok
+
+    def get_latest(
+        self, limit: int = 10, as_batch: bool = False
+    ) -> Union[List[TrendItem], TrendBatch]:
+        """Fetch latest trends and convert them into TrendItem objects.
+
+        With ``as_batch=True`` the documents are packed into a TrendBatch
+        instead of one TrendItem each.
+        """
+        try:
+            with metrics.timed("trendwatch_db_seconds", backend="mongo", op="get_latest"):
+                docs = list(self._history.find({}, self.PROJECTION).sort("_id", -1).limit(limit))
         except Exception:  # pylint: disable=broad-except
-            print("[ERROR] MongoDB insert_many failed.")
+            print("[ERROR] MongoDB query failed.")
+            return TrendBatch() if as_batch else []
+
+        docs = self._with_titles(docs)
+        if as_batch:
+            batch = TrendBatch()
+            for doc in docs:
+                batch.append(
+                    doc.get("platform", ""),
+                    doc.get("title", ""),
+                    doc.get("url", ""),
+                    int(doc.get("score", 0)),
+                    int(doc.get("rank", 0)),
+                    self._parse_fetched_at(doc.get("fetched_at")),
+                )
+            return batch
+        return [self._doc_to_item(doc) for doc in docs]
 
-    def get_latest(self, limit: int = 10) -> List[TrendItem]:
-        """Fetch latest trends and convert them into TrendItem objects."""
+    def data_version(self) -> str:
+        """Return the newest history ``_id`` as a string; it changes on every insert.
+
+        Deletes (retention) do not change it, so readers should still expire
+        cached results after a while.
+        """
+        doc = self._history.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        return str(doc["_id"]) if doc else ""
+
+    def query(
+        self,
+        platform: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        min_score: Optional[int] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> TrendPage:
+        """Return one page of trends matching the filters, newest first.
+
+        Same contract as TrendDatabase.query(): keyset pagination on
+        (fetched_at, _id) backed by the compound indexes from ensure_indexes().
+        """
+        self.ensure_indexes()
+        conditions: List[dict] = []
+        if platform is not None:
+            conditions.append({"platform": platform})
+        time_range: dict = {}
+        if since is not None:
+            time_range["$gte"] = since
+        if until is not None:
+            time_range["$lt"] = until
+        if time_range:
+            conditions.append({"fetched_at": time_range})
+        if min_score is not None:
+            conditions.append({"score": {"$gte": int(min_score)}})
+        if cursor:
+            try:
+                cur_fetched, cur_id = cursor.rsplit("|", 1)
+                cur_fetched = datetime.fromisoformat(cur_fetched)
+                cur_oid = ObjectId(cur_id)
+            except (ValueError, InvalidId) as exc:
+                raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+            conditions.append(
+                {
+                    "$or": [
+                        {"fetched_at": {"$lt": cur_fetched}},
+                        {"fetched_at": cur_fetched, "_id": {"$lt": cur_oid}},
+                    ]
+                }
+            )
+
+        filt = {"$and": conditions} if conditions else {}
         try:
-            cursor = self.collection.find().sort("_id", -1).limit(limit)
+            docs = list(
+                self._history.find(filt, self.PROJECTION)
+                .sort([("fetched_at", DESCENDING), ("_id", DESCENDING)])
+                .limit(limit + 1)
+            )
         except Exception:  # pylint: disable=broad-except
             print("[ERROR] MongoDB query failed.")
+            return TrendPage()
+
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            last = docs[-1]
+            last_fetched = self._parse_fetched_at(last.get("fetched_at"))
+            next_cursor = f"{last_fetched.isoformat()}|{last['_id']}"
+        return TrendPage(
+            items=[self._doc_to_item(doc) for doc in self._with_titles(docs)],
+            next_cursor=next_cursor,
+        )
+
+    def search(
+        self,
+        text: str,
+        platform: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 20,
+    ) -> List[TrendItem]:
+        """Find trends whose title contains every word of ``text``, best match first.
+
+        Uses the ``title_text`` index (text score ranking). Each URL appears
+        once, with its most recent observation in the ``since``/``until`` window.
+        """
+        words = text.split()
+        if not words:
+            return []
+        self.ensure_indexes()
+        # Quoting every word makes the text search require all of them
+        search = {"$search": " ".join('"' + w.replace('"', "") + '"' for w in words)}
+
+        if self.dedupe:
+            match: Dict[str, Any] = {"$text": search}
+            if platform is not None:
+                match["platform"] = platform
+            if since is not None:
+                match["last_seen"] = {"$gte": since}
+            if until is not None:
+                match["first_seen"] = {"$lt": until}
+            pipeline = [
+                {"$match": match},
+                {"$addFields": {"relevance": {"$meta": "textScore"}}},
+                {"$sort": {"relevance": -1, "last_seen": -1}},
+                {"$limit": limit},
+                {
+                    "$project": {
+                        "platform": 1,
+                        "title": 1,
+                        "url": "$_id",
+                        "score": "$last_score",
+                        "rank": "$last_rank",
+                        "fetched_at": "$last_seen",
+                    }
+                },
+            ]
+            collection = self.urls
+        else:
+            match = {"$text": search}
+            if platform is not None:
+                match["platform"] = platform
+            window: Dict[str, datetime] = {}
+            if since is not None:
+                window["$gte"] = since
+            if until is not None:
+                window["$lt"] = until
+            if window:
+                match["fetched_at"] = window
+            pipeline = [
+                {"$match": match},
+                {"$addFields": {"relevance": {"$meta": "textScore"}}},
+                {"$sort": {"fetched_at": -1}},
+                {"$group": {"_id": "$url", "doc": {"$first": "$$ROOT"}}},
+                {"$replaceRoot": {"newRoot": "$doc"}},
+                {"$sort": {"relevance": -1, "fetched_at": -1}},
+                {"$limit": limit},
+            ]
+            collection = self.collection
+
+        try:
+            docs = list(collection.aggregate(pipeline))
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"[ERROR] MongoDB search failed: {exc}")
             return []
+        return [self._doc_to_item(doc) for doc in docs]
 
-        items: List[TrendItem] = []
+    def current_cursor(self) -> str:
+        """Change-feed cursor for "now": the newest history ``_id`` ("" if none)."""
+        return self.data_version()
 
-        for doc in cursor:
-            fetched_str = doc.get("fetched_at", "")
+    def get_since(self, cursor: Optional[str] = None, limit: int = 1000) -> Tuple[List[TrendItem], str]:
+        """Return up to ``limit`` documents stored after ``cursor``, oldest first, and the new cursor.
+
+        Cursors are history ``_id`` hex strings; None or "" starts from the
+        beginning. ObjectIds are generated by the writing client and are only
+        ordered by insert within one writer process. With several concurrent
+        writers, a document can be committed after a larger ``_id`` has been
+        read and is then skipped, so this assumes a single writer.
+        """
+        filt: Dict[str, Any] = {}
+        if cursor:
             try:
-                fetched_dt = datetime.fromisoformat(fetched_str)
-            except Exception:  # pylint: disable=broad-except
-                fetched_dt = datetime.now(timezone.utc)
-
-            items.append(
-                TrendItem(
-                    platform=doc.get("platform", ""),
-                    title=doc.get("title", ""),
-                    url=doc.get("url", ""),
-                    score=int(doc.get("score", 0)),
-                    rank=int(doc.get("rank", 0)),
-                    fetched_at=fetched_dt,
+                filt["_id"] = {"$gt": ObjectId(cursor)}
+            except (InvalidId, TypeError) as exc:
+                raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+        try:
+            docs = list(
+                self._history.find(filt, {**self.PROJECTION, "_id": 1}).sort("_id", ASCENDING).limit(limit)
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"[ERROR] MongoDB change query failed: {exc}")
+            return [], cursor or ""
+        if not docs:
+            return [], cursor or ""
+        last = str(docs[-1]["_id"])
+        return [self._doc_to_item(doc) for doc in self._with_titles(docs)], last
+
+    def watch_inserts(self, max_await_ms: int = 1000):
+        """Open a change stream of inserts into the history collection.
+
+        Needs a replica set or sharded cluster; raises OperationFailure on a
+        standalone server. Use as a context manager and call ``try_next()``.
+        """
+        return self._history.watch(
+            [{"$match": {"operationType": "insert"}}], max_await_time_ms=max_await_ms
+        )
+
+    def iter_chunks(self, chunk_size: int = 5000) -> Iterator[TrendBatch]:
+        """Yield every stored trend, oldest first, as TrendBatch chunks.
+
+        Uses one server-side cursor with ``batch_size=chunk_size``, so only a
+        chunk of documents is held in memory at a time. A cursor error is
+        printed and re-raised, so an export or migration is never silently
+        cut short.
+        """
+        try:
+            cursor = (
+                self._history.find({}, self.PROJECTION)
+                .sort("_id", ASCENDING)
+                .batch_size(chunk_size)
+            )
+            docs: List[dict] = []
+            for doc in cursor:
+                docs.append(doc)
+                if len(docs) >= chunk_size:
+                    yield TrendBatch.from_items(
+                        self._doc_to_item(d) for d in self._with_titles(docs)
+                    )
+                    docs = []
+            if docs:
+                yield TrendBatch.from_items(self._doc_to_item(d) for d in self._with_titles(docs))
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"[ERROR] MongoDB export cursor failed: {exc}")
+            raise
+
+    def _with_titles(self, docs: List[dict]) -> List[dict]:
+        """In dedupe mode, fill snapshot documents with titles from trend_urls."""
+        if not self.dedupe or not docs:
+            return docs
+        try:
+            titles = {
+                d["_id"]: d.get("title", "")
+                for d in self.urls.find(
+                    {"_id": {"$in": list({doc.get("url") for doc in docs})}},
+                    {"title": 1},
                 )
+            }
+        except Exception:  # pylint: disable=broad-except
+            print("[ERROR] MongoDB title lookup failed.")
+            titles = {}
+        for doc in docs:
+            doc["title"] = titles.get(doc.get("url"), "")
+        return docs
+
+    def save_story_clusters(self, assignments: Iterable[Tuple[str, str, int]]) -> bool:
+        """Store (url, title, cluster id) assignments from clustering.StoryClusterer.
+
+        Returns False if the write failed (the error is printed, not raised).
+        """
+        self.last_write_errors = []
+        now = datetime.now(timezone.utc)
+        story_ops: Dict[int, UpdateOne] = {}
+        url_ops: List[UpdateOne] = []
+        for url, title, cluster_id in assignments:
+            key = canonical_url(url) if self.dedupe else url
+            if cluster_id not in story_ops:
+                story_ops[cluster_id] = UpdateOne(
+                    {"_id": cluster_id},
+                    {"$setOnInsert": {"title": title, "created_at": now}},
+                    upsert=True,
+                )
+            url_ops.append(
+                UpdateOne(
+                    {"_id": key},
+                    {"$set": {"cluster_id": cluster_id, "title": title, "assigned_at": now}},
+                    upsert=True,
+                )
+            )
+        if not url_ops:
+            return True
+        try:
+            self.story_urls.create_index([("assigned_at", DESCENDING)])
+            self.stories.bulk_write(list(story_ops.values()), ordered=False)
+            self.story_urls.bulk_write(url_ops, ordered=False)
+        except BulkWriteError as exc:
+            return self._report_bulk_errors(exc, len(story_ops) + len(url_ops))
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"[ERROR] MongoDB story cluster save failed: {exc}")
+            return False
+        return True
+
+    def load_story_members(self, limit: int = 20000) -> Tuple[int, List[Tuple[str, str, int]]]:
+        """Return the highest cluster id and the newest (url, title, cluster id) assignments."""
+        try:
+            newest = self.stories.find_one({}, {"_id": 1}, sort=[("_id", DESCENDING)])
+            members = [
+                (doc["_id"], doc.get("title", ""), doc["cluster_id"])
+                for doc in self.story_urls.find({}, {"title": 1, "cluster_id": 1})
+                .sort("assigned_at", DESCENDING)
+                .limit(limit)
+            ]
+        except Exception:  # pylint: disable=broad-except
+            print("[ERROR] MongoDB story cluster load failed.")
+            return 0, []
+        return (newest["_id"] if newest else 0), members
+
+    def get_stories(
+        self,
+        limit: int = 10,
+        since: Optional[datetime] = None,
+        platform: Optional[str] = None,
+    ) -> List[StorySummary]:
+        """Return story clusters by aggregate popularity (sum of per-URL peak scores)."""
+        match: Dict[str, Any] = {}
+        if since is not None:
+            match["fetched_at"] = {"$gte": since}
+        if platform is not None:
+            match["platform"] = platform
+        pipeline = [
+            {"$match": match},
+            {
+                "$group": {
+                    "_id": {"url": "$url", "platform": "$platform"},
+                    "peak": {"$max": "$score"},
+                    "seen": {"$sum": 1},
+                    "first_seen": {"$min": "$fetched_at"},
+                    "last_seen": {"$max": "$fetched_at"},
+                }
+            },
+            {
+                "$lookup": {
+                    "from": self.story_urls.name,
+                    "localField": "_id.url",
+                    "foreignField": "_id",
+                    "as": "story",
+                }
+            },
+            {"$unwind": "$story"},
+            {
+                "$group": {
+                    "_id": "$story.cluster_id",
+                    "platforms": {"$addToSet": "$_id.platform"},
+                    "urls": {"$addToSet": "$_id.url"},
+                    "total_score": {"$sum": "$peak"},
+                    "peak_score": {"$max": "$peak"},
+                    "appearances": {"$sum": "$seen"},
+                    "first_seen": {"$min": "$first_seen"},
+                    "last_seen": {"$max": "$last_seen"},
+                }
+            },
+            {"$sort": {"total_score": -1, "last_seen": -1}},
+            {"$limit": limit},
+        ]
+        try:
+            docs = list(self._history.aggregate(pipeline))
+            titles = {
+                doc["_id"]: doc.get("title", "")
+                for doc in self.stories.find({"_id": {"$in": [d["_id"] for d in docs]}})
+            }
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"[ERROR] MongoDB story query failed: {exc}")
+            return []
+        return [
+            StorySummary(
+                cluster_id=doc["_id"],
+                title=titles.get(doc["_id"], ""),
+                platforms=sorted(doc["platforms"]),
+                urls=len(doc["urls"]),
+                total_score=int(doc["total_score"]),
+                peak_score=int(doc["peak_score"]),
+                appearances=int(doc["appearances"]),
+                first_seen=self._parse_fetched_at(doc["first_seen"]),
+                last_seen=self._parse_fetched_at(doc["last_seen"]),
+            )
+            for doc in docs
+        ]
+
+    def get_summaries(
+        self, limit: int = 10, platform: Optional[str] = None
+    ) -> List[TrendSummary]:
+        """Return per-URL summaries (dedupe mode), most recently seen first."""
+        if not self.dedupe:
+            return []
+        filt = {"platform": platform} if platform is not None else {}
+        try:
+            docs = list(self.urls.find(filt).sort("last_seen", DESCENDING).limit(limit))
+        except Exception:  # pylint: disable=broad-except
+            print("[ERROR] MongoDB query failed.")
+            return []
+
+        return [
+            TrendSummary(
+                url=doc["_id"],
+                platform=doc.get("platform", ""),
+                title=doc.get("title", ""),
+                first_seen=self._parse_fetched_at(doc.get("first_seen")),
+                last_seen=self._parse_fetched_at(doc.get("last_seen")),
+                peak_score=int(doc.get("peak_score", 0)),
+                last_score=int(doc.get("last_score", 0)),
+                last_rank=int(doc.get("last_rank", 0)),
             )
+            for doc in docs
+        ]
+
+    @staticmethod
+    def _parse_fetched_at(value) -> datetime:
+        """Read a stored date (BSON date or legacy ISO string); now if unusable."""
+        if isinstance(value, datetime):
+            return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+        try:
+            return datetime.fromisoformat(value)
+        except Exception:  # pylint: disable=broad-except
+            return datetime.now(timezone.utc)
+
+    def migrate_string_dates(self, batch_size: int = 1000) -> int:
+        """Convert ISO-string dates left by older versions into BSON dates.
+
+        Safe to re-run; only documents that still hold strings are touched.
+        Returns the number of documents updated.
+        """
+        targets = [
+            (self.collection, ["fetched_at"]),
+            (self.snapshots, ["fetched_at"]),
+            (self.urls, ["first_seen", "last_seen"]),
+        ]
+        updated = 0
+        for collection, fields in targets:
+            for field in fields:
+                ops: List[UpdateOne] = []
+                try:
+                    cursor = collection.find({field: {"$type": "string"}}, {field: 1})
+                    for doc in cursor.batch_size(batch_size):
+                        try:
+                            value = datetime.fromisoformat(doc[field])
+                        except ValueError:
+                            print(f"[WARN] Unparseable {field} on {doc['_id']}: {doc[field]!r}")
+                            continue
+                        if value.tzinfo is None:
+                            value = value.replace(tzinfo=timezone.utc)
+                        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {field: value}}))
+                        if len(ops) >= batch_size:
+                            updated += collection.bulk_write(ops, ordered=False).modified_count
+                            ops = []
+                    if ops:
+                        updated += collection.bulk_write(ops, ordered=False).modified_count
+                except Exception as exc:  # pylint: disable=broad-except
+                    print(f"[ERROR] Date migration of {collection.name}.{field} failed: {exc}")
+        return updated
+
+    def apply_retention(self, policy) -> Dict[str, int]:
+        """Roll old documents into hourly/daily aggregates and delete them in batches.
+
+        ``policy`` is a retention.RetentionPolicy. With ``daily_days`` set, a
+        TTL index on ``trends_daily.bucket`` keeps expiring daily rollups
+        between runs. Returns counts of documents rolled up or deleted per tier.
+        """
+        now = datetime.now(timezone.utc)
+        report = {"raw_rolled": 0, "hourly_rolled": 0, "daily_expired": 0}
+        try:
+            for rollup in (self.hourly, self.daily):
+                rollup.create_index(
+                    [("bucket", ASCENDING), ("url", ASCENDING)], unique=True, name="bucket_url"
+                )
+            report["raw_rolled"] = self._roll_up(
+                self._history,
+                "fetched_at",
+                now - timedelta(days=policy.raw_days),
+                self.hourly,
+                lambda d: d.replace(minute=0, second=0, microsecond=0),
+                policy.batch_size,
+            )
+            report["hourly_rolled"] = self._roll_up(
+                self.hourly,
+                "bucket",
+                now - timedelta(days=policy.hourly_days),
+                self.daily,
+                lambda d: d.replace(hour=0, minute=0, second=0, microsecond=0),
+                policy.batch_size,
+            )
+            if policy.daily_days is not None:
+                self._ensure_daily_ttl(int(policy.daily_days * 86400))
+                report["daily_expired"] = self.daily.delete_many(
+                    {"bucket": {"$lt": now - timedelta(days=policy.daily_days)}}
+                ).deleted_count
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"[ERROR] MongoDB retention failed: {exc}")
+        return report
+
+    def _roll_up(self, source, field: str, cutoff: datetime, target, truncate, batch_size: int) -> int:
+        """Fold documents of ``source`` older than ``cutoff`` into ``target``, then delete them.
+
+        Each batch's exact ``_id``s are recorded in ``retention_state`` before
+        it is applied, and every rollup document keeps the key of the last
+        batch folded into it. A run interrupted between the upserts and the
+        delete therefore resumes the same batch, skips the rollups it already
+        reached and deletes the same ``_id``s. The steps are still not atomic:
+        until the delete, a batch is present both raw and rolled up.
+        """
+        state_id = f"{source.name}:{target.name}"
+        total = 0
+        while True:
+            pending = self.retention_state.find_one({"_id": state_id})
+            if pending is not None:
+                batch, ids = pending["batch"], pending["ids"]
+                docs = list(source.find({"_id": {"$in": ids}}))
+            else:
+                docs = list(
+                    source.find({field: {"$lt": cutoff}}).sort("_id", ASCENDING).limit(batch_size)
+                )
+                if not docs:
+                    return total
+                batch, ids = ObjectId(), [doc["_id"] for doc in docs]
+                self.retention_state.insert_one({"_id": state_id, "batch": batch, "ids": ids})
+            if source is self.snapshots:
+                docs = self._with_titles(docs)
+
+            groups: Dict[tuple, Dict[str, Any]] = {}
+            for doc in docs:
+                bucket = truncate(self._parse_fetched_at(doc.get(field)))
+                key = (bucket, doc.get("url", ""))
+                score = doc.get("max_score", doc.get("score", 0))
+                rank = doc.get("best_rank", doc.get("rank", 0))
+                group = groups.setdefault(
+                    key,
+                    {"platform": doc.get("platform", ""), "title": doc.get("title", ""),
+                     "max_score": score, "best_rank": rank, "appearances": 0},
+                )
+                group["max_score"] = max(group["max_score"], score)
+                group["best_rank"] = min(group["best_rank"], rank)
+                group["appearances"] += doc.get("appearances", 1)
+
+            if groups:
+                self._apply_rollup(target, groups, batch)
+            source.delete_many({"_id": {"$in": ids}})
+            self.retention_state.delete_one({"_id": state_id})
+            total += len(docs)
+            if pending is None and len(docs) < batch_size:
+                return total
+
+    @staticmethod
+    def _apply_rollup(target, groups: Dict[tuple, Dict[str, Any]], batch: ObjectId) -> None:
+        """Upsert one batch's groups into ``target``, skipping rollups that already hold ``batch``."""
+        try:
+            target.bulk_write(
+                [
+                    UpdateOne(
+                        {"bucket": bucket, "url": url, "batch": {"$ne": batch}},
+                        {
+                            "$set": {"platform": g["platform"], "title": g["title"], "batch": batch},
+                            "$max": {"max_score": g["max_score"]},
+                            "$min": {"best_rank": g["best_rank"]},
+                            "$inc": {"appearances": g["appearances"]},
+                        },
+                        upsert=True,
+                    )
+                    for (bucket, url), g in groups.items()
+                ],
+                ordered=False,
+            )
+        except BulkWriteError as exc:
+            # A duplicate key means the filter skipped a rollup that already has this batch
+            errors = [e for e in exc.details.get("writeErrors", []) if e.get("code") != 11000]
+            if errors:
+                raise
+
+    def _ensure_daily_ttl(self, seconds: int) -> None:
+        """Create the TTL index on daily rollups, or update its expiry if it changed."""
+        try:
+            self.daily.create_index("bucket", expireAfterSeconds=seconds, name="bucket_ttl")
+        except OperationFailure:
+            self.db.command(
+                "collMod",
+                self.daily.name,
+                index={"name": "bucket_ttl", "expireAfterSeconds": seconds},
+            )
+
+    @classmethod
+    def _doc_to_item(cls, doc: dict) -> TrendItem:
+        """Convert a stored document into a TrendItem."""
+        fetched_dt = cls._parse_fetched_at(doc.get("fetched_at"))
+
+        return TrendItem(
+            platform=doc.get("platform", ""),
+            title=doc.get("title", ""),
+            url=doc.get("url", ""),
+            score=int(doc.get("score", 0)),
+            rank=int(doc.get("rank", 0)),
+            fetched_at=fetched_dt,
+        )
+
+
+class _DateCache:
+    """Parses each distinct ISO timestamp of a batch only once."""
+
+    def __init__(self) -> None:
+        self._seen: Dict[str, datetime] = {}
 
-        return items
+    def get(self, iso: str) -> datetime:
+        """Return ``iso`` as a datetime."""
+        value = self._seen.get(iso)
+        if value is None:
+            value = self._seen[iso] = datetime.fromisoformat(iso)
+        return value
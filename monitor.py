@@ -1,34 +1,360 @@
 """Business logic for fetching and displaying trends."""
 
-from typing import List
-from models import TrendItem
+import hashlib
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+import metrics
+from models import TrendBatch, TrendItem
 from base_source import BaseTrendSource
 from db import TrendDatabase
 
 
+@dataclass
+class AdaptivePolling:
+    """Bounds and step sizes for TrendMonitor's adaptive polling interval.
+
+    After an unchanged fetch the interval is multiplied by ``grow``. After a
+    fetch where at least ``churn_threshold`` of the ranked positions changed,
+    it is multiplied by ``shrink``. It always stays within
+    [``min_interval``, ``max_interval``] seconds.
+    """
+    min_interval: float = 60.0
+    max_interval: float = 1800.0
+    grow: float = 1.5
+    shrink: float = 0.5
+    churn_threshold: float = 0.2
+
+    def clamp(self, interval: float) -> float:
+        """Limit ``interval`` to the configured bounds."""
+        return min(self.max_interval, max(self.min_interval, interval))
+
+
+class _StreamTimeout(Exception):
+    """A streaming source spent longer than ``source_timeout`` producing items."""
+
+
 class TrendMonitor:
-    """Coordinates fetching trends from a source and saving them to a database."""
-    def __init__(self, source: BaseTrendSource, db: TrendDatabase):
-        self.source = source
+    """Coordinates fetching trends from one or more sources and saving them to a database.
+
+    Sources are fetched on a thread pool, several concurrently (at most
+    ``max_workers`` at a time). A source that raises or runs longer than
+    ``source_timeout`` seconds is skipped, even when it is the only one, and
+    everything else is merged into a single ``save_trends`` batch.
+
+    If an ``analytics`` object (see analytics.TrendAnalytics) is given, every
+    saved batch is also folded into it. If a ``clusterer`` (see
+    clustering.StoryClusterer) is given, every saved item is assigned a story
+    cluster id, stored with the database's ``save_story_clusters``.
+
+    With ``adaptive`` (an AdaptivePolling) each fetch's ranked URL list is
+    compared with the previous one. An identical list is not saved at all
+    and lengthens ``interval``; a churning list shortens it. A scheduler
+    should wait ``interval`` seconds before the next fetch_and_store() call.
+
+    With ``chunk_size`` a single source is read through its iter_trends()
+    stream and saved every ``chunk_size`` items, so memory stays bounded and
+    the items stored before a fetch fails are kept. The stream is read on a
+    separate thread and gets the same ``source_timeout`` (time spent waiting
+    on the source); chunks saved before a timeout are kept. Adaptive polling
+    and multiple sources need the whole list, so they turn this off.
+    """
+    def __init__(
+        self,
+        source: Union[BaseTrendSource, Sequence[BaseTrendSource]],
+        db: TrendDatabase,
+        max_workers: int = 8,
+        source_timeout: float = 15.0,
+        analytics=None,
+        clusterer=None,
+        adaptive: Optional[AdaptivePolling] = None,
+        interval: float = 300.0,
+        chunk_size: Optional[int] = None,
+    ):
+        if isinstance(source, BaseTrendSource):
+            self.sources: List[BaseTrendSource] = [source]
+        else:
+            self.sources = list(source)
+        self.source = self.sources[0] if self.sources else None
         self.db = db
+        self.max_workers = max(1, int(max_workers))
+        self.source_timeout = source_timeout
+        self.analytics = analytics
+        self.clusterer = clusterer
+        self.adaptive = adaptive
+        self.interval = adaptive.clamp(interval) if adaptive else interval
+        self.chunk_size = max(1, int(chunk_size)) if chunk_size else None
+        if self.chunk_size and (len(self.sources) > 1 or adaptive is not None):
+            reason = "adaptive polling" if adaptive is not None else f"{len(self.sources)} sources"
+            print(f"[WARN] chunk_size is ignored with {reason}; fetching whole lists.")
+            self.chunk_size = None
+        self.last_churn: Optional[float] = None
+        self._last_digest: Optional[bytes] = None
+        self._last_urls: List[str] = []
+        self._busy: set = set()
+        self._busy_lock = threading.Lock()
 
-    def fetch_and_store(self, limit: int = 10) -> None:  # pylint: disable=broad-except
-        """Fetch trends from the source and store them in the DB safely."""
-        try:
-            trends: List[TrendItem] = self.source.fetch_trends(limit=limit)
-        except Exception as exc:  # pylint: disable=broad-except
-            print(f"[ERROR] Source fetch failed: {exc}")
-            return
+    def fetch_and_store(self, limit: int = 10) -> int:  # pylint: disable=broad-except
+        """Fetch trends from the source(s) and store them in the DB safely.
+
+        Returns the number of items handed to the database. Each stage
+        (fetch per source, save, analytics, clustering) is timed into the
+        ``trendwatch_stage_seconds`` histogram when metrics are enabled.
+        """
+        with metrics.timed("trendwatch_poll_seconds"):
+            return self._fetch_and_store(limit)
+
+    def _fetch_and_store(self, limit: int) -> int:
+        if self.chunk_size:
+            return self._stream_and_store(limit)
+        trends = self._fetch_concurrently(limit)
 
         if not trends:
             print("[INFO] No trends fetched. Nothing to save.")
-            return
+            return 0
 
+        if self.adaptive is None:
+            return self._store(trends)
+
+        observed = self._observe_churn(trends)
+        metrics.set_gauge("trendwatch_poll_interval_seconds", self.interval, source=self._name(0))
+        if observed is None:
+            print(f"[INFO] Top list unchanged; skipping save, next poll in {self.interval:.0f}s.")
+            metrics.inc("trendwatch_unchanged_fetches_total", source=self._name(0))
+            return 0
+        saved = self._store(trends)
+        if saved:
+            # Only a stored list counts as "seen"; after a failed save the same list is retried
+            self._last_digest, self._last_urls = observed
+        return saved
+
+    def _store(self, trends: TrendBatch) -> int:
+        """Save one batch and feed it to analytics and clustering; returns the count saved.
+
+        Returns 0, and skips analytics and clustering, if the save fails.
+        """
         try:
-            self.db.save_trends(trends)
+            with metrics.timed("trendwatch_stage_seconds", stage="save"):
+                ok = self.db.save_trends(trends)
         except Exception as exc:   # pylint: disable=broad-except
             print(f"[ERROR] Failed to save trends to database: {exc}")
+            return 0
+        if ok is False:
+            print(f"[ERROR] Database did not save {len(trends)} trends.")
+            return 0
+
+        if self.analytics is not None:
+            try:
+                with metrics.timed("trendwatch_stage_seconds", stage="analytics"):
+                    self.analytics.update(trends)
+            except Exception as exc:  # pylint: disable=broad-except
+                print(f"[ERROR] Analytics update failed: {exc}")
+        if self.clusterer is not None:
+            try:
+                with metrics.timed("trendwatch_stage_seconds", stage="clustering"):
+                    self.db.save_story_clusters(self.clusterer.assign_batch(trends))
+            except Exception as exc:  # pylint: disable=broad-except
+                print(f"[ERROR] Story clustering failed: {exc}")
+        return len(trends)
+
+    def _stream_and_store(self, limit: int) -> int:
+        """Save the single source's iter_trends() output every ``chunk_size`` items."""
+        name = self._name(0)
+        saved = fetched = 0
+        chunk = TrendBatch()
+        try:
+            for t in self._timed_stream(0, limit):
+                chunk.append(t.platform, t.title, t.url, t.score, t.rank, t.fetched_at)
+                if len(chunk) >= self.chunk_size:
+                    fetched += len(chunk)
+                    saved += self._store(chunk)
+                    chunk = TrendBatch()
+        except _StreamTimeout:
+            print(
+                f"[WARN] Source {name} timed out after {self.source_timeout:.1f}s; "
+                f"keeping the {fetched + len(chunk)} items read."
+            )
+            metrics.inc("trendwatch_source_timeouts_total", source=name)
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"[ERROR] Source fetch failed after {fetched + len(chunk)} items: {exc}")
+            metrics.inc("trendwatch_source_errors_total", source=name, kind="stream")
+        if chunk:
+            fetched += len(chunk)
+            saved += self._store(chunk)
+        metrics.inc("trendwatch_items_fetched_total", fetched, source=name)
+        if not fetched:
+            print("[INFO] No trends fetched. Nothing to save.")
+        return saved
+
+    def _timed_stream(self, index: int, limit: int) -> Iterator[TrendItem]:
+        """Yield source ``index``'s iter_trends(), read on a daemon thread.
+
+        Raises _StreamTimeout once more than ``source_timeout`` seconds in
+        total were spent waiting for items. The reader is then abandoned: it
+        stops at its next item, and a hung one cannot block interpreter exit.
+        """
+        items: queue.Queue = queue.Queue(maxsize=self.chunk_size)
+        stop = threading.Event()
+
+        def offer(message) -> None:
+            while not stop.is_set():
+                try:
+                    items.put(message, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def read() -> None:
+            try:
+                for item in self.sources[index].iter_trends(limit=limit):
+                    if stop.is_set():
+                        return
+                    offer(("item", item))
+                offer(("end", None))
+            except Exception as exc:  # pylint: disable=broad-except
+                offer(("error", exc))
+
+        threading.Thread(target=read, name="trendwatch-stream", daemon=True).start()
+        budget = self.source_timeout
+        try:
+            while True:
+                if budget is not None and budget <= 0:
+                    raise _StreamTimeout()
+                waited = time.monotonic()
+                try:
+                    kind, value = items.get(timeout=budget)
+                except queue.Empty:
+                    raise _StreamTimeout() from None
+                if budget is not None:
+                    budget -= time.monotonic() - waited
+                if kind == "end":
+                    return
+                if kind == "error":
+                    raise value
+                yield value
+        finally:
+            stop.set()
+
+    def _observe_churn(self, trends: TrendBatch) -> Optional[Tuple[bytes, List[str]]]:
+        """Compare this fetch's ranked URLs with the last stored list and adapt the interval.
+
+        Returns None when the list is identical (nothing worth saving), else
+        the list's ``(digest, ranked urls)`` to remember once it is saved.
+        """
+        ranked = [url for _rank, url in sorted(zip(trends.ranks, trends.urls))]
+        digest = hashlib.blake2b("\n".join(ranked).encode("utf-8"), digest_size=16).digest()
+        if digest == self._last_digest:
+            self.last_churn = 0.0
+            self.interval = self.adaptive.clamp(self.interval * self.adaptive.grow)
+            return None
 
+        previous = self._last_urls
+        if not previous:
+            return digest, ranked  # first fetch: nothing to compare with yet
+
+        size = max(len(previous), len(ranked))
+        moved = sum(1 for old, new in zip(previous, ranked) if old != new)
+        self.last_churn = (moved + size - min(len(previous), len(ranked))) / size
+        if self.last_churn >= self.adaptive.churn_threshold:
+            self.interval = self.adaptive.clamp(self.interval * self.adaptive.shrink)
+        return digest, ranked
+
+    def _fetch_one(self, index: int, limit: int) -> TrendBatch:
+        """Fetch one source, recording its latency, item count and errors."""
+        name = self._name(index)
+        with metrics.timed("trendwatch_stage_seconds", stage="fetch", source=name):
+            batch = self.sources[index].fetch_batch(limit=limit)
+        metrics.inc("trendwatch_items_fetched_total", len(batch), source=name)
+        return batch
+
+    def _fetch_concurrently(self, limit: int) -> TrendBatch:
+        """Fetch every source on a bounded set of worker threads and merge the results.
+
+        Each source gets its own ``source_timeout``, counted from the moment a
+        worker actually starts it, so sources queued behind the concurrency cap
+        are not penalised for waiting.
+
+        A timeout only stops the wait, not the fetch. Workers are daemon
+        threads, so an abandoned fetch cannot hold up interpreter exit, and a
+        source whose abandoned fetch is still running is skipped until it
+        ends, so each source leaves at most one such thread behind.
+        """
+        with self._busy_lock:
+            indexes = [i for i in range(len(self.sources)) if i not in self._busy]
+            self._busy.update(indexes)
+        for index in range(len(self.sources)):
+            if index not in indexes:
+                print(f"[WARN] Source {self._name(index)} is still running an earlier fetch; skipping it.")
+
+        started: dict = {}
+        tasks: queue.Queue = queue.Queue()
+        pending = {}
+        for index in indexes:
+            future: Future = Future()
+            pending[future] = index
+            tasks.put((index, future))
+
+        def work() -> None:
+            while True:
+                try:
+                    index, future = tasks.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    if future.set_running_or_notify_cancel():
+                        started[index] = time.monotonic()
+                        future.set_result(self._fetch_one(index, limit))
+                except Exception as exc:  # pylint: disable=broad-except
+                    future.set_exception(exc)
+                finally:
+                    with self._busy_lock:
+                        self._busy.discard(index)
+
+        for _ in range(min(self.max_workers, len(indexes))):
+            threading.Thread(target=work, name="trendwatch-fetch", daemon=True).start()
+
+        merged = TrendBatch()
+        try:
+            while pending:
+                done, _ = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    try:
+                        merged.extend(future.result())
+                    except Exception as exc:  # pylint: disable=broad-except
+                        print(f"[ERROR] Source {self._name(index)} fetch failed: {exc}")
+
+                now = time.monotonic()
+                for future, index in list(pending.items()):
+                    start = started.get(index)
+                    if (
+                        self.source_timeout is not None
+                        and start is not None
+                        and now - start > self.source_timeout
+                    ):
+                        print(
+                            f"[WARN] Source {self._name(index)} timed out after "
+                            f"{self.source_timeout:.1f}s; skipping it."
+                        )
+                        metrics.inc("trendwatch_source_timeouts_total", source=self._name(index))
+                        pending.pop(future)
+        finally:
+            # Fetches not started yet are dropped; timed-out ones are left to finish
+            for future in pending:
+                future.cancel()
+
+        return merged
+
+    def _name(self, index: int) -> str:
+        """Human-readable label for a source, used in log messages."""
+        src = self.sources[index]
+        label = getattr(src, "subreddit", None) or getattr(src, "region", None)
+        name = type(src).__name__
+        return f"{name}({label})" if label else name
 
     def show_latest(self, limit: int = 10) -> None: # pylint: disable=broad-except
         """Print the latest saved trends in a readable format."""
@@ -43,3 +369,54 @@ class TrendMonitor:
             print(f"  {t.url}")
             print(f"  fetched_at={t.fetched_at}")
             print("-" * 80)
+
+    def show_search(self, text: str, limit: int = 10) -> None:
+        """Print saved trends whose titles match ``text``, best match first."""
+        trends = self.db.search(text, limit=limit)
+        if not trends:
+            print(f"No saved trends match {text!r}.")
+            return
+
+        print(f"\n{len(trends)} trends matching {text!r}:\n")
+        for t in trends:
+            print(f"[{t.platform.upper()} #{t.rank}] {t.title} (score={t.score})")
+            print(f"  {t.url}")
+            print(f"  fetched_at={t.fetched_at}")
+            print("-" * 80)
+
+    def show_stories(self, limit: int = 10) -> None:
+        """Print the most popular story clusters of the last 24 hours."""
+        since = datetime.now(timezone.utc) - timedelta(days=1)
+        stories = self.db.get_stories(limit=limit, since=since)
+        if not stories:
+            print("No clustered stories in the last 24 hours.")
+            return
+
+        print(f"\nTop {len(stories)} stories of the last 24 hours:\n")
+        for s in stories:
+            print(f"[{'/'.join(p.upper() for p in s.platforms)}] {s.title}")
+            print(
+                f"  total_score={s.total_score}  peak={s.peak_score}  "
+                f"urls={s.urls}  seen={s.appearances}x"
+            )
+            print("-" * 80)
+
+    def show_risers(self, limit: int = 10) -> None:
+        """Print the fastest-rising trends tracked by the analytics engine."""
+        if self.analytics is None:
+            print("Analytics are not enabled.")
+            return
+        risers = self.analytics.top_risers(n=limit)
+        if not risers:
+            print("Not enough history yet to compute risers.")
+            return
+
+        print(f"\nTop {len(risers)} rising trends:\n")
+        for r in risers:
+            print(f"[{r.platform.upper()} #{r.rank}] {r.title} (score={r.score})")
+            print(
+                f"  velocity={r.velocity:+.1f}/h  acceleration={r.acceleration:+.1f}/h^2  "
+                f"top{self.analytics.top_n}={r.time_in_top_n / 60:.0f}min"
+            )
+            print(f"  {r.url}")
+            print("-" * 80)
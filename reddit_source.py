@@ -1,68 +1,257 @@
 """Reddit-based trend source implementation for TrendWatch."""
 
+import random
+import time
+from dataclasses import replace
 from datetime import datetime, timezone
-from typing import List
+from typing import Any, Dict, Iterator, List, Optional
 
 import requests
 
+import metrics
+from http_client import CachedResponse, HTTPCache, default_cache, get_session
 from models import TrendItem
 from base_source import BaseTrendSource
 
+REDDIT_PAGE_MAX = 100
+SORTS = ("hot", "new", "top")
+TIME_FILTERS = ("hour", "day", "week", "month", "year", "all")
+
 
 class RedditTrendSource(BaseTrendSource):
-    """Fetches top posts from a subreddit using the Reddit JSON API."""
+    """Fetches top posts from a subreddit using the Reddit JSON API.
+
+    ``sort`` picks the listing (hot/new/top) and ``time_filter`` the ``t``
+    window used by ``top``. Reddit caps a listing page at 100 posts, so
+    larger limits are fetched page by page following the ``after`` cursor
+    (see iter_listing()).
+
+    When Reddit answers 429 or 5xx the source backs off exponentially
+    (honouring ``Retry-After`` when present); fetches made during the
+    back-off window return an empty list without touching the network.
 
-    def __init__(self, subreddit: str = "news"):
+    Requests go through the shared pooled session and a conditional-request
+    cache. When Reddit answers 304 Not Modified the previous result is reused
+    (re-stamped with the new fetch time) instead of being parsed again, and
+    ``last_not_modified`` is set.
+    """
+
+    def __init__(
+        self,
+        subreddit: str = "news",
+        backoff_base: float = 5.0,
+        backoff_max: float = 900.0,
+        session: Optional[requests.Session] = None,
+        cache: Optional[HTTPCache] = None,
+        sort: str = "top",
+        time_filter: str = "day",
+    ):
+        _check_listing(sort, time_filter)
         self.subreddit = subreddit
-        self.base_url = f"https://www.reddit.com/r/{subreddit}/top.json"
+        self.sort = sort
+        self.time_filter = time_filter
+        self.base_url = self._listing_url(sort)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failures = 0
+        self.backoff_until = 0.0
+        self.session = session or get_session()
+        self.cache = cache or default_cache()
+        self.last_not_modified = False
+        self._last_items: List[TrendItem] = []
+        self._last_limit = 0
 
-    def fetch_trends(self, limit: int = 10) -> List[TrendItem]:
-        """Fetch top posts from the subreddit. Returns an empty list on failure."""
-        headers = {"User-Agent": "TrendWatch/1.0"}
-        params = {
-            "limit": limit,
-            "t": "day",
-        }
+    def _listing_url(self, sort: str) -> str:
+        return f"https://www.reddit.com/r/{self.subreddit}/{sort}.json"
 
-        items: List[TrendItem] = []
+    def backoff_remaining(self) -> float:
+        """Seconds left before the next request is allowed (0 if none)."""
+        return max(0.0, self.backoff_until - time.monotonic())
+
+    def _register_throttle(self, response) -> None:
+        """Start or extend the back-off window after a 429/5xx response."""
+        self.failures += 1
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (self.failures - 1))
+        delay *= random.uniform(0.8, 1.2)
+        retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        self.backoff_until = time.monotonic() + delay
+        metrics.inc("trendwatch_source_errors_total", source=f"reddit:{self.subreddit}", kind="throttled")
+        print(
+            f"[WARN] Reddit returned {response.status_code} for r/{self.subreddit}; "
+            f"backing off {delay:.0f}s."
+        )
 
+    def _request(self, url: str, params: Dict[str, Any]) -> Optional[CachedResponse]:
+        """GET one listing page, handling back-off and errors. None on failure."""
+        remaining = self.backoff_remaining()
+        if remaining > 0:
+            print(f"[INFO] r/{self.subreddit} backing off for another {remaining:.0f}s.")
+            return None
+
+        source = f"reddit:{self.subreddit}"
         try:
-            response = requests.get(
-                self.base_url,
-                headers=headers,
-                params=params,
-                timeout=10,
-            )
-            response.raise_for_status()  # raises for 4xx / 5xx
+            with metrics.timed("trendwatch_source_stage_seconds", source=source, stage="network"):
+                response = self.cache.get(
+                    url,
+                    params=params,
+                    timeout=10,
+                    session=self.session,
+                )
+            metrics.inc("trendwatch_http_responses_total", source=source, status=response.status_code)
+            if metrics.enabled() and not response.not_modified:
+                metrics.inc("trendwatch_fetched_bytes_total", len(response.content or b""), source=source)
+            if response.status_code == 429 or response.status_code >= 500:
+                self._register_throttle(response)
+                return None
+            response.raise_for_status()  # raises for other 4xx
         except requests.RequestException as exc:
             print(f"[ERROR] Failed to fetch from Reddit: {exc}")
-            return items  # empty list => caller knows nothing was fetched
+            metrics.inc("trendwatch_source_errors_total", source=source, kind="request")
+            return None  # caller knows nothing was fetched
+
+        self.failures = 0
+        return response
 
+    def _parse_children(self, response: CachedResponse) -> Optional[Dict[str, Any]]:
+        """Decode a listing body and return its ``data`` object (None on bad JSON)."""
+        source = f"reddit:{self.subreddit}"
         try:
-            data = response.json()
+            with metrics.timed("trendwatch_source_stage_seconds", source=source, stage="parse"):
+                data = response.json()
         except ValueError as exc:
             print(f"[ERROR] Invalid JSON from Reddit: {exc}")
+            metrics.inc("trendwatch_source_errors_total", source=source, kind="json")
+            return None
+        return data.get("data", {}) if isinstance(data, dict) else {}
+
+    @staticmethod
+    def _to_item(post: Dict[str, Any], rank: int, now: datetime) -> TrendItem:
+        return TrendItem(
+            platform="reddit",
+            title=post.get("title", ""),
+            url="https://www.reddit.com" + post.get("permalink", ""),
+            score=int(post.get("score", 0)),
+            rank=rank,
+            fetched_at=now,
+        )
+
+    def fetch_trends(self, limit: int = 10) -> List[TrendItem]:
+        """Fetch top posts from the subreddit. Returns an empty list on failure."""
+        if limit > REDDIT_PAGE_MAX:
+            return list(self.iter_listing(limit))
+
+        params = {
+            "limit": limit,
+            "t": self.time_filter,
+        }
+
+        items: List[TrendItem] = []
+        self.last_not_modified = False
+
+        response = self._request(self.base_url, params)
+        if response is None:
             return items
 
-        children = data.get("data", {}).get("children", [])
+        if response.not_modified and self._last_items and self._last_limit == limit:
+            self.last_not_modified = True
+            now = datetime.now(timezone.utc)
+            return [replace(t, fetched_at=now) for t in self._last_items]
+
+        listing = self._parse_children(response)
+        if listing is None:
+            return items
+
+        children = listing.get("children", [])
         if not children:
             print("[WARN] Reddit returned no posts.")
             return items
 
         now = datetime.now(timezone.utc)
 
-        for rank, child in enumerate(children[:limit], start=1):
-            post = child.get("data", {})
-
-            items.append(
-                TrendItem(
-                    platform="reddit",
-                    title=post.get("title", ""),
-                    url="https://www.reddit.com" + post.get("permalink", ""),
-                    score=int(post.get("score", 0)),
-                    rank=rank,
-                    fetched_at=now,
-                )
-            )
+        with metrics.timed(
+            "trendwatch_source_stage_seconds", source=f"reddit:{self.subreddit}", stage="build"
+        ):
+            for rank, child in enumerate(children[:limit], start=1):
+                items.append(self._to_item(child.get("data", {}), rank, now))
 
+        self._last_items = items
+        self._last_limit = limit
         return items
+
+    def iter_trends(self, limit: int = 10) -> Iterator[TrendItem]:
+        """Yield posts as their listing pages arrive (see iter_listing()).
+
+        A single-page limit goes through fetch_trends() so a 304 Not
+        Modified can still reuse the previous items.
+        """
+        if limit <= REDDIT_PAGE_MAX:
+            yield from self.fetch_trends(limit)
+            return
+        yield from self.iter_listing(limit)
+
+    def iter_listing(
+        self,
+        limit: int,
+        sort: Optional[str] = None,
+        time_filter: Optional[str] = None,
+    ) -> Iterator[TrendItem]:
+        """Yield up to ``limit`` posts, requesting 100-post pages as they are consumed.
+
+        Follows the listing's ``after`` cursor, so only one page is held in
+        memory at a time. Ranks run continuously across pages and every item
+        shares the timestamp of the first request. Stops early when Reddit
+        runs out of posts or a request fails.
+        """
+        sort = sort or self.sort
+        time_filter = time_filter or self.time_filter
+        _check_listing(sort, time_filter)
+        url = self._listing_url(sort)
+
+        now = datetime.now(timezone.utc)
+        rank = 0
+        after: Optional[str] = None
+        while rank < limit:
+            params: Dict[str, Any] = {"limit": min(REDDIT_PAGE_MAX, limit - rank)}
+            if sort == "top":
+                params["t"] = time_filter
+            if after:
+                params["after"] = after
+                params["count"] = rank
+
+            response = self._request(url, params)
+            if response is None:
+                return
+            listing = self._parse_children(response)
+            if not listing:
+                return
+
+            children = listing.get("children", [])
+            for child in children:
+                rank += 1
+                yield self._to_item(child.get("data", {}), rank, now)
+                if rank >= limit:
+                    return
+
+            after = listing.get("after")
+            if not children or not after:
+                return
+
+
+def _check_listing(sort: str, time_filter: str) -> None:
+    """Validate listing parameters early, before any request is made."""
+    if sort not in SORTS:
+        raise ValueError(f"sort must be one of {SORTS}, got {sort!r}")
+    if time_filter not in TIME_FILTERS:
+        raise ValueError(f"time_filter must be one of {TIME_FILTERS}, got {time_filter!r}")
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds; HTTP dates are ignored."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
@@ -0,0 +1,82 @@
+"""Retention policy for the trends store: roll old snapshots up, then drop them.
+
+Raw rows older than ``raw_days`` are folded into hourly aggregates (max
+score, best rank, appearances per URL and hour) and deleted in batches.
+Hourly rows older than ``hourly_days`` are folded into daily aggregates the
+same way, and daily rows older than ``daily_days`` (if set) expire.
+
+Both backends implement ``apply_retention(policy)``. Run it on demand::
+
+    python retention.py --backend sqlite --raw-days 7 --hourly-days 30
+
+or on a schedule through the ``"retention"`` section of a scheduler config.
+"""
+
+import argparse
+from dataclasses import dataclass, fields
+from typing import Dict, List, Optional
+
+from factory import create_db
+
+
+@dataclass
+class RetentionPolicy:
+    """How long each tier is kept. ``daily_days=None`` keeps daily rollups forever.
+
+    ``vacuum`` is SQLite-only: ``"incremental"`` (default; switches the file
+    to auto_vacuum=INCREMENTAL on first use), ``"full"`` or None.
+    """
+    raw_days: float = 7.0
+    hourly_days: float = 30.0
+    daily_days: Optional[float] = None
+    batch_size: int = 5000
+    vacuum: Optional[str] = "incremental"
+
+    @classmethod
+    def from_dict(cls, options: Dict) -> "RetentionPolicy":
+        """Build a policy from config keys, ignoring unrelated ones (e.g. ``interval``)."""
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in options.items() if k in known})
+
+
+def apply_retention(db, policy: Optional[RetentionPolicy] = None) -> Dict[str, int]:
+    """Apply ``policy`` to a backend and print a one-line summary."""
+    policy = policy or RetentionPolicy()
+    report = db.apply_retention(policy)
+    print(
+        "[INFO] Retention: "
+        + ", ".join(f"{key}={value}" for key, value in report.items())
+    )
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Roll up and expire old TrendWatch data")
+    parser.add_argument("--backend", choices=["sqlite", "mongo"], default="sqlite")
+    parser.add_argument("--db", help="SQLite path or Mongo URI")
+    parser.add_argument("--raw-days", type=float, default=7.0)
+    parser.add_argument("--hourly-days", type=float, default=30.0)
+    parser.add_argument("--daily-days", type=float)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--vacuum", choices=["incremental", "full", "none"], default="incremental")
+    args = parser.parse_args(argv)
+
+    options = {}
+    if args.db:
+        options = {"uri": args.db} if args.backend == "mongo" else {"path": args.db}
+    db = create_db(args.backend, **options)
+    apply_retention(
+        db,
+        RetentionPolicy(
+            raw_days=args.raw_days,
+            hourly_days=args.hourly_days,
+            daily_days=args.daily_days,
+            batch_size=args.batch_size,
+            vacuum=None if args.vacuum == "none" else args.vacuum,
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""Headless polling daemon: runs TrendMonitor for each configured source on its own interval.
+
+Usage::
+
+    python scheduler.py scheduler.example.json
+    python scheduler.py my_config.json --once   # poll every source once and exit
+
+The config file is JSON::
+
+    {
+      "backend": "sqlite",
+      "db": {"path": "trends.db", "persistent": true, "journal_mode": "WAL"},
+      "workers": 4,
+      "defaults": {"interval": 300, "jitter": 0.1, "limit": 25, "timeout": 15,
+                   "adaptive": {"min_interval": 60, "max_interval": 1800}},
+      "write_behind": {"max_batch": 1000, "flush_interval": 2.0},
+      "retention": {"interval": 3600, "raw_days": 7, "hourly_days": 30},
+      "clustering": {"threshold": 0.5},
+      "metrics": {"port": 9108},
+      "change_feed": {"port": 8081},
+      "sources": [
+        {"type": "reddit", "subreddit": "news", "interval": 120},
+        {"type": "youtube", "region": "US"}
+      ]
+    }
+
+A ``chunk_size`` (per source or in ``defaults``) streams the source and
+saves every ``chunk_size`` items instead of once per poll (see TrendMonitor).
+The stream is still bounded by ``timeout``; with ``adaptive`` it is ignored.
+
+With ``adaptive`` (``true`` or AdaptivePolling fields), a source whose top
+list has not changed is not saved and is polled less often, and a churning one
+more often, within the given bounds; ``interval`` is then only the start value.
+
+Each poll is rescheduled ``interval`` seconds later, randomly spread by
+``jitter`` (a fraction of the interval) so sources don't fire in lock-step.
+Due polls run in parallel on ``workers`` threads (default 4), so a slow
+source does not delay the others, and each fetch is abandoned after the
+source's ``timeout`` seconds (default 15).
+A source that is backing off (see ``RedditTrendSource.backoff_remaining``)
+is not polled again until its back-off window has passed.
+
+The optional ``write_behind`` section puts a WriteBehindBuffer between the
+monitors and the database (its keys are the buffer's constructor options);
+rows journaled by a previous run are replayed at start-up.
+
+The optional ``change_feed`` section wraps the database in a
+change_feed.ChangeFeed that publishes every newly stored batch, and serves
+it as Server-Sent Events on ``port`` (``{"port": 8081, "poll_interval": 1.0}``;
+other keys are the feed's options). It is inside ``hot_cache`` and outside
+``write_behind``, so it sees rows once they reach the database.
+
+The optional ``hot_cache`` section wraps the database in a
+hot_cache.HotTrendCache (its keys are the cache's options), which serves
+"latest" reads from in-memory ring buffers.
+
+The optional ``clustering`` section gives every monitor a shared
+clustering.StoryClusterer (its keys are the clusterer's options), so each
+stored item gets a cross-platform story cluster id.
+
+The optional ``metrics`` section enables metrics.py instrumentation and
+exports it, either over HTTP (``{"port": 9108}``, scrape ``/metrics``) or
+as a Prometheus text file rewritten every ``interval`` seconds
+(``{"file": "trendwatch.prom", "interval": 15}``).
+
+The optional ``retention`` section runs retention.apply_retention every
+``interval`` seconds (default hourly); its other keys are RetentionPolicy
+fields.
+"""
+
+import argparse
+import heapq
+import json
+import random
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Deque, Dict, List, Optional, Union
+
+import metrics
+from change_feed import ChangeFeed, ChangeFeedServer
+from clustering import StoryClusterer
+from factory import create_db, create_source
+from hot_cache import HotTrendCache
+from monitor import AdaptivePolling, TrendMonitor
+from retention import RetentionPolicy, apply_retention
+from write_buffer import WriteBehindBuffer
+
+
+@dataclass
+class PollJob:
+    """One configured source together with its polling settings."""
+    name: str
+    monitor: TrendMonitor
+    interval: float
+    jitter: float
+    limit: int
+
+    def next_delay(self) -> float:
+        """Seconds until the next poll, including jitter and any source back-off.
+
+        An adaptive monitor's current interval replaces the configured one.
+        """
+        interval = self.monitor.interval if self.monitor.adaptive else self.interval
+        spread = interval * self.jitter
+        delay = interval + random.uniform(-spread, spread)
+        backoff = getattr(self.monitor.source, "backoff_remaining", None)
+        if callable(backoff):
+            delay = max(delay, backoff())
+        return max(1.0, delay)
+
+    def run(self) -> None:
+        """Poll the source once and store the results."""
+        started = time.monotonic()
+        saved = self.monitor.fetch_and_store(limit=self.limit)
+        elapsed = time.monotonic() - started
+        print(f"[INFO] {self.name}: stored {saved} items in {elapsed:.2f}s")
+
+
+@dataclass
+class RetentionJob:
+    """Periodic roll-up and expiry of old rows (see retention.py)."""
+    db: Any
+    policy: RetentionPolicy
+    interval: float = 3600.0
+    name: str = "retention"
+
+    def next_delay(self) -> float:
+        """Seconds until the next retention pass."""
+        return max(1.0, self.interval)
+
+    def run(self) -> None:
+        """Apply the retention policy once."""
+        # Let the write-behind buffer land pending rows before rolling them up
+        flush = getattr(self.db, "flush", None)
+        if callable(flush):
+            flush()
+        try:
+            apply_retention(self.db, self.policy)
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"[ERROR] Retention failed: {exc}")
+
+
+class TrendScheduler:
+    """Polls every job on its own schedule until stop() is called."""
+
+    def __init__(self, jobs: List[Union[PollJob, RetentionJob]], db=None, workers: int = 4):
+        self.jobs = jobs
+        self.db = db
+        self.workers = max(1, int(workers))
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._metrics_server = None
+        self._metrics_writer: Optional[threading.Event] = None
+        self._feed_server: Optional[ChangeFeedServer] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "TrendScheduler":
+        """Build the database, sources and jobs described by a config dict."""
+        db = create_db(config.get("backend", "sqlite"), **config.get("db", {}))
+        if "write_behind" in config:
+            db = WriteBehindBuffer(db, **config["write_behind"])
+            db.replay_journal()
+        feed = None
+        if "change_feed" in config:
+            options = dict(config["change_feed"])
+            server_keys = ("host", "port", "heartbeat", "max_queue")
+            server_options = {key: options.pop(key) for key in server_keys if key in options}
+            feed = db = ChangeFeed(db, **options).start()
+        if "hot_cache" in config:
+            db = HotTrendCache(db, **config["hot_cache"])
+        clusterer = None
+        if "clustering" in config:
+            clusterer = StoryClusterer(**config["clustering"])
+            clusterer.warm(db)
+        defaults = {"interval": 300.0, "jitter": 0.1, "limit": 25, "timeout": 15.0}
+        defaults.update(config.get("defaults", {}))
+
+        jobs: List[Union[PollJob, RetentionJob]] = []
+        for spec in config.get("sources", []):
+            settings = {**defaults, **spec}
+            source = create_source(spec)
+            label = spec.get("subreddit") or spec.get("region") or ""
+            jobs.append(
+                PollJob(
+                    name=f"{spec.get('type', 'reddit')}:{label}".rstrip(":"),
+                    monitor=TrendMonitor(
+                        source,
+                        db,
+                        clusterer=clusterer,
+                        adaptive=_adaptive(settings.get("adaptive")),
+                        interval=float(settings["interval"]),
+                        chunk_size=settings.get("chunk_size"),
+                        source_timeout=float(settings["timeout"]),
+                    ),
+                    interval=float(settings["interval"]),
+                    jitter=float(settings["jitter"]),
+                    limit=int(settings["limit"]),
+                )
+            )
+        if not jobs:
+            raise ValueError("Config defines no sources.")
+        if "retention" in config:
+            options = config["retention"]
+            jobs.append(
+                RetentionJob(
+                    db=db,
+                    policy=RetentionPolicy.from_dict(options),
+                    interval=float(options.get("interval", 3600.0)),
+                )
+            )
+        scheduler = cls(jobs, db, workers=config.get("workers", 4))
+        if feed is not None:
+            scheduler._feed_server = ChangeFeedServer(feed, **server_options).start()
+            print(f"[INFO] Change feed at {scheduler._feed_server.base_url}events")
+        if "metrics" in config:
+            scheduler.start_metrics(**config["metrics"])
+        return scheduler
+
+    def start_metrics(
+        self,
+        port: Optional[int] = None,
+        file: Optional[str] = None,
+        interval: float = 15.0,
+        host: str = "0.0.0.0",
+    ) -> None:
+        """Enable metrics and export them over HTTP on ``port`` and/or to ``file``."""
+        metrics.enable()
+        if port is not None:
+            self._metrics_server = metrics.start_http_server(port, host)
+            print(f"[INFO] Metrics at http://{host}:{port}/metrics")
+        if file:
+            self._metrics_writer = metrics.start_file_writer(file, interval)
+
+    def stop(self, *_args) -> None:
+        """Ask the run loop to exit after the polls in progress (signal-safe)."""
+        self._stop.set()
+        self._wake.set()
+
+    def run(self, once: bool = False) -> None:
+        """Run the polling loop until stopped (or after one round with ``once``).
+
+        Due jobs run on a pool of ``workers`` threads, so a slow source does
+        not hold up the others. A job is not started again while its previous
+        run is still going; its next run is scheduled when it finishes.
+        """
+        # Stagger the first round across the shortest interval
+        first = min(job.interval for job in self.jobs)
+        now = time.monotonic()
+        queue = [
+            (now + (0 if once else random.uniform(0, first * 0.1)), i)
+            for i in range(len(self.jobs))
+        ]
+        heapq.heapify(queue)
+        running = set()
+        finished: Deque[int] = deque()
+
+        def done(index: int, future: Future) -> None:
+            error = future.exception()
+            if error is not None:
+                print(f"[ERROR] Job {self.jobs[index].name} failed: {error}")
+            finished.append(index)
+            self._wake.set()
+
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="trendwatch-job")
+        try:
+            while not self._stop.is_set():
+                while finished:
+                    index = finished.popleft()
+                    running.discard(index)
+                    if not once:
+                        heapq.heappush(queue, (time.monotonic() + self.jobs[index].next_delay(), index))
+                if not queue and not running:
+                    break
+                if queue and queue[0][0] <= time.monotonic():
+                    _due, index = heapq.heappop(queue)
+                    running.add(index)
+                    pool.submit(self.jobs[index].run).add_done_callback(partial(done, index))
+                    continue
+                self._wake.wait(queue[0][0] - time.monotonic() if queue else None)
+                self._wake.clear()
+        finally:
+            # Runs in progress finish (each fetch is bounded by its source_timeout)
+            pool.shutdown(wait=True, cancel_futures=True)
+            self.close()
+
+    def close(self) -> None:
+        """Release database, change feed and metrics exporter resources."""
+        if self._feed_server is not None:
+            self._feed_server.shutdown()
+            self._feed_server.server_close()
+            self._feed_server = None
+        if self._metrics_server is not None:
+            self._metrics_server.shutdown()
+            self._metrics_server.server_close()
+            self._metrics_server = None
+        if self._metrics_writer is not None:
+            self._metrics_writer.set()  # writes the file one last time
+            self._metrics_writer = None
+        close = getattr(self.db, "close", None)
+        if callable(close):
+            close()
+
+
+def _adaptive(options) -> Optional[AdaptivePolling]:
+    """AdaptivePolling from a config value: true for defaults, or a dict of fields."""
+    if not options:
+        return None
+    return AdaptivePolling() if options is True else AdaptivePolling(**options)
+
+
+def load_config(path: str) -> Dict[str, Any]:
+    """Read a JSON scheduler config file."""
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point for the polling daemon."""
+    parser = argparse.ArgumentParser(description="TrendWatch polling daemon")
+    parser.add_argument("config", help="path to a JSON config file")
+    parser.add_argument("--once", action="store_true", help="poll each source once and exit")
+    args = parser.parse_args(argv)
+
+    scheduler = TrendScheduler.from_config(load_config(args.config))
+    signal.signal(signal.SIGINT, scheduler.stop)
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    print(f"[INFO] Scheduler started with {len(scheduler.jobs)} source(s).")
+    scheduler.run(once=args.once)
+    print("[INFO] Scheduler stopped.")
+
+
+if __name__ == "__main__":
+    main()
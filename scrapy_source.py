@@ -1,18 +1,26 @@
 """Scrapy-based Hacker News trend source for TrendWatch."""
 
+import math
+import threading
 from datetime import datetime, timezone
-from typing import List
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import urljoin
 
 import scrapy
-from scrapy.crawler import CrawlerProcess
+from scrapy.crawler import CrawlerRunner
+from twisted.python.failure import Failure
 
+import metrics
 from base_source import BaseTrendSource
 from models import TrendItem
 
+HN_URL = "https://news.ycombinator.com/"
+HN_PAGE_SIZE = 30
+
 
 class HNSpider(scrapy.Spider):
     """
-    Simple Scrapy spider that scrapes Hacker News front page.
+    Simple Scrapy spider that scrapes Hacker News listing pages.
     We use this just to demonstrate a real Scrapy workflow.
     """
     name = "hn_trends"
@@ -21,50 +29,184 @@ class HNSpider(scrapy.Spider):
         "USER_AGENT": "TrendWatchScraper/1.0",
     }
 
-    def __init__(self, limit: int = 10, items_out=None, **kwargs):
+    def __init__(
+        self,
+        limit: int = 10,
+        items_out=None,
+        pages: Optional[Sequence[str]] = None,
+        base_url: str = HN_URL,
+        **kwargs,
+    ):
         super().__init__(**kwargs)
-        self.start_urls = ["https://news.ycombinator.com/"]
+        self.start_urls = [urljoin(base_url, page) for page in (pages or [""])]
+        self._page_index = {url: i for i, url in enumerate(self.start_urls)}
         self.limit = limit
         self.items_out = items_out if items_out is not None else []
 
     def parse(self, response):
         """Parse the Hacker News HTML rows and extract title, URL, and rank."""
+        first_url = response.meta.get("redirect_urls", [response.url])[0]
+        page = self._page_index.get(first_url, 0)
+        metrics.inc("trendwatch_fetched_bytes_total", len(response.body), source="web:hn")
+        metrics.inc("trendwatch_http_responses_total", source="web:hn", status=response.status)
+        with metrics.timed("trendwatch_source_stage_seconds", source="web:hn", stage="parse"):
+            self._parse_rows(response, page)
+
+    def _parse_rows(self, response, page: int) -> None:
+        """Append one item dict per story row of a listing page."""
         # Each story row has class "athing"
         rows = response.css("tr.athing")
 
-        for rank, row in enumerate(rows[: self.limit], start=1):
+        for position, row in enumerate(rows[: self.limit], start=1):
             title = row.css("span.titleline a::text").get(default="").strip()
             url = row.css("span.titleline a::attr(href)").get(default="")
 
-            # Fake score just for ranking purposes
-            score = 1000 - rank * 10
-
             self.items_out.append(
                 {
                     "title": title,
                     "url": url,
-                    "score": score,
-                    "rank": rank,
+                    "rank": position,
+                    "page": page,
                 }
             )
 
 
+class _ReactorThread:
+    """Runs the Twisted reactor once, in a daemon thread, for the whole process.
+
+    The reactor cannot be restarted, so instead of ``CrawlerProcess.start()``
+    per fetch we keep it running in the background and schedule crawls onto
+    it with ``CrawlerRunner`` from any thread.
+    """
+
+    _lock = threading.Lock()
+    _reactor = None
+
+    @classmethod
+    def reactor(cls):
+        """Return the running reactor, starting it on first use."""
+        with cls._lock:
+            if cls._reactor is None:
+                # pylint: disable=import-outside-toplevel
+                from scrapy.utils.reactor import install_reactor
+                from twisted.internet.error import ReactorAlreadyInstalledError
+
+                try:
+                    install_reactor("twisted.internet.asyncioreactor.AsyncioSelectorReactor")
+                except ReactorAlreadyInstalledError:
+                    pass
+                from twisted.internet import reactor  # pylint: disable=import-outside-toplevel
+
+                thread = threading.Thread(
+                    target=reactor.run,
+                    kwargs={"installSignalHandlers": False},
+                    name="trendwatch-reactor",
+                    daemon=True,
+                )
+                thread.start()
+                cls._reactor = reactor
+            return cls._reactor
+
+    @classmethod
+    def crawl(cls, settings: Dict[str, Any], timeout: float, spidercls, **kwargs) -> bool:
+        """Run one crawl on the reactor thread and block until it finishes.
+
+        Returns False if the crawl failed or did not finish within ``timeout``.
+        """
+        reactor = cls.reactor()
+        done = threading.Event()
+        state: Dict[str, Any] = {"ok": False}
+
+        def start() -> None:
+            runner = CrawlerRunner(settings)
+            crawler = runner.create_crawler(spidercls)
+            state["crawler"] = crawler
+            deferred = runner.crawl(crawler, **kwargs)
+
+            def finished(result):
+                state["ok"] = not isinstance(result, Failure)
+                if not state["ok"]:
+                    state["error"] = result
+                done.set()
+
+            deferred.addBoth(finished)
+
+        reactor.callFromThread(start)
+        if not done.wait(timeout):
+            crawler = state.get("crawler")
+            if crawler is not None:
+                reactor.callFromThread(crawler.stop)
+            print(f"[WARN] Scrapy crawl timed out after {timeout:.0f}s.")
+            return False
+        if not state["ok"]:
+            print(f"[ERROR] Scrapy crawl failed: {state.get('error')}")
+        return state["ok"]
+
+
 class ScrapyHNSource(BaseTrendSource):
-    """Scrapes Hacker News front page using Scrapy."""
+    """Scrapes Hacker News listing pages using Scrapy.
+
+    Crawls run on a Twisted reactor that is started once in a background
+    thread, so fetch_trends() can be called repeatedly in the same process.
+
+    ``pages`` lists HN paths to crawl (for example ``["news", "news?p=2",
+    "newest"]``). By default enough front pages are crawled to cover
+    ``limit``. Ranks are numbered continuously across pages in the order
+    given. ``concurrent_requests`` and ``download_delay`` map to Scrapy's
+    ``CONCURRENT_REQUESTS`` and ``DOWNLOAD_DELAY``. Any other Scrapy setting
+    can be passed in ``settings``.
+    """
+
+    def __init__(
+        self,
+        pages: Optional[Sequence[str]] = None,
+        base_url: str = HN_URL,
+        concurrent_requests: int = 8,
+        download_delay: float = 0.0,
+        settings: Optional[Dict[str, Any]] = None,
+        timeout: float = 60.0,
+    ):
+        self.pages = list(pages) if pages else None
+        self.base_url = base_url
+        self.timeout = timeout
+        self.settings: Dict[str, Any] = {
+            "LOG_ENABLED": False,
+            "USER_AGENT": "TrendWatchScraper/1.0",
+            "CONCURRENT_REQUESTS": concurrent_requests,
+            "CONCURRENT_REQUESTS_PER_DOMAIN": concurrent_requests,
+            "DOWNLOAD_DELAY": download_delay,
+        }
+        self.settings.update(settings or {})
+
+    def _pages_for(self, limit: int) -> List[str]:
+        """Pages to crawl: the configured list, or enough front pages for ``limit``."""
+        if self.pages:
+            return self.pages
+        count = max(1, math.ceil(limit / HN_PAGE_SIZE))
+        return ["news"] + [f"news?p={n}" for n in range(2, count + 1)]
+
     def fetch_trends(self, limit: int = 10) -> List[TrendItem]:
-        """Fetch top trends from Hacker News using Scrapy."""
-        items_out: List[dict] = []
+        """Fetch top trends from Hacker News using Scrapy.
 
-        process = CrawlerProcess(
-            settings={
-                "LOG_ENABLED": False,
-                "USER_AGENT": "TrendWatchScraper/1.0",
-            }
-        )
+        Returns an empty list if the crawl fails or exceeds ``timeout``.
+        """
+        items_out: List[dict] = []
 
-        # Run the Scrapy spider synchronously and fill items_out
-        process.crawl(HNSpider, limit=limit, items_out=items_out)
-        process.start()
+        with metrics.timed("trendwatch_source_stage_seconds", source="web:hn", stage="crawl"):
+            ok = _ReactorThread.crawl(
+                self.settings,
+                self.timeout,
+                HNSpider,
+                limit=limit,
+                items_out=items_out,
+                pages=self._pages_for(limit),
+                base_url=self.base_url,
+            )
+        if not ok:
+            # Some pages may be missing, so continuous ranks would be wrong
+            print(f"[ERROR] Scrapy crawl did not complete; discarding {len(items_out)} partial items.")
+            metrics.inc("trendwatch_source_errors_total", source="web:hn", kind="crawl")
+            return []
 
         now = datetime.now(timezone.utc)
         results: List[TrendItem] = []
@@ -73,11 +215,14 @@ class ScrapyHNSource(BaseTrendSource):
             print("[WARN] Scrapy returned no items.")
             return []
 
-        for item in items_out:
+        # Pages finish in any order; restore page order, then number ranks continuously
+        items_out.sort(key=lambda item: (item.get("page", 0), item.get("rank", 0)))
+
+        for rank, item in enumerate(items_out[:limit], start=1):
             title = item.get("title", "")
             url = item.get("url", "")
-            score = int(item.get("score", 0))
-            rank = int(item.get("rank", 0))
+            # Fake score just for ranking purposes, from the rank across all pages
+            score = max(1000 - rank * 10, 0)
 
             results.append(
                 TrendItem(
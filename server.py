@@ -0,0 +1,349 @@
+"""Read-only HTTP API over the trend database, for dashboards and scripts.
+
+Usage::
+
+    python server.py --backend sqlite --db trends.db --port 8080
+    python server.py --backend mongo --db mongodb://localhost:27017
+
+Endpoints (GET, JSON):
+
+- ``/trends/latest?limit=20``: the newest stored trends.
+- ``/trends?platform=&since=&until=&min_score=&limit=&cursor=``: filtered,
+  newest first, one page at a time; pass ``next_cursor`` back as ``cursor``.
+- ``/trends/platform/<platform>?limit=&cursor=``: shorthand for the above.
+- ``/trends/range?since=<ISO>&until=<ISO>&limit=&cursor=``: shorthand too.
+- ``/health``
+
+Every response carries an ETag, and a matching ``If-None-Match`` gets a
+304. Responses are cached in memory and shared by all clients. The cache is
+invalidated when the database reports a new ``data_version()`` (a SQLite
+commit from any process, or a new Mongo document) or when invalidate() is
+called, and entries expire after ``cache_ttl`` seconds in any case.
+Requests are served by a fixed pool of worker threads that share one
+backend object (and so one connection pool).
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import metrics
+from factory import create_db
+
+MAX_LIMIT = 500
+
+
+class APIError(ValueError):
+    """A bad request; its message is returned to the client with a 400."""
+
+
+def item_json(t) -> Dict[str, Any]:
+    """JSON-ready dict for one TrendItem, as served by the API and the change feed."""
+    return {
+        "platform": t.platform,
+        "title": t.title,
+        "url": t.url,
+        "score": t.score,
+        "rank": t.rank,
+        "fetched_at": t.fetched_at.isoformat(),
+    }
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class TrendAPI:
+    """Answers API paths from ``db`` and caches the encoded responses.
+
+    The database's ``data_version()``, if it has one, is polled at most every
+    ``version_interval`` seconds. Cached responses made under an older
+    version are not served again.
+    """
+
+    def __init__(
+        self,
+        db,
+        cache_ttl: float = 5.0,
+        cache_size: int = 512,
+        version_interval: float = 0.5,
+    ):
+        self.db = db
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.version_interval = version_interval
+        self._cache: "OrderedDict[str, Tuple[Any, float, str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._version: Any = None
+        self._version_checked = 0.0
+
+    def invalidate(self) -> None:
+        """Drop every cached response (call after writing through another object)."""
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def _current_version(self) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._version_checked < self.version_interval:
+                return (self._generation, self._version)
+            self._version_checked = now
+        data_version = getattr(self.db, "data_version", None)
+        try:
+            version = data_version() if callable(data_version) else None
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"[ERROR] Could not read data version: {exc}")
+            version = None
+        with self._lock:
+            self._version = version
+            return (self._generation, version)
+
+    def get(self, path: str, query: str = "") -> Tuple[int, str, bytes]:
+        """Return ``(status, etag, body)`` for a GET of ``path`` with ``query``."""
+        key = f"{path}?{query}"
+        version = self._current_version()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] == version and now - entry[1] < self.cache_ttl:
+                self._cache.move_to_end(key)
+                metrics.inc("trendwatch_api_cache_total", result="hit")
+                return 200, entry[2], entry[3]
+        metrics.inc("trendwatch_api_cache_total", result="miss")
+
+        try:
+            payload = self._route(path, parse_qs(query))
+        except APIError as exc:
+            body = json.dumps({"error": str(exc)}).encode("utf-8")
+            return 400, _etag(body), body
+        if payload is None:
+            body = json.dumps({"error": f"no such endpoint: {path}"}).encode("utf-8")
+            return 404, _etag(body), body
+
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        etag = _etag(body)
+        with self._lock:
+            self._cache[key] = (version, now, etag, body)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return 200, etag, body
+
+    def _route(self, path: str, params: Dict[str, List[str]]) -> Optional[Dict[str, Any]]:
+        parts = [unquote(p) for p in path.strip("/").split("/") if p]
+        if parts == ["health"]:
+            return {"status": "ok"}
+        if not parts or parts[0] != "trends":
+            return None
+        if parts == ["trends", "latest"]:
+            items = self.db.get_latest(limit=_limit(params, 20))
+            return {"items": [item_json(t) for t in items], "next_cursor": None}
+        if parts == ["trends"]:
+            return self._query(params)
+        if len(parts) == 3 and parts[1] == "platform":
+            return self._query(params, platform=parts[2])
+        if parts == ["trends", "range"]:
+            if "since" not in params:
+                raise APIError("range needs a 'since' parameter")
+            return self._query(params)
+        return None
+
+    def _query(self, params: Dict[str, List[str]], platform: Optional[str] = None) -> Dict[str, Any]:
+        min_score = _param(params, "min_score")
+        try:
+            page = self.db.query(
+                platform=platform or _param(params, "platform"),
+                since=_time(params, "since"),
+                until=_time(params, "until"),
+                min_score=int(min_score) if min_score is not None else None,
+                limit=_limit(params, 50),
+                cursor=_param(params, "cursor"),
+            )
+        except ValueError as exc:
+            raise APIError(str(exc)) from exc
+        return {"items": [item_json(t) for t in page.items], "next_cursor": page.next_cursor}
+
+
+def _param(params: Dict[str, List[str]], name: str) -> Optional[str]:
+    values = params.get(name)
+    return values[0] if values else None
+
+
+def _limit(params: Dict[str, List[str]], default: int) -> int:
+    value = _param(params, "limit")
+    try:
+        limit = int(value) if value is not None else default
+    except ValueError as exc:
+        raise APIError(f"limit must be an integer, got {value!r}") from exc
+    return max(1, min(MAX_LIMIT, limit))
+
+
+def _time(params: Dict[str, List[str]], name: str) -> Optional[datetime]:
+    value = _param(params, name)
+    if value is None:
+        return None
+    try:
+        when = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError as exc:
+        raise APIError(f"{name} must be an ISO 8601 time, got {value!r}") from exc
+    # Any offset is accepted; the backends compare in UTC
+    return when.astimezone(timezone.utc) if when.tzinfo else when.replace(tzinfo=timezone.utc)
+
+
+def _endpoint(path: str) -> str:
+    """Metric label for ``path``: its route name, so arbitrary paths add no label values."""
+    parts = [p for p in path.strip("/").split("/") if p]
+    if parts == ["health"]:
+        return "health"
+    if parts == ["trends"]:
+        return "query"
+    if parts in (["trends", "latest"], ["trends", "range"]):
+        return parts[1]
+    if len(parts) == 3 and parts[:2] == ["trends", "platform"]:
+        return "platform"
+    return "not_found"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "TrendServer"
+    protocol_version = "HTTP/1.1"  # keep-alive for polling dashboards
+    timeout = 5  # idle keep-alive connections give their worker back
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve one API request."""
+        parts = urlsplit(self.path)
+        try:
+            status, etag, body = self.server.api.get(parts.path, parts.query)
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"[ERROR] API request {self.path} failed: {exc}")
+            status, body = 500, b'{"error":"internal error"}'
+            etag = _etag(body)
+        metrics.inc("trendwatch_api_requests_total", endpoint=_endpoint(parts.path), status=status)
+
+        if status == 200 and _etag_matches(self.headers.get("If-None-Match"), etag):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self._release_if_saturated()
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self._release_if_saturated()
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _release_if_saturated(self) -> None:
+        # Keep-alive would hold this worker while other connections wait for one
+        if self.server.saturated():
+            self.send_header("Connection", "close")
+
+    def log_message(self, *_args):
+        pass
+
+
+class TrendServer(HTTPServer):
+    """HTTP server that hands each connection to a fixed pool of ``workers`` threads.
+
+    Connections are kept alive between requests. When every worker is busy
+    and more connections are waiting, each response closes its connection,
+    so a waiting client gets a worker as soon as a busy client makes its
+    next request (or an idle one reaches the handler's 5 s timeout).
+    """
+
+    def __init__(self, api: TrendAPI, host: str = "127.0.0.1", port: int = 8080, workers: int = 8):
+        super().__init__((host, port), _Handler)
+        self.api = api
+        self.workers = max(1, workers)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="trendwatch-api")
+        self._connections = 0  # accepted and not yet closed, including queued ones
+        self._connections_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def saturated(self) -> bool:
+        """Whether accepted connections are waiting for a free worker."""
+        return self._connections > self.workers
+
+    def process_request(self, request, client_address):
+        with self._connections_lock:
+            self._connections += 1
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:  # pylint: disable=broad-except
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self._connections_lock:
+                self._connections -= 1
+
+    def start(self) -> "TrendServer":
+        """Serve from a daemon thread; returns self."""
+        threading.Thread(target=self.serve_forever, name="trendwatch-api-server", daemon=True).start()
+        return self
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="TrendWatch read-only HTTP API")
+    parser.add_argument("--backend", choices=["sqlite", "mongo"], default="sqlite")
+    parser.add_argument("--db", help="SQLite path (default trends.db) or Mongo URI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=8, help="request worker threads")
+    parser.add_argument("--cache-ttl", type=float, default=5.0, help="seconds a cached response may be served")
+    args = parser.parse_args(argv)
+
+    if args.backend == "mongo":
+        db = create_db("mongo", **({"uri": args.db} if args.db else {}))
+    else:
+        db = create_db(
+            "sqlite", path=args.db or "trends.db", persistent=True, journal_mode="WAL", synchronous="NORMAL"
+        )
+    server = TrendServer(TrendAPI(db, cache_ttl=args.cache_ttl), args.host, args.port, args.workers)
+    print(f"[INFO] Serving TrendWatch API at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        close = getattr(db, "close", None)
+        if callable(close):
+            close()
+        print("[INFO] API server stopped.")
+
+
+if __name__ == "__main__":
+    main()
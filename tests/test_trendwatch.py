@@ -1,13 +1,45 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
 import unittest
-from datetime import datetime, timezone
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from typing import List
 
-from models import TrendItem
+try:
+    import mongomock
+except ImportError:  # the Mongo tests are skipped without it
+    mongomock = None
+
+from models import TrendBatch, TrendItem
 from reddit_source import RedditTrendSource
-from monitor import TrendMonitor
+from monitor import AdaptivePolling, TrendMonitor
 from db import TrendDatabase
 from youtube_source import YouTubeTrendSource
 from base_source import BaseTrendSource
+from analytics import TrendAnalytics
+from http_client import HTTPCache
+import transfer
+from factory import parse_source_spec
+import main
+from write_buffer import WriteBehindBuffer
+from hot_cache import HotTrendCache
+from retention import RetentionPolicy
+from clustering import StoryClusterer
+from url_utils import canonical_url, story_url
+from benchmarks.stub_server import StubRedditSource, StubServer
+from hn_source import HNWebSource
+import metrics
+import requests
+from pymongo.errors import BulkWriteError
+import mongo_db
+from server import TrendAPI, TrendServer
+from change_feed import ChangeFeed, ChangeFeedServer
+from scheduler import PollJob, TrendScheduler
 
 
 class TestTrendItem(unittest.TestCase):
@@ -86,5 +118,927 @@ class TestMonitorWithEmptySource(unittest.TestCase):
         self.assertEqual(len(latest), 0)
 
 
+class SlowSource(BaseTrendSource):
+    """Fake source that sleeps before returning, for timeout testing."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def fetch_trends(self, limit: int = 10) -> List[TrendItem]:
+        time.sleep(self.delay)
+        return YouTubeTrendSource(region="SLOW").fetch_trends(limit=limit)
+
+
+class FailingSource(BaseTrendSource):
+    """Fake source that always raises."""
+
+    def fetch_trends(self, limit: int = 10) -> List[TrendItem]:
+        raise RuntimeError("boom")
+
+
+class AbortingSource(BaseTrendSource):
+    """Fake streaming source whose connection drops after ``fail_after`` items."""
+
+    def __init__(self, fail_after: int):
+        self.fail_after = fail_after
+
+    def fetch_trends(self, limit: int = 10) -> List[TrendItem]:
+        return list(self.iter_trends(limit))
+
+    def iter_trends(self, limit: int = 10):
+        for item in RedditFake().fetch_trends(limit=limit)[: self.fail_after]:
+            yield item
+        raise ConnectionError("connection reset")
+
+
+class StallingSource(BaseTrendSource):
+    """Fake streaming source that stops yielding after ``stall_after`` items."""
+
+    def __init__(self, stall_after: int, delay: float = 2.0):
+        self.stall_after = stall_after
+        self.delay = delay
+
+    def fetch_trends(self, limit: int = 10) -> List[TrendItem]:
+        return list(self.iter_trends(limit))
+
+    def iter_trends(self, limit: int = 10):
+        for item in RedditFake().fetch_trends(limit=limit)[: self.stall_after]:
+            yield item
+        time.sleep(self.delay)
+        yield from RedditFake().fetch_trends(limit=limit)[self.stall_after:]
+
+
+class TestHotTrendCache(unittest.TestCase):
+    def test_latest_served_from_memory_after_warm(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "hot.db")
+            db = TrendDatabase(path)
+            db.save_trends(YouTubeTrendSource(region="US").fetch_trends(limit=5))
+
+            cache = HotTrendCache(TrendDatabase(path), capacity=8, per_platform=4)
+            cache.save_trends(RedditFake().fetch_trends(limit=6))
+            with mock.patch.object(cache.db, "get_latest", wraps=cache.db.get_latest) as backend:
+                self.assertEqual(cache.get_latest(limit=8), db.get_latest(limit=8))
+                self.assertEqual(
+                    cache.get_latest(limit=3, platform="youtube"),
+                    db.query(platform="youtube", limit=3).items,
+                )
+                backend.assert_not_called()
+                # Beyond the ring's capacity the backend answers
+                self.assertEqual(len(cache.get_latest(limit=11)), 11)
+                backend.assert_called_once()
+
+
+class TestAPIServer(unittest.TestCase):
+    def test_etag_revalidation_and_invalidation_on_write(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "api.db")
+            db = TrendDatabase(path, persistent=True)
+            db.save_trends(YouTubeTrendSource(region="US").fetch_trends(limit=3))
+            server = TrendServer(TrendAPI(db, version_interval=0), port=0).start()
+            try:
+                session = requests.Session()
+                url = server.base_url + "trends/latest?limit=2"
+                first = session.get(url)
+                etag = first.headers["ETag"]
+                self.assertEqual(len(first.json()["items"]), 2)
+                self.assertEqual(session.get(url, headers={"If-None-Match": etag}).status_code, 304)
+
+                # A commit from another connection makes the cached response stale
+                TrendDatabase(path).save_trends(RedditFake().fetch_trends(limit=1))
+                fresh = session.get(url, headers={"If-None-Match": etag})
+                self.assertEqual(fresh.status_code, 200)
+                self.assertEqual(fresh.json()["items"][0]["platform"], "reddit")
+
+                page = session.get(server.base_url + "trends/platform/youtube?limit=2").json()
+                rest = session.get(
+                    server.base_url + "trends/platform/youtube",
+                    params={"limit": 2, "cursor": page["next_cursor"]},
+                ).json()
+                self.assertEqual(len(page["items"]) + len(rest["items"]), 3)
+                self.assertEqual(session.get(server.base_url + "trends?limit=x").status_code, 400)
+            finally:
+                server.shutdown()
+                server.server_close()
+                db.close()
+
+
+    def test_range_with_utc_offset(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "api.db"))
+            noon = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+            db.save_trends([TrendItem("web", "t", "https://x.com/1", 1, 1, noon)])
+            api = TrendAPI(db)
+            for since in ("2026-01-01T16:00:00%2B05:00", "2026-01-01T11:00:00Z"):
+                status, _etag, body = api.get("/trends/range", f"since={since}")
+                self.assertEqual((status, len(json.loads(body)["items"])), (200, 1))
+
+    def test_waiting_client_not_starved_by_keep_alive(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "api.db"), persistent=True)
+            server = TrendServer(TrendAPI(db), port=0, workers=1).start()
+            try:
+                dashboard = requests.Session()
+                url = server.base_url + "health"
+                dashboard.get(url)  # keeps the only worker
+                waiting = ThreadPoolExecutor(max_workers=1).submit(requests.get, url, timeout=10)
+                time.sleep(0.2)
+                self.assertEqual(dashboard.get(url).headers.get("Connection"), "close")
+                started = time.monotonic()
+                self.assertEqual(waiting.result().status_code, 200)
+                self.assertLess(time.monotonic() - started, 2)
+            finally:
+                server.shutdown()
+                server.server_close()
+                db.close()
+
+
+class TestChangeFeed(unittest.TestCase):
+    def test_filtered_subscribers_and_sse_resume(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "feed.db")
+            feed = ChangeFeed(TrendDatabase(path, persistent=True), poll_interval=0.05)
+            received = []
+            feed.subscribe(lambda items, cursor: received.extend(items), platform="youtube", min_score=490)
+            TrendMonitor(YouTubeTrendSource(region="US"), feed).fetch_and_store(limit=5)
+            TrendMonitor(RedditFake(), feed).fetch_and_store(limit=3)
+            stored, cursor = feed.get_since(None)
+            self.assertEqual(cursor, 8)
+            self.assertEqual(received, [t for t in stored if t.platform == "youtube" and t.score >= 490])
+            self.assertTrue(0 < len(received) < 5)
+
+            # A client that saw the first batch (cursor 5) gets the reddit rows on
+            # reconnect, then a row written by another process once the feed sees it
+            server = ChangeFeedServer(feed.start(), port=0).start()
+            try:
+                response = requests.get(
+                    server.base_url + "events?platform=reddit",
+                    headers={"Last-Event-ID": "5"},
+                    stream=True,
+                    timeout=5,
+                )
+                # chunk_size=1: yield each line as it arrives instead of waiting for 512 bytes
+                lines = response.iter_lines(chunk_size=1, decode_unicode=True)
+                self.assertEqual(next(lines), "id: 8")
+                TrendDatabase(path).save_trends(RedditFake().fetch_trends(limit=1))
+                data = []
+                for line in lines:
+                    if line.startswith("data:"):
+                        data.append(json.loads(line[5:]))
+                    if len(data) == 2:
+                        break
+                response.close()
+            finally:
+                server.shutdown()
+                server.server_close()
+                feed.close()
+            self.assertEqual([len(event["items"]) for event in data], [3, 1])
+            self.assertEqual(data[1]["cursor"], 9)
+
+
+class TestStreamingMonitor(unittest.TestCase):
+    def test_chunks_saved_before_abort_are_kept(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "stream.db"))
+            with mock.patch.object(db, "save_trends", wraps=db.save_trends) as save:
+                monitor = TrendMonitor(AbortingSource(fail_after=5), db, chunk_size=2)
+                self.assertEqual(monitor.fetch_and_store(limit=10), 5)
+            self.assertEqual([len(call.args[0]) for call in save.call_args_list], [2, 2, 1])
+            self.assertEqual(len(db.get_latest(limit=10)), 5)
+
+    def test_stalled_stream_times_out_and_keeps_items_read(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "stall.db"))
+            monitor = TrendMonitor(StallingSource(stall_after=3), db, source_timeout=0.3, chunk_size=2)
+            start = time.monotonic()
+            self.assertEqual(monitor.fetch_and_store(limit=10), 3)
+            self.assertLess(time.monotonic() - start, 1.5)
+            self.assertEqual(len(db.get_latest(limit=10)), 3)
+
+    def test_chunk_size_ignored_for_several_sources(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "multi.db"))
+            sources = [YouTubeTrendSource(region="US"), YouTubeTrendSource(region="DE")]
+            monitor = TrendMonitor(sources, db, chunk_size=2)
+            self.assertIsNone(monitor.chunk_size)
+            self.assertEqual(monitor.fetch_and_store(limit=3), 6)
+
+    def test_default_async_adapter(self):
+        async def collect():
+            return [t.rank async for t in YouTubeTrendSource().aiter_trends(limit=5, chunk_size=2)]
+
+        self.assertEqual(asyncio.run(collect()), [1, 2, 3, 4, 5])
+
+
+class TestMonitorWithManySources(unittest.TestCase):
+    def test_concurrent_fetch_merges_and_skips_bad_sources(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "multi.db"))
+            sources = [
+                YouTubeTrendSource(region="US"),
+                YouTubeTrendSource(region="DE"),
+                FailingSource(),
+                SlowSource(delay=2.0),
+            ]
+            monitor = TrendMonitor(sources, db, max_workers=4, source_timeout=0.3)
+
+            start = time.monotonic()
+            saved = monitor.fetch_and_store(limit=3)
+            elapsed = time.monotonic() - start
+
+            # Slow source is abandoned, failing source is skipped
+            self.assertLess(elapsed, 1.5)
+            self.assertEqual(saved, 6)
+            latest = db.get_latest(limit=10)
+            self.assertEqual(len(latest), 6)
+            self.assertEqual({t.title.split("(")[1] for t in latest}, {"US)", "DE)"})
+
+    def test_single_slow_source_times_out(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "single.db"))
+            monitor = TrendMonitor(SlowSource(delay=2.0), db, source_timeout=0.3)
+            start = time.monotonic()
+            self.assertEqual(monitor.fetch_and_store(limit=3), 0)
+            self.assertLess(time.monotonic() - start, 1.5)
+
+    def test_timed_out_fetch_leaves_one_daemon_thread(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "stray.db"))
+            monitor = TrendMonitor(SlowSource(delay=1.0), db, source_timeout=0.2)
+            before = set(threading.enumerate())
+            self.assertEqual(monitor.fetch_and_store(limit=3), 0)
+            # The abandoned fetch is still running, so the source is skipped
+            self.assertEqual(monitor.fetch_and_store(limit=3), 0)
+            stray = [t for t in set(threading.enumerate()) - before if t.name == "trendwatch-fetch"]
+            self.assertEqual(len(stray), 1)
+            self.assertTrue(stray[0].daemon)
+            stray[0].join(timeout=2.0)
+            monitor.sources[0].delay = 0.0
+            self.assertEqual(monitor.fetch_and_store(limit=3), 3)
+
+
+class TestScheduler(unittest.TestCase):
+    def test_due_jobs_run_in_parallel(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "sched.db"))
+            jobs = [
+                PollJob(f"slow{i}", TrendMonitor(SlowSource(delay=0.6), db), 60, 0, 3)
+                for i in range(3)
+            ]
+            start = time.monotonic()
+            TrendScheduler(jobs, db, workers=3).run(once=True)
+            self.assertLess(time.monotonic() - start, 1.2)
+            self.assertEqual(len(TrendDatabase(os.path.join(tmp, "sched.db")).get_latest(limit=20)), 9)
+
+
+class TestSQLitePersistentWAL(unittest.TestCase):
+    def test_reads_do_not_block_on_open_write(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "wal.db")
+            db = TrendDatabase(
+                path, persistent=True, journal_mode="WAL", synchronous="NORMAL", busy_timeout=0.5
+            )
+            db.save_trends(YouTubeTrendSource().fetch_trends(limit=2))
+            with db._connect() as conn:
+                self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+            # Hold an exclusive write transaction open on a separate connection;
+            # with a rollback journal this would lock readers out
+            writer = db._open()
+            writer.execute("BEGIN EXCLUSIVE")
+            writer.execute(
+                "INSERT INTO trends (platform, title, url, score, rank, fetched_at) "
+                "VALUES ('web', 't', 'u', 1, 1, '2024-01-01T00:00:00+00:00')"
+            )
+            try:
+                self.assertEqual(len(db.get_latest(limit=10)), 2)
+            finally:
+                writer.rollback()
+                writer.close()
+                db.close()
+
+
+class RedditFake(BaseTrendSource):
+    """Offline stand-in producing reddit-platform items."""
+
+    def fetch_trends(self, limit: int = 10) -> List[TrendItem]:
+        now = datetime.now(timezone.utc)
+        return [
+            TrendItem(
+                platform="reddit",
+                title=f"Post {i}",
+                url=f"https://www.reddit.com/r/news/comments/{i}",
+                score=1000 - i,
+                rank=i,
+                fetched_at=now,
+            )
+            for i in range(1, limit + 1)
+        ]
+
+
+class TestSQLiteQuery(unittest.TestCase):
+    def test_filtered_keyset_pagination(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "query.db"))
+            db.save_trends(YouTubeTrendSource(region="US").fetch_trends(limit=5))
+            db.save_trends(RedditFake().fetch_trends(limit=5))
+
+            seen: List[TrendItem] = []
+            cursor = None
+            while True:
+                page = db.query(platform="youtube", min_score=480, limit=2, cursor=cursor)
+                seen.extend(page.items)
+                cursor = page.next_cursor
+                if cursor is None:
+                    break
+
+            self.assertEqual(len(seen), 4)
+            self.assertTrue(all(t.platform == "youtube" for t in seen))
+            self.assertTrue(all(t.score >= 480 for t in seen))
+
+            later = datetime.now(timezone.utc)
+            self.assertEqual(db.query(since=later).items, [])
+
+    def test_time_bounds_with_other_offsets(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "tz.db"))
+            noon = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+            db.save_trends([TrendItem("web", "t", "https://x.com/1", 1, 1, noon)])
+            plus5 = timezone(timedelta(hours=5))
+
+            # 16:00+05:00 is 11:00Z, before the row; 16:30+05:00 is 11:30Z
+            self.assertEqual(len(db.query(since=datetime(2026, 1, 1, 16, 0, tzinfo=plus5)).items), 1)
+            self.assertEqual(len(db.query(until=datetime(2026, 1, 1, 16, 30, tzinfo=plus5)).items), 0)
+            # Naive bounds are UTC
+            self.assertEqual(len(db.query(since=datetime(2026, 1, 1, 11, 0)).items), 1)
+            self.assertEqual(len(db.query(since=datetime(2026, 1, 1, 13, 0)).items), 0)
+
+    def test_platform_query_uses_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "plan.db"))
+            conn = db._open()
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM trends WHERE platform = ? "
+                "ORDER BY fetched_at DESC, id DESC",
+                ("web",),
+            ).fetchall()
+            conn.close()
+            self.assertIn("idx_trends_platform_fetched", str(plan))
+
+
+class TestSQLiteDedupe(unittest.TestCase):
+    def test_repeated_fetches_keep_one_row_per_url(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "dedupe.db"), dedupe=True)
+            source = RedditFake()
+            for _ in range(3):
+                db.save_trends(source.fetch_trends(limit=4))
+
+            summaries = db.get_summaries(limit=10)
+            self.assertEqual(len(summaries), 4)
+            self.assertEqual(max(s.peak_score for s in summaries), 999)
+            self.assertLessEqual(summaries[0].first_seen, summaries[0].last_seen)
+
+            # Each fetch is still visible as history
+            self.assertEqual(len(db.get_latest(limit=100)), 12)
+            page = db.query(platform="reddit", limit=5)
+            self.assertEqual(len(page.items), 5)
+            self.assertIsNotNone(page.next_cursor)
+
+
+def _mongomock_bulk_updates() -> bool:
+    """Whether this mongomock accepts the options newer pymongo puts on UpdateOne (``sort``)."""
+    if mongomock is None:
+        return False
+    from pymongo import UpdateOne  # pylint: disable=import-outside-toplevel
+    try:
+        mongomock.MongoClient().db.probe.bulk_write([UpdateOne({}, {"$set": {"a": 1}})])
+    except TypeError:
+        return False
+    return True
+
+
+@unittest.skipUnless(mongomock, "mongomock is not installed")
+class TestMongoBackend(unittest.TestCase):
+    def make_db(self, **kwargs):
+        with mock.patch.object(mongo_db, "MongoClient", mongomock.MongoClient):
+            db = mongo_db.MongoTrendDB(db_name=self._testMethodName, **kwargs)
+        self.addCleanup(db.client.drop_database, self._testMethodName)
+        return db
+
+    def test_save_latest_and_query_pages(self):
+        db = self.make_db()
+        youtube = YouTubeTrendSource(region="US").fetch_trends(limit=5)
+        self.assertTrue(db.save_trends(youtube))
+        self.assertTrue(db.save_trends(RedditFake().fetch_batch(limit=4)))
+
+        latest = db.get_latest(limit=3)
+        self.assertEqual([(t.platform, t.rank) for t in latest], [("reddit", 4), ("reddit", 3), ("reddit", 2)])
+        self.assertEqual(len(db.get_latest(limit=3, as_batch=True)), 3)
+
+        pages, cursor = [], None
+        while True:
+            page = db.query(platform="youtube", limit=2, cursor=cursor)
+            pages.append(len(page.items))
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(pages, [2, 2, 1])
+        self.assertEqual(
+            {t.score for t in db.query(min_score=998, limit=10).items}, {998, 999}
+        )
+        with self.assertRaises(ValueError):
+            db.query(cursor="not-a-cursor")
+
+    def test_export_cursor_error_is_raised(self):
+        db = self.make_db()
+        db.save_trends(RedditFake().fetch_trends(limit=3))
+        with mock.patch.object(db._history, "find", side_effect=RuntimeError("cursor killed")):
+            with self.assertRaises(RuntimeError):
+                list(db.iter_chunks(2))
+
+    def test_snapshots_saved_when_url_upsert_fails(self):
+        db = self.make_db(dedupe=True)
+        error = BulkWriteError({"writeErrors": [{"index": 0, "errmsg": "boom"}], "nUpserted": 2})
+        with mock.patch.object(db.urls, "bulk_write", side_effect=error):
+            self.assertFalse(db.save_trends(RedditFake().fetch_trends(limit=3)))
+        self.assertEqual(db.snapshots.count_documents({}), 3)
+        self.assertEqual(len(db.last_write_errors), 1)
+
+    @unittest.skipUnless(_mongomock_bulk_updates(), "mongomock rejects pymongo's UpdateOne")
+    def test_interrupted_rollup_is_not_counted_twice(self):
+        db = self.make_db()
+        when = (datetime.now(timezone.utc) - timedelta(days=10)).replace(minute=10, second=0, microsecond=0)
+        db.save_trends([
+            TrendItem("reddit", "A", "https://a", 10 + i, 1, when + timedelta(minutes=i)) for i in range(3)
+        ])
+        policy = RetentionPolicy(raw_days=7, hourly_days=30, batch_size=2)
+        # Crash after the first batch was rolled up but before its raw documents were deleted
+        with mock.patch.object(db.collection, "delete_many", side_effect=RuntimeError("crash")):
+            db.apply_retention(policy)
+        self.assertEqual(db.hourly.find_one({"url": "https://a"})["appearances"], 2)
+
+        self.assertEqual(db.apply_retention(policy)["raw_rolled"], 3)
+        self.assertEqual(db.collection.count_documents({}), 0)
+        rollup = db.hourly.find_one({"url": "https://a"})
+        self.assertEqual((rollup["appearances"], rollup["max_score"]), (3, 12))
+
+
+class TestSQLiteRetention(unittest.TestCase):
+    def test_old_rows_are_rolled_up_then_deleted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "retention.db"))
+            # Mid-hour, so the two 10-day-old rows always share an hourly bucket
+            now = datetime.now(timezone.utc).replace(minute=30, second=0, microsecond=0)
+            for hours in (0, 24 * 10, 24 * 10 + 0.1, 24 * 40):
+                when = now - timedelta(hours=hours)
+                db.save_trends([TrendItem("reddit", "A", "https://a", 10 + int(hours), 2, when)])
+
+            report = db.apply_retention(RetentionPolicy(raw_days=7, hourly_days=30, batch_size=1))
+            self.assertEqual(report["raw_rolled"], 3)
+            self.assertEqual(report["hourly_rolled"], 1)
+            self.assertEqual(len(db.get_latest(limit=10)), 1)
+
+            with db._connect() as conn:
+                hourly = conn.execute(
+                    "SELECT max_score, best_rank, appearances FROM trends_hourly"
+                ).fetchall()
+                daily = conn.execute("SELECT appearances FROM trends_daily").fetchall()
+            self.assertEqual(hourly, [(250, 2, 2)])
+            self.assertEqual(daily, [(1,)])
+
+
+class TestSQLiteSearch(unittest.TestCase):
+    def test_search_ranks_matches_and_applies_filters(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for dedupe in (False, True):
+                db = TrendDatabase(os.path.join(tmp, f"search{dedupe}.db"), dedupe=dedupe)
+                now = datetime.now(timezone.utc)
+                for minutes in (10, 0):
+                    when = now - timedelta(minutes=minutes)
+                    db.save_trends([
+                        TrendItem("reddit", "Rust compiler released", "https://a", 5 + minutes, 1, when),
+                        TrendItem("web", "Rust rust everywhere", "https://b", 7, 2, when),
+                        TrendItem("web", "Python news", "https://c", 9, 3, when),
+                    ])
+
+                hits = db.search("rust", limit=10)
+                self.assertEqual([h.url for h in hits], ["https://b", "https://a"])
+                self.assertEqual(hits[1].score, 5)  # latest observation per URL
+                self.assertEqual([h.url for h in db.search("rust", platform="reddit")], ["https://a"])
+                self.assertEqual(db.search("rust compiler")[0].url, "https://a")
+                self.assertEqual(db.search("rust", since=now + timedelta(minutes=1)), [])
+                self.assertEqual(db.search('"OR'), [])
+
+
+class TestStoryClustering(unittest.TestCase):
+    def test_story_url_strips_tracking_and_redirects(self):
+        self.assertEqual(
+            story_url("https://www.google.com/url?q=https://Example.com/a/?utm_source=x&sa=D"),
+            "https://example.com/a",
+        )
+        self.assertEqual(story_url("https://example.com/a?id=3&fbclid=abc#top"), "https://example.com/a?id=3")
+        # Generic names can carry content, e.g. a GitHub branch
+        self.assertEqual(story_url("https://github.com/o/r?ref=dev"), "https://github.com/o/r?ref=dev")
+        # The storage key keeps the query as it is
+        self.assertEqual(
+            canonical_url("https://Example.com/a/?utm_source=x#top"), "https://example.com/a?utm_source=x"
+        )
+
+    def test_near_duplicates_share_a_cluster_across_platforms(self):
+        now = datetime.now(timezone.utc)
+        items = [
+            TrendItem("reddit", "Apple announces new iPhone 17 with satellite messaging",
+                      "https://www.reddit.com/r/news/1", 500, 1, now),
+            TrendItem("web", "Apple announces the new iPhone 17 with satellite messaging",
+                      "https://apple.com/iphone?utm_source=hn", 300, 2, now),
+            TrendItem("web", "Rust 2.0 released", "https://rust-lang.org/2", 100, 3, now),
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "stories.db"))
+            source = RedditFake()
+            source.fetch_trends = lambda limit=10: items
+            TrendMonitor(source, db, clusterer=StoryClusterer()).fetch_and_store()
+
+            stories = db.get_stories(limit=10)
+            self.assertEqual(len(stories), 2)
+            self.assertEqual(stories[0].platforms, ["reddit", "web"])
+            self.assertEqual((stories[0].urls, stories[0].total_score), (2, 800))
+
+            # A restarted clusterer continues the same ids
+            clusterer = StoryClusterer()
+            clusterer.warm(db)
+            self.assertEqual(clusterer.assign("https://apple.com/iphone", "anything"), stories[0].cluster_id)
+            self.assertEqual(clusterer.assign("https://new.example", "Unrelated headline"), 3)
+
+
+class TestRecordedFixtures(unittest.TestCase):
+    def test_reddit_pages_from_stub_server(self):
+        with StubServer() as server:
+            source = StubRedditSource(server.base_url, cache=HTTPCache())
+            items = source.fetch_trends(limit=150)
+            self.assertEqual(len(items), 150)
+            self.assertEqual([t.rank for t in items[:3]], [1, 2, 3])
+            self.assertTrue(items[0].url.startswith("https://www.reddit.com/r/news/comments/"))
+
+            # Second identical request is answered 304 and served from the cache
+            source.fetch_trends(limit=10)
+            again = source.fetch_trends(limit=10)
+            self.assertTrue(source.last_not_modified)
+            self.assertEqual(len(again), 10)
+
+    def test_hn_pages_parsed_with_lxml(self):
+        with StubServer() as server:
+            source = HNWebSource(base_url=server.base_url, cache=HTTPCache())
+            items = source.fetch_trends(limit=45)
+
+        self.assertEqual(len(items), 45)
+        self.assertEqual([t.rank for t in items], list(range(1, 46)))
+        # Real points from the subtext rows, not a rank-derived placeholder
+        self.assertEqual((items[0].score, items[30].score), (1422, 1370))
+        first = source.last_stories[0]
+        self.assertEqual((first.item_id, first.comments), (41000007, 735))
+
+    def test_scrapy_placeholder_scores_follow_continuous_ranks(self):
+        try:
+            from scrapy_source import ScrapyHNSource
+        except ImportError:
+            self.skipTest("scrapy is not installed")
+        with StubServer() as server:
+            items = ScrapyHNSource(base_url=server.base_url).fetch_trends(limit=45)
+
+        self.assertEqual([t.rank for t in items], list(range(1, 46)))
+        # No jump back up at the page boundary
+        self.assertEqual([t.score for t in items[28:32]], [710, 700, 690, 680])
+
+    def test_scrapy_source_fetches_repeatedly(self):
+        try:
+            from scrapy_source import ScrapyHNSource
+        except ImportError:
+            self.skipTest("scrapy is not installed")
+        with StubServer() as server:
+            source = ScrapyHNSource(base_url=server.base_url)
+            first = source.fetch_trends(limit=5)
+            # A second crawl in the same process must not hit ReactorNotRestartable
+            second = source.fetch_trends(limit=5)
+        self.assertEqual([t.url for t in first], [t.url for t in second])
+        self.assertEqual(len(second), 5)
+
+    def test_incomplete_scrapy_crawl_returns_nothing(self):
+        try:
+            from scrapy_source import ScrapyHNSource, _ReactorThread
+        except ImportError:
+            self.skipTest("scrapy is not installed")
+
+        def timed_out(_settings, _timeout, _spidercls, items_out, **_kwargs):
+            items_out.append({"title": "Partial", "url": "https://example.com", "rank": 1, "page": 1})
+            return False
+
+        with mock.patch.object(_ReactorThread, "crawl", side_effect=timed_out):
+            self.assertEqual(ScrapyHNSource().fetch_trends(limit=5), [])
+
+
+class TestMetrics(unittest.TestCase):
+    def tearDown(self):
+        metrics.disable()
+        metrics.reset()
+
+    def test_disabled_hooks_record_nothing(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "m.db"))
+            TrendMonitor(RedditFake(), db).fetch_and_store(limit=3)
+        self.assertEqual(metrics.render().strip(), "")
+
+    def test_stages_are_timed_and_exported(self):
+        metrics.enable()
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "m.db"))
+            monitor = TrendMonitor([RedditFake(), FailingSource()], db)
+            monitor.fetch_and_store(limit=3)
+            metrics.write_file(os.path.join(tmp, "trendwatch.prom"))
+            with open(os.path.join(tmp, "trendwatch.prom"), encoding="utf-8") as fh:
+                text = fh.read()
+
+        self.assertIn('trendwatch_items_fetched_total{source="RedditFake"} 3', text)
+        self.assertIn('trendwatch_stage_seconds_count{stage="save"} 1', text)
+        self.assertIn('trendwatch_db_rows_written_total{backend="sqlite"} 3', text)
+        self.assertIn('trendwatch_errors_total{source="FailingSource",stage="fetch"', text)
+
+    def test_api_requests_labelled_by_route(self):
+        metrics.enable()
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "m.db"), persistent=True)
+            server = TrendServer(TrendAPI(db), port=0).start()
+            try:
+                for path in ("trends/platform/reddit", "trends/platform/youtube", "wp-admin/setup.php"):
+                    requests.get(server.base_url + path, timeout=5)
+            finally:
+                server.shutdown()
+                server.server_close()
+                db.close()
+        text = metrics.render()
+        self.assertIn('trendwatch_api_requests_total{endpoint="platform",status="200"} 2', text)
+        self.assertIn('trendwatch_api_requests_total{endpoint="not_found",status="404"} 1', text)
+        self.assertNotIn("wp-admin", text)
+
+
+class TestAdaptivePolling(unittest.TestCase):
+    def test_unchanged_list_is_skipped_and_churn_speeds_up(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "a.db"))
+            policy = AdaptivePolling(min_interval=60, max_interval=600)
+            monitor = TrendMonitor(RedditFake(), db, adaptive=policy, interval=120)
+
+            self.assertEqual(monitor.fetch_and_store(limit=5), 5)
+            self.assertEqual(monitor.interval, 120)
+            # Same top list: nothing stored, polled less often
+            self.assertEqual(monitor.fetch_and_store(limit=5), 0)
+            self.assertEqual(monitor.interval, 180)
+            self.assertEqual(len(db.get_latest(limit=20)), 5)
+            # A reshuffled list is stored and shortens the interval
+            self.assertEqual(monitor.fetch_and_store(limit=8), 8)
+            self.assertEqual(monitor.interval, 90)
+            self.assertGreater(monitor.last_churn, 0.2)
+
+    def test_failed_save_is_retried_on_next_poll(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "a.db"))
+            monitor = TrendMonitor(RedditFake(), db, adaptive=AdaptivePolling(), interval=120)
+            with mock.patch.object(db, "save_trends", return_value=False):
+                self.assertEqual(monitor.fetch_and_store(limit=5), 0)
+            self.assertEqual(monitor.fetch_and_store(limit=5), 5)
+            self.assertEqual(len(db.get_latest(limit=20)), 5)
+
+
+class TestRedditBackoff(unittest.TestCase):
+    def test_429_starts_backoff_and_skips_requests(self):
+        session = mock.Mock()
+        session.get.return_value = mock.Mock(status_code=429, headers={"Retry-After": "30"})
+        source = RedditTrendSource("news", session=session, cache=HTTPCache())
+
+        self.assertEqual(source.fetch_trends(limit=3), [])
+        self.assertGreaterEqual(source.backoff_remaining(), 29)
+
+        # Still backing off: no second request is made
+        self.assertEqual(source.fetch_trends(limit=3), [])
+        self.assertEqual(session.get.call_count, 1)
+
+
+class TestRedditConditionalRequests(unittest.TestCase):
+    def test_304_reuses_previous_items(self):
+        body = json.dumps(
+            {"data": {"children": [{"data": {"title": "A", "permalink": "/r/news/a", "score": 5}}]}}
+        ).encode()
+        ok = mock.Mock(status_code=200, headers={"ETag": '"v1"'}, content=body)
+        unchanged = mock.Mock(status_code=304, headers={})
+        session = mock.Mock()
+        session.get.side_effect = [ok, unchanged]
+        source = RedditTrendSource("news", session=session, cache=HTTPCache())
+
+        first = source.fetch_trends(limit=3)
+        second = source.fetch_trends(limit=3)
+
+        self.assertEqual([t.title for t in second], [t.title for t in first])
+        self.assertTrue(source.last_not_modified)
+        sent = session.get.call_args_list[1].kwargs["headers"]
+        self.assertEqual(sent["If-None-Match"], '"v1"')
+
+
+class TestRedditPagination(unittest.TestCase):
+    @staticmethod
+    def _page(start: int, count: int, after):
+        children = [
+            {"data": {"title": f"P{i}", "permalink": f"/r/news/{i}", "score": i}}
+            for i in range(start, start + count)
+        ]
+        body = json.dumps({"data": {"children": children, "after": after}}).encode()
+        return mock.Mock(status_code=200, headers={}, content=body)
+
+    def test_follows_after_cursor_with_continuous_ranks(self):
+        session = mock.Mock()
+        session.get.side_effect = [
+            self._page(0, 100, "t3_a"),
+            self._page(100, 100, "t3_b"),
+            self._page(200, 40, None),
+        ]
+        source = RedditTrendSource("news", session=session, cache=HTTPCache())
+
+        stream = source.iter_listing(250, sort="new")
+        first = next(stream)
+        self.assertEqual(session.get.call_count, 1)  # lazy: one page so far
+
+        items = [first] + list(stream)
+        self.assertEqual(len(items), 240)
+        self.assertEqual([t.rank for t in items], list(range(1, 241)))
+        third_params = session.get.call_args_list[2].kwargs["params"]
+        self.assertEqual(third_params["after"], "t3_b")
+        self.assertNotIn("t", third_params)
+
+
+class TestTrendBatch(unittest.TestCase):
+    def test_batch_round_trip_through_sqlite(self):
+        batch = YouTubeTrendSource(region="US").fetch_batch(limit=5)
+        self.assertIsInstance(batch, TrendBatch)
+        self.assertEqual(len(batch), 5)
+        self.assertIsNotNone(batch.fetched_at)  # one shared timestamp
+        self.assertFalse(hasattr(batch[0], "__dict__"))  # slotted TrendItem
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "batch.db"))
+            db.save_trends(batch)
+            loaded = db.get_latest(limit=10, as_batch=True)
+
+        self.assertIsInstance(loaded, TrendBatch)
+        self.assertEqual(len(loaded.timestamps), 1)
+        self.assertEqual(sorted(t.rank for t in loaded), [1, 2, 3, 4, 5])
+        self.assertEqual(loaded[0].fetched_at, batch.fetched_at)
+
+
+class TestTransfer(unittest.TestCase):
+    def test_export_import_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = TrendDatabase(os.path.join(tmp, "src.db"))
+            src.save_trends(YouTubeTrendSource(region="US").fetch_batch(limit=7))
+            src.save_trends(RedditFake().fetch_trends(limit=4))
+
+            for name in ("dump.jsonl", "dump.csv"):
+                path = os.path.join(tmp, name)
+                self.assertEqual(transfer.export_trends(src, path, chunk_size=3), 11)
+
+                dst = TrendDatabase(os.path.join(tmp, name + ".db"))
+                self.assertEqual(transfer.import_trends(dst, path, chunk_size=4), 11)
+                self.assertEqual(dst.get_latest(limit=20), src.get_latest(limit=20))
+
+    def test_rejected_chunk_stops_migration(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = TrendDatabase(os.path.join(tmp, "src.db"))
+            src.save_trends(RedditFake().fetch_trends(limit=5))
+            dst = TrendDatabase(os.path.join(tmp, "dst.db"))
+            with mock.patch.object(dst, "save_trends", side_effect=[True, False]):
+                with self.assertRaises(transfer.TransferError):
+                    transfer.migrate(src, dst, chunk_size=2)
+
+
+class TestCLI(unittest.TestCase):
+    def test_fetch_then_latest_subcommands(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cli.db")
+            argv = ["fetch", "--source", "youtube:DE", "--limit", "4", "--db", path]
+            with mock.patch("builtins.print"):
+                self.assertEqual(main.main(argv), 0)
+                self.assertEqual(main.main(["latest", "--db", path]), 0)
+            db = TrendDatabase(path)
+            self.assertEqual(len(db.get_latest(limit=10)), 4)
+            db.close()
+
+        self.assertEqual(parse_source_spec("reddit:worldnews"), {"type": "reddit", "subreddit": "worldnews"})
+        self.assertEqual(parse_source_spec("web"), {"type": "web"})
+
+
+class TestAnalytics(unittest.TestCase):
+    def test_top_risers_ranked_by_velocity(self):
+        analytics = TrendAnalytics(window=6, top_n=3)
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for k in range(8):
+            now = start + timedelta(minutes=10 * k)
+            analytics.update(
+                [
+                    TrendItem("reddit", "fast", "https://x.com/fast", 100 + 50 * k, 1, now),
+                    TrendItem("reddit", "slow", "https://x.com/slow", 100 + 5 * k, 5, now),
+                    TrendItem("web", "flat", "https://x.com/flat", 100, 2, now),
+                ]
+            )
+
+        risers = analytics.top_risers(n=3)
+        self.assertEqual([r.title for r in risers], ["fast", "slow", "flat"])
+        self.assertAlmostEqual(risers[0].velocity, 300.0, places=6)  # 50 per 10 min
+        self.assertAlmostEqual(risers[0].acceleration, 0.0, places=6)
+        self.assertEqual(risers[0].time_in_top_n, 50 * 60)  # 5 intervals in window
+        self.assertEqual(risers[1].time_in_top_n, 0)
+        self.assertEqual([r.title for r in analytics.top_risers(platform="web")], ["flat"])
+
+    def test_max_urls_evicts_stalest(self):
+        analytics = TrendAnalytics(window=3, max_urls=5)
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for k in range(10):
+            analytics.update(
+                [TrendItem("web", f"t{k}", f"https://x.com/{k}", k, 1, start + timedelta(minutes=k))]
+            )
+        self.assertEqual(len(analytics), 5)
+
+    def test_eviction_keeps_urls_of_the_current_batch(self):
+        analytics = TrendAnalytics(window=3, max_urls=2)
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+        def item(name, minute):
+            return TrendItem("web", name, f"https://{name}.com/x", 1, 1, start + timedelta(minutes=minute))
+
+        analytics.update([item("a", 0)])
+        analytics.update([item("b", 1)])
+        # "a" is the stalest URL but is in this batch, so "b" goes instead
+        analytics.update([item("a", 2), item("c", 2)])
+        self.assertEqual(len(analytics), 2)
+        self.assertEqual(sorted(analytics._index), ["https://a.com/x", "https://c.com/x"])
+
+    def test_analytics_failure_does_not_fail_the_save(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = TrendDatabase(os.path.join(tmp, "an.db"))
+            analytics = TrendAnalytics()
+            monitor = TrendMonitor(RedditFake(), db, analytics=analytics)
+            with mock.patch.object(analytics, "update", side_effect=KeyError("x")):
+                self.assertEqual(monitor.fetch_and_store(limit=3), 3)
+            self.assertEqual(len(db.get_latest(limit=10)), 3)
+
+
+class FlakyDB:
+    """Backend stand-in that records write sizes and can be told to fail."""
+
+    def __init__(self, db: TrendDatabase):
+        self.db = db
+        self.writes: List[int] = []
+        self.fail = False
+
+    def save_trends(self, trends) -> bool:
+        self.writes.append(len(trends))
+        return False if self.fail else self.db.save_trends(trends)
+
+    def get_latest(self, limit: int = 10):
+        return self.db.get_latest(limit=limit)
+
+
+class TestWriteBehindBuffer(unittest.TestCase):
+    def test_coalesces_and_journals_failed_writes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            inner = FlakyDB(TrendDatabase(os.path.join(tmp, "wb.db")))
+            buffer = WriteBehindBuffer(
+                inner,
+                max_batch=100,
+                flush_interval=60,
+                journal_path=os.path.join(tmp, "pending.jsonl"),
+            )
+            monitor = TrendMonitor(YouTubeTrendSource(), buffer)
+            for _ in range(5):
+                monitor.fetch_and_store(limit=10)
+            self.assertTrue(buffer.flush(timeout=5))
+            self.assertEqual(inner.writes, [50])  # five fetches, one insert
+            self.assertEqual(len(buffer.get_latest(limit=100)), 50)
+
+            inner.fail = True
+            buffer.save_trends(YouTubeTrendSource().fetch_batch(limit=7))
+            buffer.flush(timeout=5)
+            self.assertTrue(os.path.exists(buffer.journal_path))
+
+            # Rows from a replay interrupted by a crash are replayed too
+            os.replace(buffer.journal_path, buffer.journal_path + ".replay")
+            buffer.save_trends(YouTubeTrendSource().fetch_batch(limit=3))
+            buffer.flush(timeout=5)
+
+            inner.fail = False
+            self.assertEqual(buffer.replay_journal(), 10)
+            self.assertEqual(len(buffer.get_latest(limit=100)), 60)
+            self.assertFalse(os.path.exists(buffer.journal_path + ".replay"))
+            buffer.close()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,206 @@
+"""Streaming export, import and backend-to-backend migration of trend history.
+
+Rows are moved in fixed-size chunks (``iter_chunks`` on either backend and
+batched ``save_trends`` calls), so memory use does not grow with the size of
+the history. Supported file formats: JSON Lines (``.jsonl``), CSV (``.csv``)
+and Parquet (``.parquet``, needs ``pyarrow``).
+
+Usage::
+
+    python transfer.py export trends.jsonl
+    python transfer.py export dump.parquet --backend mongo
+    python transfer.py import trends.jsonl --backend mongo
+    python transfer.py migrate --from sqlite --to mongo
+"""
+
+import argparse
+import csv
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+from factory import create_db
+from models import TrendBatch
+
+FIELDS = ["platform", "title", "url", "score", "rank", "fetched_at"]
+FORMATS = ("jsonl", "csv", "parquet")
+
+
+class TransferError(RuntimeError):
+    """The target backend rejected a chunk; rows counted so far were written."""
+
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    """Return ``fmt`` or infer it from the file extension."""
+    if fmt is None:
+        ext = os.path.splitext(path)[1].lower().lstrip(".")
+        fmt = {"json": "jsonl", "ndjson": "jsonl"}.get(ext, ext)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format {fmt!r}; expected one of {FORMATS}")
+    return fmt
+
+
+def _require_pyarrow():
+    """Import pyarrow lazily; it is only needed for Parquet."""
+    try:
+        import pyarrow  # pylint: disable=import-outside-toplevel
+        import pyarrow.parquet  # pylint: disable=import-outside-toplevel,unused-import
+    except ImportError as exc:
+        raise ImportError("Parquet support needs pyarrow: python -m pip install pyarrow") from exc
+    return pyarrow
+
+
+def _batch_columns(batch: TrendBatch) -> Dict[str, List[Any]]:
+    columns: Dict[str, List[Any]] = {name: [] for name in FIELDS}
+    for row in batch.rows():
+        for name, value in zip(FIELDS, row):
+            columns[name].append(value)
+    return columns
+
+
+def export_trends(db, path: str, fmt: Optional[str] = None, chunk_size: int = 5000) -> int:
+    """Stream every row of ``db`` into ``path``. Returns the number of rows written."""
+    fmt = detect_format(path, fmt)
+    count = 0
+
+    if fmt == "parquet":
+        pa = _require_pyarrow()
+        schema = pa.schema(
+            [
+                ("platform", pa.string()),
+                ("title", pa.string()),
+                ("url", pa.string()),
+                ("score", pa.int64()),
+                ("rank", pa.int64()),
+                ("fetched_at", pa.string()),
+            ]
+        )
+        with pa.parquet.ParquetWriter(path, schema) as writer:
+            for batch in db.iter_chunks(chunk_size):
+                writer.write_table(pa.table(_batch_columns(batch), schema=schema))
+                count += len(batch)
+        return count
+
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        if fmt == "csv":
+            writer = csv.writer(fh)
+            writer.writerow(FIELDS)
+            for batch in db.iter_chunks(chunk_size):
+                writer.writerows(batch.rows())
+                count += len(batch)
+        else:
+            for batch in db.iter_chunks(chunk_size):
+                fh.writelines(
+                    json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + "\n"
+                    for row in batch.rows()
+                )
+                count += len(batch)
+    return count
+
+
+def read_rows(path: str, fmt: str, chunk_size: int) -> Iterator[tuple]:
+    """Yield (platform, title, url, score, rank, fetched_at) rows from a file."""
+    if fmt == "parquet":
+        pa = _require_pyarrow()
+        parquet_file = pa.parquet.ParquetFile(path)
+        for record_batch in parquet_file.iter_batches(batch_size=chunk_size, columns=FIELDS):
+            columns = record_batch.to_pydict()
+            yield from zip(*(columns[name] for name in FIELDS))
+        return
+
+    with open(path, "r", encoding="utf-8", newline="") as fh:
+        if fmt == "csv":
+            for record in csv.DictReader(fh):
+                yield tuple(record[name] for name in FIELDS)
+        else:
+            for line in fh:
+                if line.strip():
+                    record = json.loads(line)
+                    yield tuple(record[name] for name in FIELDS)
+
+
+def _save(db, batch: TrendBatch, count: int) -> int:
+    """Save one chunk and return the new row count; raise TransferError if it fails."""
+    if db.save_trends(batch) is False:
+        raise TransferError(f"Target database rejected a chunk of {len(batch)} rows after {count} rows")
+    return count + len(batch)
+
+
+def import_trends(db, path: str, fmt: Optional[str] = None, chunk_size: int = 5000) -> int:
+    """Load a file written by export_trends() into ``db`` with batched inserts.
+
+    Raises TransferError if the database rejects a chunk.
+    """
+    fmt = detect_format(path, fmt)
+    count = 0
+    batch = TrendBatch()
+    for platform, title, url, score, rank, fetched_at in read_rows(path, fmt, chunk_size):
+        batch.append_row((platform, title, url, int(score), int(rank), fetched_at))
+        if len(batch) >= chunk_size:
+            count = _save(db, batch, count)
+            batch = TrendBatch()
+    if len(batch):
+        count = _save(db, batch, count)
+    return count
+
+
+def migrate(source_db, target_db, chunk_size: int = 5000) -> int:
+    """Copy every row from one backend to another, one chunk at a time.
+
+    Raises TransferError if the target rejects a chunk.
+    """
+    count = 0
+    for batch in source_db.iter_chunks(chunk_size):
+        count = _save(target_db, batch, count)
+    return count
+
+
+def _backend_options(backend: str, location: Optional[str]) -> Dict[str, Any]:
+    if location is None:
+        return {}
+    return {"uri": location} if backend == "mongo" else {"path": location}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Export, import or migrate TrendWatch data")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("export", "import"):
+        cmd = sub.add_parser(name)
+        cmd.add_argument("file")
+        cmd.add_argument("--backend", choices=["sqlite", "mongo"], default="sqlite")
+        cmd.add_argument("--db", help="SQLite path or Mongo URI")
+        cmd.add_argument("--format", choices=FORMATS)
+        cmd.add_argument("--chunk-size", type=int, default=5000)
+
+    mig = sub.add_parser("migrate")
+    mig.add_argument("--from", dest="src", choices=["sqlite", "mongo"], default="sqlite")
+    mig.add_argument("--to", dest="dst", choices=["sqlite", "mongo"], default="mongo")
+    mig.add_argument("--from-db", help="source SQLite path or Mongo URI")
+    mig.add_argument("--to-db", help="target SQLite path or Mongo URI")
+    mig.add_argument("--chunk-size", type=int, default=5000)
+
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "migrate":
+            src = create_db(args.src, **_backend_options(args.src, args.from_db))
+            dst = create_db(args.dst, **_backend_options(args.dst, args.to_db))
+            count = migrate(src, dst, args.chunk_size)
+            print(f"Migrated {count} rows from {args.src} to {args.dst}.")
+            return
+
+        db = create_db(args.backend, **_backend_options(args.backend, args.db))
+        if args.command == "export":
+            count = export_trends(db, args.file, args.format, args.chunk_size)
+            print(f"Exported {count} rows to {args.file}.")
+        else:
+            count = import_trends(db, args.file, args.format, args.chunk_size)
+            print(f"Imported {count} rows from {args.file}.")
+    except (ValueError, ImportError, TransferError) as exc:
+        print(f"[ERROR] {args.command.capitalize()} failed: {exc}")
+        raise SystemExit(1) from exc
+
+if __name__ == "__main__":
+    main()
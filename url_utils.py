@@ -0,0 +1,106 @@
+"""URL helpers shared by the storage backends."""
+
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Query parameters that only identify the referrer or campaign. Generic
+# names such as ``ref`` or ``si`` are left alone: sites use them for content
+# (a GitHub ``?ref=<branch>``, for example).
+_TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid",
+    "ref_src", "ref_url", "cmpid", "smid", "_ga",
+}
+_TRACKING_PREFIXES = ("utm_",)
+
+# Redirect wrappers whose real target is carried in a query parameter:
+# host -> (path, parameter)
+_REDIRECTORS = {
+    "www.google.com": ("/url", "q"),
+    "google.com": ("/url", "q"),
+    "l.facebook.com": ("/l.php", "u"),
+    "lm.facebook.com": ("/l.php", "u"),
+    "l.instagram.com": ("/", "u"),
+    "out.reddit.com": (None, "url"),
+    "www.youtube.com": ("/redirect", "q"),
+    "t.umblr.com": ("/redirect", "z"),
+    "href.li": (None, None),
+}
+
+
+def unwrap_redirect(url: str, max_hops: int = 3) -> str:
+    """Return the target of a known redirect wrapper, or ``url`` unchanged.
+
+    Only the wrapper itself is parsed; no request is made. Nested wrappers
+    are unwrapped up to ``max_hops`` times.
+    """
+    for _ in range(max_hops):
+        try:
+            parts = urlsplit(url)
+        except ValueError:
+            return url
+        host = (parts.hostname or "").lower()
+        if host not in _REDIRECTORS:
+            return url
+        path, param = _REDIRECTORS[host]
+        if path is not None and parts.path.rstrip("/") != path.rstrip("/"):
+            return url
+        if param is None:
+            # href.li/?https://target: the target is the whole query string
+            target = parts.query
+        else:
+            target = dict(parse_qsl(parts.query)).get(param, "")
+        if not target.startswith(("http://", "https://")):
+            return url
+        url = target
+    return url
+
+
+def canonical_url(url: str) -> str:
+    """Return a canonical form of ``url`` used as a deduplication key.
+
+    Lower-cases the scheme and host, drops default ports and the fragment,
+    and removes a trailing slash from the path. Anything that does not parse
+    as an absolute URL is returned stripped but otherwise unchanged.
+
+    This is the storage key of the dedupe backends, so it must stay stable:
+    stricter normalisation belongs in story_url().
+    """
+    url = (url or "").strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    if not parts.scheme or not parts.netloc:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if port and port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    path = parts.path.rstrip("/") if parts.path != "/" else ""
+    return urlunsplit((scheme, host, path, parts.query, ""))
+
+
+def story_url(url: str) -> str:
+    """Return the key story clustering matches URLs on.
+
+    canonical_url() of the redirect target, without tracking parameters
+    (``utm_*``, ``fbclid``, ...). Only used to recognise the same story, never
+    as a storage key.
+    """
+    url = canonical_url(unwrap_redirect((url or "").strip()))
+    parts = urlsplit(url)
+    if not parts.query:
+        return url
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    kept = [(k, v) for k, v in params if not _is_tracking(k)]
+    if len(kept) == len(params):
+        return url
+    return urlunsplit(parts._replace(query=urlencode(kept)))
+
+
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name in _TRACKING_PARAMS or name.startswith(_TRACKING_PREFIXES)
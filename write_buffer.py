@@ -0,0 +1,221 @@
+"""Write-behind buffer that decouples fetching from database latency."""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Optional
+
+import metrics
+from models import TrendBatch, Trends
+from transfer import FIELDS, read_rows
+
+
+class WriteBehindBuffer:
+    """Queues trend batches and writes them to ``db`` from a background thread.
+
+    It exposes the same ``save_trends`` method as the backends, so it can be
+    passed to TrendMonitor in place of the database. Other attributes
+    (``get_latest``, ``query``, ...) are forwarded to the wrapped backend.
+
+    - Batches from many fetches are coalesced into writes of up to
+      ``max_batch`` rows. A write happens once that many rows are waiting or
+      ``flush_interval`` seconds after the oldest waiting row arrived.
+    - At most ``max_pending`` rows are held in memory. A save_trends() call
+      that would exceed that blocks (backpressure) for up to ``put_timeout``
+      seconds, then spills its rows to the journal instead.
+    - A failed write is appended to the JSON Lines journal at
+      ``journal_path``; replay_journal() loads it back later.
+    """
+
+    def __init__(
+        self,
+        db,
+        max_batch: int = 1000,
+        flush_interval: float = 2.0,
+        max_pending: int = 20000,
+        put_timeout: Optional[float] = 30.0,
+        journal_path: str = "trendwatch_pending.jsonl",
+    ):
+        self.db = db
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.put_timeout = put_timeout
+        self.journal_path = journal_path
+        self._queue: Deque[TrendBatch] = deque()
+        self._pending = 0
+        self._first_pending_at = 0.0
+        self._writing = False
+        self._flush_requests = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._journal_lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name="trendwatch-writer", daemon=True
+        )
+        self._thread.start()
+        metrics.register_gauge("trendwatch_write_queue_depth", lambda: self._pending, journal=journal_path)
+
+    def __getattr__(self, name):
+        # Reads and anything else not defined here go straight to the backend
+        return getattr(self.db, name)
+
+    @property
+    def pending(self) -> int:
+        """Number of rows waiting to be written (queue depth)."""
+        return self._pending
+
+    def save_trends(self, trends: Trends) -> bool:
+        """Queue trends for writing; returns False if they had to be spilled."""
+        if not trends:
+            return True
+        batch = trends if isinstance(trends, TrendBatch) else TrendBatch.from_items(trends)
+        size = len(batch)
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("WriteBehindBuffer is closed")
+            has_room = self._cond.wait_for(
+                lambda: self._pending == 0 or self._pending + size <= self.max_pending,
+                timeout=self.put_timeout,
+            )
+            if has_room:
+                if not self._queue:
+                    self._first_pending_at = time.monotonic()
+                self._queue.append(batch)
+                self._pending += size
+                self._cond.notify_all()
+                return True
+
+        print(f"[WARN] Write buffer full; spilling {size} rows to {self.journal_path}.")
+        self._spill(batch)
+        return False
+
+    def _take(self) -> Optional[TrendBatch]:
+        """Coalesce queued batches into one write of up to ``max_batch`` rows."""
+        merged = TrendBatch()
+        while self._queue and (
+            not len(merged) or len(merged) + len(self._queue[0]) <= self.max_batch
+        ):
+            merged.extend(self._queue.popleft())
+        self._pending -= len(merged)
+        self._first_pending_at = time.monotonic()
+        return merged if len(merged) else None
+
+    def _run(self) -> None:
+        """Writer loop: wait for a size/time threshold, then write one coalesced batch."""
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed and not self._queue:
+                        return
+                    if self._queue:
+                        waited = time.monotonic() - self._first_pending_at
+                        if (
+                            self._closed
+                            or self._flush_requests
+                            or self._pending >= self.max_batch
+                            or waited >= self.flush_interval
+                        ):
+                            break
+                        self._cond.wait(self.flush_interval - waited)
+                    else:
+                        self._cond.wait()
+                batch = self._take()
+                self._writing = True
+                self._cond.notify_all()
+
+            metrics.inc("trendwatch_write_batches_total")
+            try:
+                ok = self.db.save_trends(batch)
+            except Exception as exc:  # pylint: disable=broad-except
+                print(f"[ERROR] Background write failed: {exc}")
+                ok = False
+            if ok is False:
+                self._spill(batch)
+
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+    def _spill(self, batch: TrendBatch) -> None:
+        """Append rows that could not be written to the journal file."""
+        metrics.inc("trendwatch_write_spilled_rows_total", len(batch))
+        try:
+            with self._journal_lock, open(self.journal_path, "a", encoding="utf-8") as fh:
+                fh.writelines(
+                    json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + "\n"
+                    for row in batch.rows()
+                )
+        except OSError as exc:
+            print(
+                f"[ERROR] Could not write journal {self.journal_path}: {exc}; "
+                f"{len(batch)} rows lost."
+            )
+
+    def replay_journal(self) -> int:
+        """Write journaled rows to the backend and remove the journal on success.
+
+        The journal is moved to ``<journal_path>.replay`` while it is read.
+        A ``.replay`` file left behind by a crash during an earlier replay is
+        replayed first (rows it had already written are written again).
+        """
+        replaying = self.journal_path + ".replay"
+        count = 0
+        if os.path.exists(replaying):
+            count += self._replay_file(replaying)
+        with self._journal_lock:
+            has_journal = os.path.exists(self.journal_path)
+            if has_journal:
+                os.replace(self.journal_path, replaying)
+        if has_journal:
+            count += self._replay_file(replaying)
+        if count:
+            print(f"[INFO] Replayed {count} journaled rows.")
+        return count
+
+    def _replay_file(self, path: str) -> int:
+        """Replay one moved-aside journal file, then delete it."""
+        count = 0
+        batch = TrendBatch()
+        for platform, title, url, score, rank, fetched_at in read_rows(path, "jsonl", self.max_batch):
+            batch.append_row((platform, title, url, int(score), int(rank), fetched_at))
+            if len(batch) >= self.max_batch:
+                count += self._replay_batch(batch)
+                batch = TrendBatch()
+        if len(batch):
+            count += self._replay_batch(batch)
+        os.remove(path)
+        return count
+
+    def _replay_batch(self, batch: TrendBatch) -> int:
+        """Write one replayed batch; a batch that fails again goes back to the journal."""
+        if self.db.save_trends(batch) is False:
+            self._spill(batch)
+            return 0
+        return len(batch)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write everything queued so far; returns False on timeout."""
+        with self._cond:
+            self._flush_requests += 1  # makes queued rows due immediately
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(
+                    lambda: not self._queue and not self._writing, timeout=timeout
+                )
+            finally:
+                self._flush_requests -= 1
+
+    def close(self) -> None:
+        """Flush, stop the writer thread and close the wrapped backend."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        metrics.unregister_gauge("trendwatch_write_queue_depth", journal=self.journal_path)
+        close = getattr(self.db, "close", None)
+        if callable(close):
+            close()
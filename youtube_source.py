@@ -5,7 +5,7 @@ from typing import List
 
 
 from base_source import BaseTrendSource
-from models import TrendItem
+from models import TrendBatch, TrendItem
 
 
 class YouTubeTrendSource(BaseTrendSource):
@@ -15,11 +15,8 @@ class YouTubeTrendSource(BaseTrendSource):
         # default YouTube region
         self.region = region
 
-    # OVERLOADED METHOD: adds optional region parameter
-    def fetch_trends(self, limit: int = 10, region: str | None = None) -> List[TrendItem]:
-        """Return dummy YouTube trends. Safe against bad inputs."""
-        items: List[TrendItem] = []
-
+    def _clean_args(self, limit, region):
+        """Replace bad limit/region values with safe defaults."""
         # fallback to default region if not provided
         if region is None:
             region = self.region
@@ -32,6 +29,14 @@ class YouTubeTrendSource(BaseTrendSource):
         if not isinstance(region, str) or not region.strip():
             region = "US"
 
+        return limit, region
+
+    # OVERLOADED METHOD: adds optional region parameter
+    def fetch_trends(self, limit: int = 10, region: str | None = None) -> List[TrendItem]:
+        """Return dummy YouTube trends. Safe against bad inputs."""
+        items: List[TrendItem] = []
+        limit, region = self._clean_args(limit, region)
+
         now = datetime.now(timezone.utc)
 
         for i in range(1, limit + 1):
@@ -47,3 +52,21 @@ class YouTubeTrendSource(BaseTrendSource):
             )
 
         return items
+
+    def fetch_batch(self, limit: int = 10, region: str | None = None) -> TrendBatch:
+        """Return dummy YouTube trends as a TrendBatch, without per-item objects."""
+        limit, region = self._clean_args(limit, region)
+        now = datetime.now(timezone.utc)
+        batch = TrendBatch()
+
+        for i in range(1, limit + 1):
+            batch.append(
+                "youtube",
+                f"Trending YouTube Video #{i} ({region})",
+                f"https://youtube.com/watch?v=video{i}",
+                500 - i * 5,
+                i,
+                now,
+            )
+
+        return batch